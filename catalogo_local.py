@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Espejo local en SQLite del catálogo de Shopify
+Permite resolver duplicados e IDs de inventario sin llamadas a la API
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+
+
+class CatalogoLocal:
+    def __init__(self, ruta_db: str = 'catalogo_shopify.db'):
+        """Abrir (o crear) la base local del catálogo"""
+        self.ruta_db = ruta_db
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(ruta_db, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._crear_esquema()
+
+    def _crear_esquema(self):
+        """Crear tablas e índices si no existen"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS productos (
+                    handle TEXT PRIMARY KEY,
+                    product_id INTEGER NOT NULL,
+                    variant_ids TEXT NOT NULL,
+                    inventory_item_ids TEXT NOT NULL,
+                    sku TEXT,
+                    price TEXT,
+                    compare_at_price TEXT,
+                    qty INTEGER,
+                    updated_at TEXT
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_sku ON productos(sku)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadatos (
+                    clave TEXT PRIMARY KEY,
+                    valor TEXT
+                )
+            """)
+
+    @property
+    def sincronizado(self) -> bool:
+        """Indica si el espejo ya se construyó al menos una vez desde Shopify"""
+        with self._lock:
+            fila = self.conn.execute("SELECT valor FROM metadatos WHERE clave = 'sincronizado_en'").fetchone()
+        return fila is not None
+
+    def total(self) -> int:
+        """Número de productos en el espejo"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+
+    def buscar(self, handle: str) -> Optional[Dict]:
+        """Buscar un producto por handle"""
+        with self._lock:
+            fila = self.conn.execute("SELECT * FROM productos WHERE handle = ?", (handle,)).fetchone()
+        if not fila:
+            return None
+        producto = dict(fila)
+        producto['variant_ids'] = json.loads(producto['variant_ids'])
+        producto['inventory_item_ids'] = json.loads(producto['inventory_item_ids'])
+        return producto
+
+    def existe(self, handle: str) -> bool:
+        """Verificar si un handle ya existe en la tienda"""
+        with self._lock:
+            fila = self.conn.execute("SELECT 1 FROM productos WHERE handle = ?", (handle,)).fetchone()
+        return fila is not None
+
+    @staticmethod
+    def _fila_desde_producto(producto: Dict) -> tuple:
+        """Convertir un producto JSON de la API REST en una fila del espejo"""
+        variantes = producto.get('variants') or []
+        primera = variantes[0] if variantes else {}
+        return (
+            producto['handle'],
+            producto['id'],
+            json.dumps([v.get('id') for v in variantes]),
+            json.dumps([v.get('inventory_item_id') for v in variantes]),
+            primera.get('sku'),
+            primera.get('price'),
+            primera.get('compare_at_price'),
+            primera.get('inventory_quantity'),
+            producto.get('updated_at') or datetime.now().isoformat()
+        )
+
+    def _insertar(self, productos: Iterable[Dict]):
+        """Insertar o actualizar filas (el llamador debe tener el lock y la transacción)"""
+        filas = [self._fila_desde_producto(p) for p in productos if p.get('handle') and p.get('id')]
+        if filas:
+            self.conn.executemany("""
+                INSERT INTO productos (handle, product_id, variant_ids, inventory_item_ids,
+                                       sku, price, compare_at_price, qty, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(handle) DO UPDATE SET
+                    product_id = excluded.product_id,
+                    variant_ids = excluded.variant_ids,
+                    inventory_item_ids = excluded.inventory_item_ids,
+                    sku = excluded.sku,
+                    price = excluded.price,
+                    compare_at_price = excluded.compare_at_price,
+                    qty = COALESCE(excluded.qty, productos.qty),
+                    updated_at = excluded.updated_at
+            """, filas)
+
+    def registrar_productos(self, productos: Iterable[Dict]):
+        """Insertar o actualizar productos a partir de su JSON REST"""
+        with self._lock, self.conn:
+            self._insertar(productos)
+
+    def registrar_producto(self, producto: Dict):
+        """Insertar o actualizar un solo producto"""
+        self.registrar_productos([producto])
+
+    def actualizar_variante(self, handle: str, **campos):
+        """Guardar precio, precio de comparación o cantidad recién escritos en Shopify"""
+        columnas = [c for c in campos if c in ('price', 'compare_at_price', 'qty')]
+        if not columnas:
+            return
+        asignaciones = ", ".join(f"{c} = ?" for c in columnas)
+        valores = [campos[c] for c in columnas] + [datetime.now().isoformat(), handle]
+        with self._lock, self.conn:
+            self.conn.execute(f"UPDATE productos SET {asignaciones}, updated_at = ? WHERE handle = ?", valores)
+
+    def actualizar_cantidad(self, handle: str, cantidad: int):
+        """Guardar la cantidad de inventario recién escrita en Shopify"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE productos SET qty = ?, updated_at = ? WHERE handle = ?",
+                (cantidad, datetime.now().isoformat(), handle)
+            )
+
+    def construir_desde_shopify(self, peticion: Callable[..., requests.Response], api_url: str) -> int:
+        """
+        Descargar todo el catálogo paginado (250 por página) y reconstruir el espejo
+
+        Args:
+            peticion: Función (metodo, url, **kwargs) que respeta el límite de API
+            api_url: URL base de la API, p.ej. https://tienda.myshopify.com/admin/api/2025-04
+
+        Returns:
+            Número de productos sincronizados
+        """
+        url = f"{api_url}/products.json"
+        params = {'limit': 250, 'fields': 'id,handle,variants,updated_at'}
+        productos: List[Dict] = []
+        pagina = 0
+
+        while url:
+            response = peticion('GET', url, params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"Error descargando catálogo: {response.status_code}")
+            productos.extend(response.json().get('products', []))
+            pagina += 1
+            logging.info(f"📥 Catálogo Shopify: página {pagina} ({len(productos):,} productos)")
+
+            # Paginación por cursor: la URL siguiente ya trae page_info y limit
+            url = response.links.get('next', {}).get('url')
+            params = None
+
+        # Reemplazo completo en una sola transacción
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM productos")
+            self._insertar(productos)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO metadatos (clave, valor) VALUES ('sincronizado_en', ?)",
+                (datetime.now().isoformat(),)
+            )
+
+        logging.info(f"✅ Espejo local actualizado: {len(productos):,} productos en {self.ruta_db}")
+        return len(productos)
+
+    def cerrar(self):
+        """Cerrar la conexión a la base"""
+        self.conn.close()
@@ -1,262 +1,387 @@
 #!/usr/bin/env python3
 """
 Mapeo de categorías SYSCOM a categorías Shopify/Google Shopping
+
+El mapeo vive en category_mapping.json (o en un CSV categoria_syscom,categoria_shopify
+indicado en CATEGORY_MAPPING_FILE). Se compila en la primera conversión a un índice por
+prefijos que se guarda en disco junto al archivo de mapeo, y se recarga solo cuando el
+archivo cambia, sin reiniciar el proceso.
+Las categorías que solo difieren en acentos, mayúsculas o espacios se resuelven con
+segmentos normalizados y, si aun así no hay mapeo, con un índice invertido de palabras.
 """
 
-# Diccionario de mapeo de categorías
-CATEGORY_MAPPING = {
-    # Cableado Estructurado
-    "Cableado Estructurado > Fibra Óptica > Distribuidores de Fibra Óptica": "Electronics > Electronics Accessories > Cable Management > Patch Panels",
-    "Cableado Estructurado > Fibra Óptica > Cables": "Electronics > Electronics Accessories > Cables > Fiber Optic Cables",
-    "Cableado Estructurado > Fibra Óptica > Conectores": "Electronics > Electronics Accessories > Cable Management > Connectors",
-    "Cableado Estructurado > Fibra Óptica > Pigtails": "Electronics > Electronics Accessories > Cables > Fiber Optic Cables",
-    "Cableado Estructurado > Fibra Óptica > Acopladores": "Electronics > Electronics Accessories > Cable Management > Couplers",
-    "Cableado Estructurado > Fibra Óptica > Adaptadores": "Electronics > Electronics Accessories > Cable Management > Adapters",
-    "Cableado Estructurado > Fibra Óptica > Atenuadores": "Electronics > Electronics Accessories > Cable Management > Attenuators",
-    "Cableado Estructurado > Fibra Óptica > Patch Cords": "Electronics > Electronics Accessories > Cables > Patch Cables",
-    "Cableado Estructurado > Fibra Óptica > Patch Panels": "Electronics > Electronics Accessories > Cable Management > Patch Panels",
-    "Cableado Estructurado > Fibra Óptica > Cajas de Terminación": "Electronics > Electronics Accessories > Cable Management > Junction Boxes",
-    "Cableado Estructurado > Fibra Óptica > Organizadores": "Electronics > Electronics Accessories > Cable Management > Cable Organizers",
-    "Cableado Estructurado > Fibra Óptica > Gabinetes": "Electronics > Electronics Accessories > Cable Management > Cabinets",
-    "Cableado Estructurado > Fibra Óptica > Herramientas": "Electronics > Electronics Accessories > Tools > Fiber Optic Tools",
-    "Cableado Estructurado > Fibra Óptica > Medidores": "Electronics > Electronics Accessories > Test Equipment > Optical Meters",
-    "Cableado Estructurado > Fibra Óptica > Fusionadoras": "Electronics > Electronics Accessories > Tools > Fusion Splicers",
-    "Cableado Estructurado > Fibra Óptica > Limpiadoras": "Electronics > Electronics Accessories > Tools > Fiber Cleaners",
-    "Cableado Estructurado > Fibra Óptica > Todos": "Electronics > Electronics Accessories > Cables > Fiber Optic Cables",
-
-    # Cables de Cobre
-    "Cableado Estructurado > Cables de Cobre > UTP": "Electronics > Electronics Accessories > Cables > Network Cables",
-    "Cableado Estructurado > Cables de Cobre > FTP": "Electronics > Electronics Accessories > Cables > Network Cables",
-    "Cableado Estructurado > Cables de Cobre > STP": "Electronics > Electronics Accessories > Cables > Network Cables",
-    "Cableado Estructurado > Cables de Cobre > Coaxial": "Electronics > Electronics Accessories > Cables > Coaxial Cables",
-    "Cableado Estructurado > Cables de Cobre > Patch Cords": "Electronics > Electronics Accessories > Cables > Patch Cables",
-    "Cableado Estructurado > Cables de Cobre > Extensiones": "Electronics > Electronics Accessories > Cables > Extension Cables",
-    "Cableado Estructurado > Cables de Cobre > Todos": "Electronics > Electronics Accessories > Cables > Network Cables",
-
-    # Conectividad
-    "Cableado Estructurado > Conectividad > Jacks": "Electronics > Electronics Accessories > Cable Management > Jacks",
-    "Cableado Estructurado > Conectividad > Plugs": "Electronics > Electronics Accessories > Cable Management > Plugs",
-    "Cableado Estructurado > Conectividad > Patch Panels": "Electronics > Electronics Accessories > Cable Management > Patch Panels",
-    "Cableado Estructurado > Conectividad > Face Plates": "Electronics > Electronics Accessories > Cable Management > Wall Plates",
-    "Cableado Estructurado > Conectividad > Cajas de Piso": "Electronics > Electronics Accessories > Cable Management > Floor Boxes",
-    "Cableado Estructurado > Conectividad > Organizadores": "Electronics > Electronics Accessories > Cable Management > Cable Organizers",
-    "Cableado Estructurado > Conectividad > Canaletas": "Electronics > Electronics Accessories > Cable Management > Raceways",
-    "Cableado Estructurado > Conectividad > Gabinetes": "Electronics > Electronics Accessories > Cable Management > Cabinets",
-    "Cableado Estructurado > Conectividad > Racks": "Electronics > Electronics Accessories > Cable Management > Racks",
-    "Cableado Estructurado > Conectividad > Todos": "Electronics > Electronics Accessories > Cable Management",
-
-    # Herramientas
-    "Cableado Estructurado > Herramientas > Pinzas": "Electronics > Electronics Accessories > Tools > Pliers",
-    "Cableado Estructurado > Herramientas > Ponchadores": "Electronics > Electronics Accessories > Tools > Crimping Tools",
-    "Cableado Estructurado > Herramientas > Testers": "Electronics > Electronics Accessories > Test Equipment > Cable Testers",
-    "Cableado Estructurado > Herramientas > Certificadores": "Electronics > Electronics Accessories > Test Equipment > Cable Certifiers",
-    "Cableado Estructurado > Herramientas > Insertadoras": "Electronics > Electronics Accessories > Tools > Insertion Tools",
-    "Cableado Estructurado > Herramientas > Peladoras": "Electronics > Electronics Accessories > Tools > Wire Strippers",
-    "Cableado Estructurado > Herramientas > Todos": "Electronics > Electronics Accessories > Tools",
-
-    # Automatización e Intrusión
-    "Automatización e Intrusión > Alarmas > Paneles": "Electronics > Electronics Accessories > Security > Alarm Panels",
-    "Automatización e Intrusión > Alarmas > Detectores": "Electronics > Electronics Accessories > Security > Detectors",
-    "Automatización e Intrusión > Alarmas > Sensores": "Electronics > Electronics Accessories > Security > Sensors",
-    "Automatización e Intrusión > Alarmas > Sirenas": "Electronics > Electronics Accessories > Security > Sirens",
-    "Automatización e Intrusión > Alarmas > Teclados": "Electronics > Electronics Accessories > Security > Keypads",
-    "Automatización e Intrusión > Alarmas > Contactos": "Electronics > Electronics Accessories > Security > Contacts",
-    "Automatización e Intrusión > Alarmas > Cables": "Electronics > Electronics Accessories > Cables > Security Cables",
-    "Automatización e Intrusión > Alarmas > Fuentes": "Electronics > Electronics Accessories > Power > Power Supplies",
-    "Automatización e Intrusión > Alarmas > Todos": "Electronics > Electronics Accessories > Security",
-
-    # Videovigilancia
-    "Videovigilancia > Cámaras IP > Domo": "Electronics > Electronics Accessories > Security > IP Cameras",
-    "Videovigilancia > Cámaras IP > Bullet": "Electronics > Electronics Accessories > Security > IP Cameras",
-    "Videovigilancia > Cámaras IP > Fisheye": "Electronics > Electronics Accessories > Security > IP Cameras",
-    "Videovigilancia > Cámaras IP > PTZ": "Electronics > Electronics Accessories > Security > PTZ Cameras",
-    "Videovigilancia > Cámaras IP > Térmicas": "Electronics > Electronics Accessories > Security > Thermal Cameras",
-    "Videovigilancia > Cámaras IP > Todos": "Electronics > Electronics Accessories > Security > IP Cameras",
-
-    "Videovigilancia > Cámaras Análogas > Domo": "Electronics > Electronics Accessories > Security > Analog Cameras",
-    "Videovigilancia > Cámaras Análogas > Bullet": "Electronics > Electronics Accessories > Security > Analog Cameras",
-    "Videovigilancia > Cámaras Análogas > Térmicas": "Electronics > Electronics Accessories > Security > Thermal Cameras",
-    "Videovigilancia > Cámaras Análogas > Todos": "Electronics > Electronics Accessories > Security > Analog Cameras",
-
-    "Videovigilancia > Grabadores > NVR": "Electronics > Electronics Accessories > Security > NVR",
-    "Videovigilancia > Grabadores > DVR": "Electronics > Electronics Accessories > Security > DVR",
-    "Videovigilancia > Grabadores > Híbridos": "Electronics > Electronics Accessories > Security > Hybrid Recorders",
-    "Videovigilancia > Grabadores > Todos": "Electronics > Electronics Accessories > Security > Video Recorders",
-
-    "Videovigilancia > Almacenamiento > Discos Duros": "Electronics > Electronics Accessories > Storage > Hard Drives",
-    "Videovigilancia > Almacenamiento > Todos": "Electronics > Electronics Accessories > Storage",
-
-    "Videovigilancia > Accesorios > Monitores": "Electronics > Electronics Accessories > Video > Monitors",
-    "Videovigilancia > Accesorios > Soportes": "Electronics > Electronics Accessories > Video > Mounts",
-    "Videovigilancia > Accesorios > Cables": "Electronics > Electronics Accessories > Cables > Video Cables",
-    "Videovigilancia > Accesorios > Fuentes": "Electronics > Electronics Accessories > Power > Power Supplies",
-    "Videovigilancia > Accesorios > Todos": "Electronics > Electronics Accessories > Video",
-
-    # Networking
-    "Networking > Switches > Administrables": "Electronics > Electronics Accessories > Networking > Managed Switches",
-    "Networking > Switches > No Administrables": "Electronics > Electronics Accessories > Networking > Unmanaged Switches",
-    "Networking > Switches > PoE": "Electronics > Electronics Accessories > Networking > PoE Switches",
-    "Networking > Switches > Industriales": "Electronics > Electronics Accessories > Networking > Industrial Switches",
-    "Networking > Switches > Todos": "Electronics > Electronics Accessories > Networking > Switches",
-
-    "Networking > Routers > Empresariales": "Electronics > Electronics Accessories > Networking > Enterprise Routers",
-    "Networking > Routers > SOHO": "Electronics > Electronics Accessories > Networking > SOHO Routers",
-    "Networking > Routers > Industriales": "Electronics > Electronics Accessories > Networking > Industrial Routers",
-    "Networking > Routers > Todos": "Electronics > Electronics Accessories > Networking > Routers",
-
-    "Networking > Access Points > Indoor": "Electronics > Electronics Accessories > Networking > Indoor Access Points",
-    "Networking > Access Points > Outdoor": "Electronics > Electronics Accessories > Networking > Outdoor Access Points",
-    "Networking > Access Points > Controladores": "Electronics > Electronics Accessories > Networking > WLAN Controllers",
-    "Networking > Access Points > Todos": "Electronics > Electronics Accessories > Networking > Access Points",
-
-    "Networking > Antenas > Omnidireccionales": "Electronics > Electronics Accessories > Networking > Omnidirectional Antennas",
-    "Networking > Antenas > Direccionales": "Electronics > Electronics Accessories > Networking > Directional Antennas",
-    "Networking > Antenas > Sectoriales": "Electronics > Electronics Accessories > Networking > Sectoral Antennas",
-    "Networking > Antenas > Todos": "Electronics > Electronics Accessories > Networking > Antennas",
-
-    # Control de Acceso
-    "Control de Acceso > Lectores > Proximidad": "Electronics > Electronics Accessories > Security > Proximity Readers",
-    "Control de Acceso > Lectores > Biométricos": "Electronics > Electronics Accessories > Security > Biometric Readers",
-    "Control de Acceso > Lectores > Magnéticos": "Electronics > Electronics Accessories > Security > Magnetic Readers",
-    "Control de Acceso > Lectores > Todos": "Electronics > Electronics Accessories > Security > Access Control Readers",
-
-    "Control de Acceso > Controladores > Standalone": "Electronics > Electronics Accessories > Security > Standalone Controllers",
-    "Control de Acceso > Controladores > Networked": "Electronics > Electronics Accessories > Security > Network Controllers",
-    "Control de Acceso > Controladores > Todos": "Electronics > Electronics Accessories > Security > Access Controllers",
-
-    "Control de Acceso > Cerraduras > Electromagnéticas": "Electronics > Electronics Accessories > Security > Electromagnetic Locks",
-    "Control de Acceso > Cerraduras > Eléctricas": "Electronics > Electronics Accessories > Security > Electric Locks",
-    "Control de Acceso > Cerraduras > Todos": "Electronics > Electronics Accessories > Security > Electronic Locks",
-
-    # Audio y Video
-    "Audio y Video > Micrófonos > Dinámicos": "Electronics > Electronics Accessories > Audio > Dynamic Microphones",
-    "Audio y Video > Micrófonos > Condensador": "Electronics > Electronics Accessories > Audio > Condenser Microphones",
-    "Audio y Video > Micrófonos > Inalámbricos": "Electronics > Electronics Accessories > Audio > Wireless Microphones",
-    "Audio y Video > Micrófonos > Todos": "Electronics > Electronics Accessories > Audio > Microphones",
-
-    "Audio y Video > Amplificadores > Potencia": "Electronics > Electronics Accessories > Audio > Power Amplifiers",
-    "Audio y Video > Amplificadores > Mezcladoras": "Electronics > Electronics Accessories > Audio > Audio Mixers",
-    "Audio y Video > Amplificadores > Todos": "Electronics > Electronics Accessories > Audio > Amplifiers",
-
-    "Audio y Video > Bocinas > Pasivas": "Electronics > Electronics Accessories > Audio > Passive Speakers",
-    "Audio y Video > Bocinas > Activas": "Electronics > Electronics Accessories > Audio > Active Speakers",
-    "Audio y Video > Bocinas > Todos": "Electronics > Electronics Accessories > Audio > Speakers",
-
-    # Energía
-    "Energía > UPS > Interactivos": "Electronics > Electronics Accessories > Power > Interactive UPS",
-    "Energía > UPS > Online": "Electronics > Electronics Accessories > Power > Online UPS",
-    "Energía > UPS > Offline": "Electronics > Electronics Accessories > Power > Offline UPS",
-    "Energía > UPS > Todos": "Electronics > Electronics Accessories > Power > UPS",
-
-    "Energía > Reguladores > Ferroresonantes": "Electronics > Electronics Accessories > Power > Voltage Regulators",
-    "Energía > Reguladores > Electrónicos": "Electronics > Electronics Accessories > Power > Electronic Regulators",
-    "Energía > Reguladores > Todos": "Electronics > Electronics Accessories > Power > Voltage Regulators",
-
-    "Energía > Baterías > Selladas": "Electronics > Electronics Accessories > Power > Sealed Batteries",
-    "Energía > Baterías > Gel": "Electronics > Electronics Accessories > Power > Gel Batteries",
-    "Energía > Baterías > Todos": "Electronics > Electronics Accessories > Power > Batteries",
-
-    # Automatización Domótica
-    "Automatización Domótica > Iluminación > Dimmers": "Electronics > Electronics Accessories > Home Automation > Dimmers",
-    "Automatización Domótica > Iluminación > Switches": "Electronics > Electronics Accessories > Home Automation > Smart Switches",
-    "Automatización Domótica > Iluminación > Todos": "Electronics > Electronics Accessories > Home Automation > Lighting",
-
-    "Automatización Domótica > Climatización > Termostatos": "Electronics > Electronics Accessories > Home Automation > Thermostats",
-    "Automatización Domótica > Climatización > Sensores": "Electronics > Electronics Accessories > Home Automation > Climate Sensors",
-    "Automatización Domótica > Climatización > Todos": "Electronics > Electronics Accessories > Home Automation > Climate Control",
-
-    "Automatización Domótica > Seguridad > Sensores": "Electronics > Electronics Accessories > Home Automation > Security Sensors",
-    "Automatización Domótica > Seguridad > Detectores": "Electronics > Electronics Accessories > Home Automation > Security Detectors",
-    "Automatización Domótica > Seguridad > Todos": "Electronics > Electronics Accessories > Home Automation > Security",
-
-    # Computo
-    "Computo > Equipos > Desktops": "Electronics > Computers > Desktop Computers",
-    "Computo > Equipos > Laptops": "Electronics > Computers > Laptop Computers",
-    "Computo > Equipos > Tablets": "Electronics > Computers > Tablet Computers",
-    "Computo > Equipos > Todos": "Electronics > Computers",
-
-    "Computo > Accesorios > Monitores": "Electronics > Electronics Accessories > Computer Components > Monitors",
-    "Computo > Accesorios > Teclados": "Electronics > Electronics Accessories > Computer Components > Keyboards",
-    "Computo > Accesorios > Mouse": "Electronics > Electronics Accessories > Computer Components > Mice",
-    "Computo > Accesorios > Todos": "Electronics > Electronics Accessories > Computer Components",
-
-    # Telefonía
-    "Telefonía > Teléfonos IP > Escritorio": "Electronics > Electronics Accessories > Telephony > IP Desk Phones",
-    "Telefonía > Teléfonos IP > Inalámbricos": "Electronics > Electronics Accessories > Telephony > IP Wireless Phones",
-    "Telefonía > Teléfonos IP > Todos": "Electronics > Electronics Accessories > Telephony > IP Phones",
-
-    "Telefonía > PBX > IP": "Electronics > Electronics Accessories > Telephony > IP PBX",
-    "Telefonía > PBX > Híbridos": "Electronics > Electronics Accessories > Telephony > Hybrid PBX",
-    "Telefonía > PBX > Todos": "Electronics > Electronics Accessories > Telephony > PBX Systems",
-
-    # Mapeo por defecto para categorías no específicas
-    "Automatización e Intrusión": "Electronics > Electronics Accessories > Security",
-    "Videovigilancia": "Electronics > Electronics Accessories > Security",
-    "Networking": "Electronics > Electronics Accessories > Networking",
-    "Control de Acceso": "Electronics > Electronics Accessories > Security",
-    "Audio y Video": "Electronics > Electronics Accessories > Audio",
-    "Energía": "Electronics > Electronics Accessories > Power",
-    "Automatización Domótica": "Electronics > Electronics Accessories > Home Automation",
-    "Computo": "Electronics > Computers",
-    "Telefonía": "Electronics > Electronics Accessories > Telephony",
-    "Cableado Estructurado": "Electronics > Electronics Accessories > Cables",
+import csv
+import hashlib
+import json
+import logging
+import os
+import math
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+RUTA_MAPEO = os.getenv(
+    'CATEGORY_MAPPING_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_mapping.json')
+)
+# Junto al archivo de mapeo, no en el directorio de trabajo de quien importe el módulo
+RUTA_CACHE_INDICE = os.getenv(
+    'CATEGORY_MAPPING_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(RUTA_MAPEO)), '.cache_categorias.pickle')
+)
+
+# Cada cuántos segundos convertir_categoria revisa si el archivo de mapeo cambió
+INTERVALO_RECARGA = float(os.getenv('CATEGORY_MAPPING_RELOAD_INTERVAL', 5))
+
+# Puntaje mínimo (0 a 1) para aceptar una coincidencia aproximada
+UMBRAL_SIMILITUD = float(os.getenv('CATEGORY_FUZZY_THRESHOLD', 0.75))
+
+VERSION_CACHE = 3
+
+SEPARADOR = ' > '
+
+_PATRON_PALABRAS = re.compile(r'[a-z0-9]+')
+
+
+def normalizar_segmento(texto: str) -> str:
+    """Quitar acentos, pasar a minúsculas y colapsar espacios ('Cámaras  IP' -> 'camaras ip')"""
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.casefold().split())
+
+
+def normalizar_ruta(categoria: str) -> List[str]:
+    """Segmentos normalizados de una ruta 'A > B > C', tolerando espacios alrededor de '>'"""
+    return [normalizar_segmento(segmento) for segmento in categoria.split('>')]
+
+
+def palabras(texto: str) -> List[str]:
+    """Palabras normalizadas de una categoría, sin separadores ni signos"""
+    return _PATRON_PALABRAS.findall(normalizar_segmento(texto))
+
+
+class NodoCategoria:
+    """Nodo del índice de categorías: un segmento de la ruta 'A > B > C'"""
+    __slots__ = ('hijos', 'valor', 'primer_descendiente')
+
+    def __init__(self):
+        self.hijos = {}
+        self.valor = None                 # Mapeo exacto de la ruta hasta este nodo
+        self.primer_descendiente = None   # Mapeo de la primera clave (en orden) bajo este nodo
+
+
+def construir_indice(mapeo: dict) -> NodoCategoria:
+    """Compilar el mapeo en un trie por segmentos"""
+    raiz = NodoCategoria()
+    for clave, valor in mapeo.items():
+        nodo = raiz
+        for segmento in normalizar_ruta(clave):
+            nodo = nodo.hijos.setdefault(segmento, NodoCategoria())
+            if nodo.primer_descendiente is None:
+                nodo.primer_descendiente = valor
+        nodo.valor = valor
+    return raiz
+
+
+def buscar_en_indice(raiz: NodoCategoria, categoria: str):
+    """
+    Buscar el mapeo más específico de una categoría que no tiene mapeo exacto, en O(profundidad)
+
+    Orden de preferencia:
+        1. El prefijo más largo (2 o más segmentos) que tiene mapeo propio
+        2. La primera clave mapeada bajo el nodo más profundo alcanzado (2 o más segmentos)
+        3. El mapeo de la categoría principal
+    """
+    partes = normalizar_ruta(categoria)
+    if len(partes) < 2:
+        return None
+
+    nodo = raiz
+    principal = None
+    mas_largo = None
+    mas_profundo = None
+    for profundidad, segmento in enumerate(partes, 1):
+        nodo = nodo.hijos.get(segmento)
+        if nodo is None:
+            break
+        if profundidad == 1:
+            principal = nodo.valor
+            continue
+        if nodo.valor is not None:
+            mas_largo = nodo.valor
+        mas_profundo = nodo
+
+    if mas_largo is not None:
+        return mas_largo
+    if mas_profundo is not None:
+        return mas_profundo.primer_descendiente
+    return principal
+
+
+class IndicePalabras:
+    """Índice invertido palabra -> claves del mapeo, con peso IDF por palabra"""
+    __slots__ = ('claves', 'palabras_clave', 'postings', 'pesos', 'pesos_clave')
+
+    def __init__(self, mapeo: dict):
+        self.claves = list(mapeo)
+        self.palabras_clave = [frozenset(palabras(clave)) for clave in self.claves]
+        self.postings: Dict[str, List[int]] = {}
+        for posicion, conjunto in enumerate(self.palabras_clave):
+            for palabra in conjunto:
+                self.postings.setdefault(palabra, []).append(posicion)
+        # Las palabras raras ('fibra', 'nvr') pesan más que las que están en todas las rutas
+        total = len(self.claves)
+        self.pesos = {
+            palabra: math.log(1 + total / len(posiciones))
+            for palabra, posiciones in self.postings.items()
+        }
+        self.pesos_clave = [sum(self.pesos[p] for p in conjunto) for conjunto in self.palabras_clave]
+
+    def mejor_coincidencia(self, categoria: str, umbral: float):
+        """
+        Clave más parecida a la categoría según Dice ponderado por IDF
+
+        El puntaje es 2·peso(común) / (peso(consulta) + peso(clave)), así que cuentan tanto las
+        palabras de la consulta que faltan en la clave como las de la clave que sobran: una
+        consulta de una sola palabra ya no empata en 1.0 con todas las claves que la contienen.
+        Solo se puntúan las claves que comparten alguna palabra con la consulta. En empate gana
+        la clave con menos palabras de sobra y luego la primera del archivo.
+
+        Returns:
+            (clave, puntaje) o None si ninguna alcanza el umbral
+        """
+        consulta = frozenset(palabras(categoria))
+        if not consulta:
+            return None
+
+        compartido: Dict[int, float] = {}
+        for palabra in consulta:
+            peso = self.pesos.get(palabra)
+            if peso is None:
+                continue
+            for posicion in self.postings[palabra]:
+                compartido[posicion] = compartido.get(posicion, 0.0) + peso
+        if not compartido:
+            return None
+
+        # Las palabras que no aparecen en ninguna clave cuentan con el peso máximo
+        peso_maximo = max(self.pesos.values())
+        peso_consulta = sum(self.pesos.get(palabra, peso_maximo) for palabra in consulta)
+
+        mejor = None
+        for posicion, peso_compartido in compartido.items():
+            puntaje = 2 * peso_compartido / (peso_consulta + self.pesos_clave[posicion])
+            sobrantes = len(self.palabras_clave[posicion] - consulta)
+            candidato = (-puntaje, sobrantes, posicion)
+            if mejor is None or candidato < mejor:
+                mejor = candidato
+
+        puntaje = -mejor[0]
+        if puntaje < umbral:
+            return None
+        return self.claves[mejor[2]], puntaje
+
+
+def leer_archivo_mapeo(contenido: bytes, ruta: str) -> Dict[str, Dict[str, str]]:
+    """
+    Interpretar el archivo de mapeo
+
+    JSON: {"CATEGORY_MAPPING": {...}, "SPECIFIC_CATEGORY_MAPPING": {...}} o un objeto plano.
+    CSV: columnas categoria_syscom,categoria_shopify (o las dos primeras columnas).
+    """
+    texto = contenido.decode('utf-8-sig')
+    if ruta.lower().endswith('.csv'):
+        filas = csv.reader(texto.splitlines())
+        encabezado = next(filas, None)
+        mapeo = {}
+        if encabezado and encabezado[:2] != ['categoria_syscom', 'categoria_shopify']:
+            mapeo[encabezado[0].strip()] = encabezado[1].strip()
+        for fila in filas:
+            if len(fila) >= 2 and fila[0].strip():
+                mapeo[fila[0].strip()] = fila[1].strip()
+        return {'general': mapeo, 'especificos': {}}
+
+    datos = json.loads(texto)
+    if 'CATEGORY_MAPPING' in datos:
+        return {
+            'general': datos['CATEGORY_MAPPING'],
+            'especificos': datos.get('SPECIFIC_CATEGORY_MAPPING', {})
+        }
+    return {'general': datos, 'especificos': {}}
+
+
+def _compilar(contenido: bytes, ruta: str, huella: str) -> Dict:
+    """Construir el mapeo combinado y su índice"""
+    secciones = leer_archivo_mapeo(contenido, ruta)
+    mapeo = dict(secciones['general'])
+    # Agregar mapeos específicos al diccionario principal
+    mapeo.update(secciones['especificos'])
+    return {
+        'version': VERSION_CACHE,
+        'hash': huella,
+        'general': secciones['general'],
+        'especificos': secciones['especificos'],
+        'mapeo': mapeo,
+        'indice': construir_indice(mapeo),
+        'normalizado': {SEPARADOR.join(normalizar_ruta(clave)): valor for clave, valor in mapeo.items()},
+        'palabras': IndicePalabras(mapeo)
+    }
+
+
+def _leer_cache_indice() -> Optional[Dict]:
+    """Leer el índice compilado guardado en disco (None si no existe o es de otra versión)"""
+    try:
+        with open(RUTA_CACHE_INDICE, 'rb') as f:
+            cache = pickle.load(f)
+        if isinstance(cache, dict) and cache.get('version') == VERSION_CACHE:
+            return cache
+    except Exception:
+        pass
+    return None
+
+
+def _guardar_cache_indice(compilado: Dict):
+    """Guardar el índice compilado de forma atómica"""
+    temporal = f"{RUTA_CACHE_INDICE}.tmp"
+    try:
+        with open(temporal, 'wb') as f:
+            pickle.dump(compilado, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, RUTA_CACHE_INDICE)
+    except OSError as e:
+        logging.debug(f"No se pudo guardar la caché del mapeo de categorías: {e}")
+
+
+def cargar_mapeo(ruta: str = RUTA_MAPEO) -> Dict:
+    """
+    Cargar el mapeo y su índice, usando la caché en disco cuando el archivo no cambió
+
+    La caché se valida primero por ruta, tamaño y fecha de modificación; si no coinciden
+    se compara el hash del contenido antes de recompilar.
+    """
+    estado = os.stat(ruta)
+    firma = (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+
+    cache = _leer_cache_indice()
+    if cache and cache.get('firma') == firma:
+        return cache
+
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+    huella = hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+    if cache and cache.get('hash') == huella:
+        compilado = cache
+    else:
+        compilado = _compilar(contenido, ruta, huella)
+    compilado['firma'] = firma
+    _guardar_cache_indice(compilado)
+    return compilado
+
+
+# Estado vigente: se carga en la primera conversión y se reemplaza completo al recargar
+_lock_recarga = threading.Lock()
+_estado: Optional[Dict] = None
+_ultima_revision = 0.0
+
+# Nombres públicos de siempre, resueltos contra el estado vigente (ver __getattr__)
+_NOMBRES_PUBLICOS = {
+    'CATEGORY_MAPPING': 'mapeo',
+    'SPECIFIC_CATEGORY_MAPPING': 'especificos',
+    'INDICE_CATEGORIAS': 'indice',
 }
 
-# Mapeos específicos para categorías más frecuentes
-SPECIFIC_CATEGORY_MAPPING = {
-    # Cableado Estructurado - Específicos
-    "Cableado Estructurado > Cableado de Cobre > Patch Cords": "Electronics > Electronics Accessories > Cables > Patch Cables",
-    "Cableado Estructurado > Canalización > Tubería Metálica CONDUIT / Accesorios": "Electronics > Electronics Accessories > Cable Management > Conduits",
-    "Cableado Estructurado > Canalización > Fijación": "Electronics > Electronics Accessories > Cable Management > Mounting Hardware",
-    "Cableado Estructurado > Cableado de Cobre > Herramientas": "Electronics > Electronics Accessories > Tools > Cable Tools",
-    "Cableado Estructurado > Fibra Óptica > Jumpers y Pigtails": "Electronics > Electronics Accessories > Cables > Fiber Optic Cables",
-    "Cableado Estructurado > Cableado de Cobre > Jacks / Plugs": "Electronics > Electronics Accessories > Cable Management > Jacks",
-    "Cableado Estructurado > Canalización > Tubería PVC / Registros PVC": "Electronics > Electronics Accessories > Cable Management > PVC Conduits",
-    "Cableado Estructurado > Canalización > Accesorios para Canaletas": "Electronics > Electronics Accessories > Cable Management > Raceway Accessories",
+
+def _estado_vigente() -> Dict:
+    """Estado del mapeo, cargándolo la primera vez que se necesita"""
+    global _estado, _ultima_revision
+
+    estado = _estado
+    if estado is not None:
+        return estado
+    with _lock_recarga:
+        if _estado is None:
+            _estado = cargar_mapeo(RUTA_MAPEO)
+            _ultima_revision = time.monotonic()
+        return _estado
+
+
+def __getattr__(nombre: str):
+    if nombre in _NOMBRES_PUBLICOS:
+        return _estado_vigente()[_NOMBRES_PUBLICOS[nombre]]
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+def recargar_mapeo(forzar: bool = False) -> bool:
+    """
+    Recargar el mapeo si el archivo cambió (o siempre con forzar=True)
+
+    Returns:
+        True si se cargó un mapeo distinto
+    """
+    global _estado, _ultima_revision
+
+    anterior = _estado_vigente()
+    with _lock_recarga:
+        _ultima_revision = time.monotonic()
+        try:
+            estado = os.stat(RUTA_MAPEO)
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo revisar el mapeo de categorías: {e}")
+            return False
+        firma = (os.path.abspath(RUTA_MAPEO), estado.st_size, estado.st_mtime_ns)
+        if not forzar and firma == anterior.get('firma'):
+            return False
+
+        try:
+            nuevo = cargar_mapeo(RUTA_MAPEO)
+        except (OSError, ValueError) as e:
+            logging.error(f"❌ Mapeo de categorías inválido, se conserva el anterior: {e}")
+            return False
+
+        cambio = nuevo['hash'] != anterior['hash']
+        _estado = nuevo
+        if cambio or forzar:
+            _convertir_categoria.cache_clear()
+            logging.info(f"🔄 Mapeo de categorías recargado: {len(nuevo['mapeo'])} mapeos")
+        return cambio
+
+
+@lru_cache(maxsize=4096)
+def _convertir_categoria(categoria_syscom: str) -> str:
+    """Conversión con el mapeo vigente (en caché hasta la próxima recarga)"""
+    # Limpiar la categoría de caracteres especiales y espacios extra
+    categoria_limpia = categoria_syscom.strip()
+    estado = _estado_vigente()
     
-    # Control de Acceso - Específicos
-    "Control  de Acceso > Acceso Vehicular > Accesorios": "Electronics > Electronics Accessories > Security > Vehicle Access Accessories",
-    "Control  de Acceso > Acceso Vehicular > Refacciones": "Electronics > Electronics Accessories > Security > Vehicle Access Parts",
-    "Control  de Acceso > Herramientas > Accesorios de Instalación": "Electronics > Electronics Accessories > Security > Installation Tools",
+    # Buscar mapeo directo
+    if categoria_limpia in estado['mapeo']:
+        return estado['mapeo'][categoria_limpia]
     
-    # Videovigilancia - Específicos
-    "Videovigilancia > Accesorios Generales > Montajes y Brackets para Cámaras": "Electronics > Electronics Accessories > Security > Camera Mounts",
-    "Videovigilancia > Cámaras IP y NVRs > Domo / Eyeball / Turret": "Electronics > Electronics Accessories > Security > IP Cameras",
-    "Videovigilancia > Cámaras IP y NVRs > WiFi / 4G / PoE": "Electronics > Electronics Accessories > Security > IP Cameras",
-    "Videovigilancia > Servidores / Almacenamiento > Servidores": "Electronics > Electronics Accessories > Security > Video Servers",
-    "Videovigilancia > Accesorios Generales > Fuentes de Alimentación": "Electronics > Electronics Accessories > Power > Power Supplies",
+    # Mismo texto salvo acentos, mayúsculas o espacios
+    normalizada = SEPARADOR.join(normalizar_ruta(categoria_limpia))
+    if normalizada in estado['normalizado']:
+        return estado['normalizado'][normalizada]
     
-    # Automatización e Intrusión - Específicos
-    "Automatización   e Intrusión > Automatización - Casa Inteligente > Lutron": "Electronics > Electronics Accessories > Home Automation > Lutron",
-    "Automatización e Intrusión > Automatización - Casa Inteligente > Lutron": "Electronics > Electronics Accessories > Home Automation > Lutron",
-    "Automatización e Intrusión > Cercas Eléctricas > Postes": "Electronics > Electronics Accessories > Security > Electric Fence Posts",
-    "Automatización e Intrusión > Accesorios > Sirenas y Estrobos": "Electronics > Electronics Accessories > Security > Sirens",
-    "Automatización e Intrusión > Cables > Todos": "Electronics > Electronics Accessories > Cables > Security Cables",
-    "Automatización e Intrusión > Paneles de Alarma > Todos": "Electronics > Electronics Accessories > Security > Alarm Panels",
-    "Automatización e Intrusión > Detectores / Sensores > Movimiento para Interior": "Electronics > Electronics Accessories > Security > Motion Detectors",
-    "Automatización e Intrusión > Detectores / Sensores > Movimiento para Exterior": "Electronics > Electronics Accessories > Security > Outdoor Motion Detectors",
-    "Automatización e Intrusión > Megafonía y Audioevacuación > EPCOM ProAudio": "Electronics > Electronics Accessories > Audio > Professional Audio",
+    # Buscar el mapeo más específico por prefijo de la ruta
+    convertida = buscar_en_indice(estado['indice'], categoria_limpia)
+    if convertida is not None:
+        return convertida
     
-    # Redes e IT - Específicos
-    "Redes e IT > Racks y Gabinetes > Accesorios para Racks y Gabinetes": "Electronics > Electronics Accessories > Cable Management > Rack Accessories",
-    "Redes e IT > Networking > Pólizas de Garantía": "Electronics > Electronics Accessories > Networking > Service Plans",
-    "Redes e IT > Networking > Switches PoE": "Electronics > Electronics Accessories > Networking > PoE Switches",
-    "Redes e IT > Networking > Transceptores de Fibra": "Electronics > Electronics Accessories > Networking > Fiber Transceivers",
-    "Redes e IT > Networking > Switches": "Electronics > Electronics Accessories > Networking > Switches",
-    "Redes e IT > Networking > Access Points": "Electronics > Electronics Accessories > Networking > Access Points",
-    "Redes e IT > Networking > Routers": "Electronics > Electronics Accessories > Networking > Routers",
-    "Redes e IT > Networking > Wireless": "Electronics > Electronics Accessories > Networking > Wireless Equipment",
+    # Última opción: la clave con más palabras en común
+    if UMBRAL_SIMILITUD <= 1:
+        coincidencia = estado['palabras'].mejor_coincidencia(categoria_limpia, UMBRAL_SIMILITUD)
+        if coincidencia:
+            clave, puntaje = coincidencia
+            logging.debug(f"Categoría '{categoria_limpia}' asociada a '{clave}' (similitud {puntaje:.2f})")
+            return estado['mapeo'][clave]
     
-    # Energía / Herramientas - Específicos
-    "Energía / Herramientas > Calidad de la Energía > Accesorios para Tierra Física": "Electronics > Electronics Accessories > Power > Grounding Accessories",
-    "Energía / Herramientas > UPS > Baterías": "Electronics > Electronics Accessories > Power > UPS Batteries",
-    "Energía / Herramientas > UPS > Interactivos": "Electronics > Electronics Accessories > Power > Interactive UPS",
-    "Energía / Herramientas > Reguladores > Todos": "Electronics > Electronics Accessories > Power > Voltage Regulators",
-    "Energía / Herramientas > Herramientas > Medición": "Electronics > Electronics Accessories > Test Equipment > Measurement Tools",
-}
+    # Si no encuentra mapeo, devolver la categoría original
+    return categoria_syscom
 
-# Agregar mapeos específicos al diccionario principal
-CATEGORY_MAPPING.update(SPECIFIC_CATEGORY_MAPPING)
 
 def convertir_categoria(categoria_syscom: str) -> str:
     """
@@ -271,32 +396,11 @@ def convertir_categoria(categoria_syscom: str) -> str:
     if not categoria_syscom:
         return categoria_syscom
     
-    # Limpiar la categoría de caracteres especiales y espacios extra
-    categoria_limpia = categoria_syscom.strip()
-    
-    # Buscar mapeo directo
-    if categoria_limpia in CATEGORY_MAPPING:
-        return CATEGORY_MAPPING[categoria_limpia]
+    _estado_vigente()
+    if INTERVALO_RECARGA > 0 and time.monotonic() - _ultima_revision > INTERVALO_RECARGA:
+        recargar_mapeo()
     
-    # Buscar mapeo parcial (por categoría principal)
-    for categoria_syscom_key, categoria_shopify in CATEGORY_MAPPING.items():
-        if categoria_limpia.startswith(categoria_syscom_key.split(' > ')[0]):
-            # Si encuentra la categoría principal, usar el mapeo más específico posible
-            partes_categoria = categoria_limpia.split(' > ')
-            if len(partes_categoria) >= 2:
-                # Buscar mapeo más específico
-                for key in CATEGORY_MAPPING:
-                    if key.startswith(f"{partes_categoria[0]} > {partes_categoria[1]}"):
-                        return CATEGORY_MAPPING[key]
-                        
-                # Si no encuentra específico, usar el de la categoría principal
-                categoria_principal = partes_categoria[0]
-                if categoria_principal in CATEGORY_MAPPING:
-                    return CATEGORY_MAPPING[categoria_principal]
-            break
-    
-    # Si no encuentra mapeo, devolver la categoría original
-    return categoria_syscom
+    return _convertir_categoria(categoria_syscom)
 
 def obtener_estadisticas_mapeo():
     """
@@ -308,8 +412,9 @@ def obtener_estadisticas_mapeo():
     categorias_principales = set()
     categorias_secundarias = set()
     categorias_terciarias = set()
+    mapeo = _estado_vigente()['mapeo']
     
-    for categoria in CATEGORY_MAPPING.keys():
+    for categoria in mapeo.keys():
         partes = categoria.split(' > ')
         if len(partes) >= 1:
             categorias_principales.add(partes[0])
@@ -319,12 +424,12 @@ def obtener_estadisticas_mapeo():
             categorias_terciarias.add(categoria)
     
     return {
-        'total_mapeos': len(CATEGORY_MAPPING),
+        'total_mapeos': len(mapeo),
         'categorias_principales': len(categorias_principales),
         'categorias_secundarias': len(categorias_secundarias),
         'categorias_terciarias': len(categorias_terciarias),
         'mapeos_principales': list(categorias_principales),
-        'ejemplo_mapeo': list(CATEGORY_MAPPING.items())[:5]
+        'ejemplo_mapeo': list(mapeo.items())[:5]
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Cola de productos fallidos (dead-letter) en SQLite
+Guarda la fila del CSV de cada producto que agotó sus reintentos junto con la clase de
+error y la última respuesta, para que las corridas siguientes lo reintenten primero con
+espera creciente en lugar de esperar a la próxima importación completa.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from politica_reintentos import VALIDACION
+
+# Espera antes del primer reintento diferido; se duplica en cada fallo hasta el máximo
+ESPERA_BASE = float(os.getenv('FALLIDOS_BACKOFF', 900))
+ESPERA_MAXIMA = 24 * 3600
+# Después de tantos fallos el producto queda en la cola solo para revisión manual
+INTENTOS_MAXIMOS = int(os.getenv('FALLIDOS_MAX_INTENTOS', 6))
+
+# Clases que no se reintentan solas: hace falta corregir el dato en el CSV
+CLASES_SIN_REINTENTO = (VALIDACION,)
+
+
+class ColaFallidos:
+    def __init__(self, ruta_db: str = 'fallidos_importacion.db'):
+        """Abrir (o crear) la cola"""
+        self.ruta_db = ruta_db
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(ruta_db, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._crear_esquema()
+        # Handles en cola, para no consultar la base con cada producto creado
+        self._handles = {fila[0] for fila in self.conn.execute("SELECT handle FROM fallidos")}
+
+    def _crear_esquema(self):
+        """Crear la tabla si no existe"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS fallidos (
+                    handle TEXT PRIMARY KEY,
+                    fila TEXT NOT NULL,
+                    clase TEXT,
+                    detalle TEXT,
+                    intentos INTEGER NOT NULL DEFAULT 1,
+                    primer_fallo TEXT NOT NULL,
+                    ultimo_fallo TEXT NOT NULL,
+                    proximo_intento REAL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_fallidos_proximo ON fallidos(proximo_intento)")
+
+    def _espera(self, intentos: int) -> float:
+        return min(ESPERA_MAXIMA, ESPERA_BASE * (2 ** (intentos - 1)))
+
+    def agregar(self, handle: str, fila: Dict, clase: Optional[str], detalle: Optional[str] = None):
+        """
+        Registrar un fallo; si el handle ya estaba en la cola se suma un intento
+
+        Args:
+            handle: Handle del producto
+            fila: Fila del CSV tal como se intentó enviar
+            clase: Clase de error (ver politica_reintentos)
+            detalle: Última respuesta o mensaje de error
+        """
+        if not handle:
+            return
+        ahora = datetime.now().isoformat()
+        with self._lock, self.conn:
+            previo = self.conn.execute("SELECT intentos FROM fallidos WHERE handle = ?", (handle,)).fetchone()
+            intentos = previo[0] + 1 if previo else 1
+            if clase in CLASES_SIN_REINTENTO or intentos > INTENTOS_MAXIMOS:
+                proximo = None
+            else:
+                proximo = time.time() + self._espera(intentos)
+            self.conn.execute("""
+                INSERT INTO fallidos (handle, fila, clase, detalle, intentos, primer_fallo, ultimo_fallo, proximo_intento)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(handle) DO UPDATE SET
+                    fila = excluded.fila, clase = excluded.clase, detalle = excluded.detalle,
+                    intentos = excluded.intentos, ultimo_fallo = excluded.ultimo_fallo,
+                    proximo_intento = excluded.proximo_intento
+            """, (handle, json.dumps(fila, ensure_ascii=False), clase, (detalle or '')[:2000],
+                  intentos, ahora, ahora, proximo))
+            self._handles.add(handle)
+
+    def quitar(self, handle: str):
+        """Sacar un handle de la cola (se creó o ya existía en la tienda)"""
+        if handle not in self._handles:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM fallidos WHERE handle = ?", (handle,))
+            self._handles.discard(handle)
+
+    def contiene(self, handle: str) -> bool:
+        """True si el handle sigue en la cola"""
+        return handle in self._handles
+
+    def pendientes(self, limite: Optional[int] = None) -> List[Dict]:
+        """Filas cuya espera ya venció, de la más antigua a la más nueva"""
+        consulta = "SELECT fila FROM fallidos WHERE proximo_intento IS NOT NULL AND proximo_intento <= ? ORDER BY proximo_intento"
+        parametros = (time.time(),)
+        if limite:
+            consulta += " LIMIT ?"
+            parametros += (limite,)
+        with self._lock:
+            filas = self.conn.execute(consulta, parametros).fetchall()
+        return [json.loads(fila) for fila, in filas]
+
+    def resumen(self) -> Dict[str, int]:
+        """Productos en cola por clase de error"""
+        with self._lock:
+            filas = self.conn.execute("SELECT COALESCE(clase, '?'), COUNT(*) FROM fallidos GROUP BY clase").fetchall()
+        return dict(filas)
+
+    def total(self) -> int:
+        """Productos en la cola"""
+        return len(self._handles)
+
+    def cerrar(self):
+        """Cerrar la conexión a la cola"""
+        self.conn.close()
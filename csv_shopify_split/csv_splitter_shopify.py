@@ -1,25 +1,35 @@
 #!/usr/bin/env python3
 """
 CSV Splitter para Shopify - v1.0
-Descarga CSV grande y lo divide en archivos pequeños de 2000 líneas
+Descarga CSV grande y lo divide en archivos por debajo del límite de tamaño de Shopify
 Cada archivo está listo para importar a Shopify
 """
 
 import os
 import csv
+import io
 import requests
 import logging
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from dotenv import load_dotenv
 import re
 import sys
 import shutil
 import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
 # Agregar el directorio padre al path para importar category_mapping
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from category_mapping import convertir_categoria
+from descarga_csv import DescargaCSV
+from delta_sync import aplicar_delta
+from lector_csv import LectorCatalogo, detectar_encoding
+from normalizacion_texto import fix_encoding_issues
+from snapshots_catalogo import AlmacenSnapshots
 
 # Configurar logging
 logging.basicConfig(
@@ -34,11 +44,253 @@ logging.basicConfig(
 # Cargar variables de entorno
 load_dotenv()
 
+# Mapeo de campos comunes de CSV personalizados a columnas Shopify
+MAPEO_FORMATO_PERSONALIZADO = {
+    # Campos principales
+    'Codigo': 'Variant SKU',
+    'SKU': 'Variant SKU', 
+    'Nombre': 'Title',
+    'Titulo': 'Title',
+    'Title': 'Title',
+    'Descripcion': 'Body (HTML)',
+    'Description': 'Body (HTML)',
+    'Precio': 'Variant Price',
+    'Price': 'Variant Price',
+    'Stock': 'Variant Inventory Qty',
+    'Inventory': 'Variant Inventory Qty',
+    'Cantidad': 'Variant Inventory Qty',
+    'Marca': 'Vendor',
+    'Brand': 'Vendor',
+    'Categoria': 'Product Category',
+    'Category': 'Product Category',
+    'Categorias': 'Product Category',
+    'Categories': 'Product Category',
+    'Categoria_Syscom': 'Product Category',
+    'Categoria_Principal': 'Product Category',
+    'Imagen': 'Image Src',
+    'Image': 'Image Src',
+    'URL_Imagen': 'Image Src',
+}
+
+# Columnas que se conservan al limpiar un producto (origen -> columna Shopify)
+CAMPOS_SHOPIFY = {
+    'Handle': 'Handle',
+    'Title': 'Title',
+    'Body (HTML)': 'Body (HTML)',
+    'Vendor': 'Vendor',
+    'Product Category': 'Product Category',
+    'Type': 'Type',
+    'Tags': 'Tags',
+    'Option1 Name': 'Option1 Name',
+    'Option1 Value': 'Option1 Value',
+    'Variant SKU': 'Variant SKU',
+    'Variant Grams': 'Variant Grams',
+    'Variant Inventory Tracker': 'Variant Inventory Tracker',
+    'Variant Inventory Qty': 'Variant Inventory Qty',
+    'Variant Inventory Policy': 'Variant Inventory Policy',
+    'Variant Fulfillment Service': 'Variant Fulfillment Service',
+    'Variant Price': 'Variant Price',
+    'Variant Compare At Price': 'Variant Compare At Price',
+    'Variant Requires Shipping': 'Variant Requires Shipping',
+    'Variant Taxable': 'Variant Taxable',
+    'Variant Barcode': 'Variant Barcode',
+    'Image Src': 'Image Src',
+    'Image Position': 'Image Position',
+    'Image Alt Text': 'Image Alt Text',
+    'Gift Card': 'Gift Card',
+    'SEO Title': 'SEO Title',
+    'SEO Description': 'SEO Description',
+    'Google Shopping / Google Product Category': 'Google Shopping / Google Product Category',
+    'Google Shopping / Gender': 'Google Shopping / Gender',
+    'Google Shopping / Age Group': 'Google Shopping / Age Group',
+    'Google Shopping / MPN': 'Google Shopping / MPN',
+    'Google Shopping / AdWords Grouping': 'Google Shopping / AdWords Grouping',
+    'Google Shopping / AdWords Labels': 'Google Shopping / AdWords Labels',
+    'Google Shopping / Condition': 'Google Shopping / Condition',
+    'Google Shopping / Custom Product': 'Google Shopping / Custom Product',
+    'Google Shopping / Custom Label 0': 'Google Shopping / Custom Label 0',
+    'Google Shopping / Custom Label 1': 'Google Shopping / Custom Label 1',
+    'Google Shopping / Custom Label 2': 'Google Shopping / Custom Label 2',
+    'Google Shopping / Custom Label 3': 'Google Shopping / Custom Label 3',
+    'Google Shopping / Custom Label 4': 'Google Shopping / Custom Label 4',
+    'Variant Image': 'Variant Image',
+    'Variant Weight Unit': 'Variant Weight Unit',
+    'Variant Tax Code': 'Variant Tax Code',
+    'Cost per item': 'Cost per item',
+    'Status': 'Status'
+}
+
+# Columnas que van primero en los CSV generados; el resto va en orden alfabético
+CAMPOS_PRIORITARIOS = ['Handle', 'Title', 'Body (HTML)', 'Vendor', 'Product Category', 'Type', 'Tags']
+
+# Esquema fijo de los CSV generados, conocido antes de leer el primer producto
+ESQUEMA_SHOPIFY = CAMPOS_PRIORITARIOS + sorted(set(CAMPOS_SHOPIFY.values()) - set(CAMPOS_PRIORITARIOS))
+
+# Productos (handles) que limpia cada tarea del pool con --jobs
+GRUPOS_POR_BLOQUE = 500
+
+
+def limpiar_producto(producto: Dict) -> Dict:
+    """Limpiar y optimizar datos del producto para Shopify (función de módulo para los procesos del pool)"""
+    producto_limpio = {}
+    
+    # Copiar campos existentes
+    for campo_original, campo_shopify in CAMPOS_SHOPIFY.items():
+        if campo_original in producto:
+            valor = producto[campo_original]
+            if valor:  # Solo si tiene valor
+                # Aplicar corrección de encoding
+                if isinstance(valor, str):
+                    valor = fix_encoding_issues(valor)
+                producto_limpio[campo_shopify] = valor
+    
+    # Valores por defecto para campos requeridos
+    if 'Handle' not in producto_limpio and 'Title' in producto_limpio:
+        # Generar handle desde título
+        titulo = producto_limpio['Title']
+        handle = re.sub(r'[^a-z0-9\s-]', '', titulo.lower())
+        handle = re.sub(r'\s+', '-', handle).strip('-')
+        producto_limpio['Handle'] = handle[:255]
+    
+    # Fila extra de un producto de varias filas: solo lleva lo que trae (p. ej. otra imagen)
+    if 'Title' not in producto_limpio and not any(
+        campo in producto_limpio for campo in ('Variant SKU', 'Variant Price', 'Option1 Value')
+    ):
+        return producto_limpio
+    
+    if 'Variant Inventory Tracker' not in producto_limpio:
+        producto_limpio['Variant Inventory Tracker'] = 'shopify'
+    
+    if 'Variant Inventory Policy' not in producto_limpio:
+        producto_limpio['Variant Inventory Policy'] = 'deny'
+    
+    if 'Variant Fulfillment Service' not in producto_limpio:
+        producto_limpio['Variant Fulfillment Service'] = 'manual'
+    
+    if 'Variant Requires Shipping' not in producto_limpio:
+        producto_limpio['Variant Requires Shipping'] = 'TRUE'
+    
+    if 'Variant Taxable' not in producto_limpio:
+        producto_limpio['Variant Taxable'] = 'TRUE'
+    
+    if 'Status' not in producto_limpio and 'Title' in producto_limpio:
+        producto_limpio['Status'] = 'active'
+    
+    return producto_limpio
+
+
+def iterar_grupos_por_handle(productos: Iterable[Dict]) -> Iterator[List[Dict]]:
+    """Agrupar filas consecutivas con el mismo Handle (producto con varias imágenes o variantes)"""
+    grupo = []
+    for producto in productos:
+        if grupo and producto.get('Handle') != grupo[0].get('Handle'):
+            yield grupo
+            grupo = []
+        grupo.append(producto)
+    if grupo:
+        yield grupo
+
+
+class EscritorPartes:
+    """Escribe grupos de filas ya limpias en partes CSV que no pasan de un tamaño máximo"""
+    
+    def __init__(self, directorio: str, prefijo: str, bytes_maximo: int, lineas_maximo: int = 0):
+        self.directorio = directorio
+        self.prefijo = prefijo
+        self.bytes_maximo = bytes_maximo
+        self.lineas_maximo = lineas_maximo
+        self.partes: List[Tuple[str, int, int]] = []
+        self.archivo = None
+        self.bytes_parte = 0
+        self.filas_parte = 0
+        
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(self.buffer, fieldnames=ESQUEMA_SHOPIFY)
+        self.writer.writeheader()
+        self.encabezado = self.buffer.getvalue().encode('utf-8')
+    
+    def _cerrar_parte(self):
+        self.archivo.close()
+        self.archivo = None
+        self.partes[-1] = (self.partes[-1][0], self.filas_parte, self.bytes_parte)
+        logging.info(f"📝 Parte {os.path.basename(self.partes[-1][0])} escrita "
+                     f"({self.filas_parte} filas, {self.bytes_parte / 1024 / 1024:.1f} MB)")
+    
+    def agregar_grupo(self, filas: List[Dict]):
+        """Escribir las filas (diccionarios) de un Handle, abriendo una parte nueva si no caben en la actual"""
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        for fila in filas:
+            self.writer.writerow(fila)
+        self.agregar_datos(self.buffer.getvalue().encode('utf-8'), len(filas), filas[0].get('Handle'))
+    
+    def agregar_filas(self, filas: List[List[str]], handle: Optional[str] = None):
+        """Igual que agregar_grupo, con filas que ya vienen como listas en el orden de ESQUEMA_SHOPIFY"""
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writer.writerows(filas)
+        self.agregar_datos(self.buffer.getvalue().encode('utf-8'), len(filas), handle)
+    
+    def agregar_datos(self, datos: bytes, filas: int, handle: Optional[str] = None):
+        """Igual que agregar_grupo, con las filas de un Handle ya convertidas a CSV (ver limpiar_bloque)"""
+        excede_bytes = self.bytes_parte + len(datos) > self.bytes_maximo
+        excede_filas = self.lineas_maximo and self.filas_parte + filas > self.lineas_maximo
+        if self.archivo is None or (self.filas_parte and (excede_bytes or excede_filas)):
+            if self.archivo:
+                self._cerrar_parte()
+            ruta = os.path.join(self.directorio, f"{self.prefijo}_{len(self.partes) + 1:03d}.csv")
+            self.archivo = open(ruta, 'wb')
+            self.archivo.write(self.encabezado)
+            self.partes.append((ruta, 0, 0))
+            self.bytes_parte = len(self.encabezado)
+            self.filas_parte = 0
+        
+        if self.bytes_parte + len(datos) > self.bytes_maximo:
+            logging.warning(f"⚠️ El producto {handle} solo ya supera el tamaño máximo por archivo")
+        
+        self.archivo.write(datos)
+        self.bytes_parte += len(datos)
+        self.filas_parte += filas
+    
+    def cerrar(self) -> List[Tuple[str, int, int]]:
+        """Cerrar la parte abierta y devolver (ruta, filas, bytes) de cada parte escrita"""
+        if self.archivo:
+            self._cerrar_parte()
+        return self.partes
+
+
+def limpiar_bloque(grupos: List[List[Dict]]) -> List[Tuple[bytes, int, Optional[str]]]:
+    """
+    Limpiar un bloque de productos en un proceso del pool y devolver cada Handle ya en CSV
+
+    Son los mismos bytes que escribiría EscritorPartes.agregar_grupo, así que el proceso
+    principal corta las partes con el tamaño exacto, igual que sin --jobs.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=ESQUEMA_SHOPIFY)
+    resultado = []
+    for grupo in grupos:
+        filas = [limpiar_producto(producto) for producto in grupo]
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(filas)
+        resultado.append((buffer.getvalue().encode('utf-8'), len(filas), filas[0].get('Handle')))
+    return resultado
+
+
 class CSVSplitterShopify:
-    def __init__(self):
+    def __init__(self, solo_cambios: bool = False, jobs: int = 1, motor: str = 'filas'):
         """Inicializar el divisor de CSV"""
         self.csv_url = os.getenv('CSV_URL')
-        self.lineas_por_archivo = 2000
+        # Shopify rechaza CSV de más de 15 MB: se corta por tamaño, dejando margen
+        self.bytes_por_archivo = int(os.getenv('SPLIT_MAX_BYTES', 14 * 1024 * 1024))
+        # Tope opcional de filas por archivo (0 = sin tope, solo cuenta el tamaño)
+        self.lineas_por_archivo = int(os.getenv('SPLIT_MAX_LINES', 0))
+        self.solo_cambios = solo_cambios
+        # Procesos que limpian productos en paralelo (1 = en este mismo proceso)
+        self.jobs = max(1, jobs)
+        # 'filas' (streaming, memoria constante) o 'pandas' (operaciones por columna)
+        self.motor = motor
         self.directorio_salida = "csv_shopify_split"
         
         # Configuración de descarga
@@ -67,102 +319,41 @@ class CSVSplitterShopify:
     
     def fix_encoding_issues(self, texto: str) -> str:
         """Corregir problemas comunes de encoding UTF-8"""
-        if not texto:
-            return texto
-            
-        # Tabla de correcciones comunes para problemas UTF-8
-        correcciones = {
-            'Ã¡': 'á', 'Ã ': 'à', 'Ã¢': 'â', 'Ã£': 'ã', 'Ã¤': 'ä',
-            'Ã©': 'é', 'Ã¨': 'è', 'Ãª': 'ê', 'Ã«': 'ë',
-            'Ã­': 'í', 'Ã¬': 'ì', 'Ã®': 'î', 'Ã¯': 'ï',
-            'Ã³': 'ó', 'Ã²': 'ò', 'Ã´': 'ô', 'Ãµ': 'õ', 'Ã¶': 'ö',
-            'Ãº': 'ú', 'Ã¹': 'ù', 'Ã»': 'û', 'Ã¼': 'ü',
-            'Ã±': 'ñ', 'Ã§': 'ç',
-            'Ã³n': 'ón', 'Ã±o': 'ño', 'Ã©s': 'és', 'Ã¡s': 'ás'
-        }
-        
-        # Aplicar correcciones
-        texto_corregido = texto
-        for incorrecto, correcto in correcciones.items():
-            texto_corregido = texto_corregido.replace(incorrecto, correcto)
-        
-        # Limpiar caracteres de control y espacios extra
-        texto_corregido = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', texto_corregido)
-        texto_corregido = re.sub(r'\s+', ' ', texto_corregido).strip()
-        
-        return texto_corregido
+        return fix_encoding_issues(texto)
     
     def descargar_csv(self) -> Optional[str]:
         """Descargar CSV desde URL o usar archivo local con manejo inteligente de restricciones"""
-        # Intentar descarga desde URL
+        # Intentar descarga desde URL (streaming y condicional, ver descarga_csv.py)
         if self.csv_url:
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'CSV-Splitter-Shopify/1.0',
+                'Accept': 'text/csv, application/csv, text/plain, */*'
+            })
+            descarga = DescargaCSV(self.csv_url, "ProductosHora.csv", session, self.timeout)
+            # Cada versión del CSV queda en el almacén de snapshots (comprimida y sin duplicados)
+            snapshots = AlmacenSnapshots()
+
             for intento in range(self.max_retries):
                 try:
                     logging.info(f"🔗 Descargando CSV desde URL (intento {intento + 1})...")
-                    
-                    session = requests.Session()
-                    session.headers.update({
-                        'User-Agent': 'CSV-Splitter-Shopify/1.0',
-                        'Accept': 'text/csv, application/csv, text/plain, */*'
-                    })
-                    
-                    response = session.get(self.csv_url, timeout=self.timeout)
-                    
-                    if response.status_code == 200:
-                        # Verificar si es realmente CSV y no HTML (error del servidor)
-                        content_text = response.text.strip()
-                        content_type = response.headers.get('content-type', '').lower()
-                        
-                        # Detectar si es HTML (restricción del servidor)
-                        if (content_text.startswith('<!DOCTYPE html>') or 
-                            content_text.startswith('<html') or
-                            '<html' in content_text[:100] or
-                            'text/html' in content_type):
-                            
-                            logging.warning(f"⚠️ Servidor devolvió HTML en lugar de CSV (restricción de descarga)")
-                            logging.info("📋 Parece que hay límite de 1 descarga por hora")
-                            break  # Salir del loop de reintentos
-                        
-                        # Verificar si es CSV válido
-                        elif ('csv' in content_type or 
-                              content_text.count(',') > content_text.count(';') and
-                              '\n' in content_text and
-                              not content_text.startswith('<')):
-                            
-                            # Es un CSV válido - guardarlo y reemplazar el existente
-                            archivo_csv_local = "ProductosHora.csv"
-                            
-                            # Hacer backup del archivo existente si existe
-                            if os.path.exists(archivo_csv_local):
-                                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                                backup_name = f"ProductosHora_backup_{timestamp}.csv"
-                                try:
-                                    import shutil
-                                    shutil.copy2(archivo_csv_local, backup_name)
-                                    logging.info(f"📁 Backup creado: {backup_name}")
-                                except Exception as e:
-                                    logging.warning(f"⚠️ No se pudo crear backup: {e}")
-                            
-                            # Guardar el nuevo CSV
-                            with open(archivo_csv_local, 'w', encoding='utf-8', newline='') as f:
-                                f.write(content_text)
-                            
-                            logging.info(f"✅ CSV descargado y actualizado: {archivo_csv_local}")
-                            return archivo_csv_local
-                        else:
-                            logging.warning(f"⚠️ Contenido no parece CSV válido")
-                    else:
-                        logging.warning(f"⚠️ Error HTTP: {response.status_code}")
-                        
+                    resultado = descarga.descargar(al_reemplazar=snapshots.guardar)
+                    if resultado['estado'] == 'descargado':
+                        snapshots.guardar(resultado['ruta'])
+
+                    if resultado['estado'] in ('vigente', 'no_modificado', 'descargado'):
+                        return resultado['ruta']
+                    if resultado['estado'] == 'html':
+                        break  # Salir del loop de reintentos
+
                 except requests.exceptions.Timeout:
                     logging.warning(f"⏰ Timeout en intento {intento + 1}")
                 except Exception as e:
                     logging.warning(f"⚠️ Error en intento {intento + 1}: {e}")
-                
+
                 if intento < self.max_retries - 1:
-                    import time
                     time.sleep(2 ** intento)  # Backoff exponencial
-        
+
         # Usar archivo local como fallback (orden de prioridad específico)
         archivos_locales = [
             "ProductosHora.csv",  # Prioridad máxima
@@ -193,203 +384,202 @@ class CSVSplitterShopify:
         logging.error("❌ No se pudo obtener archivo CSV válido")
         return None
     
+    def _abrir_lector(self, archivo_csv: str) -> Optional[Tuple[LectorCatalogo, str]]:
+        """Detectar encoding y delimitador, descartar HTML y devolver (lector, encoding)"""
+        encoding = detectar_encoding(archivo_csv)
+        if not encoding:
+            logging.error("❌ No se pudo parsear el CSV con ningún encoding")
+            return None
+        
+        with open(archivo_csv, 'r', encoding=encoding, newline='') as f:
+            # Leer una muestra más grande para detectar formato
+            sample = f.read(2048)
+        
+        # Verificar que no sea HTML
+        if (sample.strip().startswith('<!DOCTYPE html>') or 
+            sample.strip().startswith('<html') or
+            '<html' in sample[:200]):
+            logging.error(f"❌ El archivo {archivo_csv} contiene HTML en lugar de CSV")
+            return None
+        
+        # Detectar delimitador
+        delimiter = ','
+        if sample.count(';') > sample.count(','):
+            delimiter = ';'
+        elif sample.count('\t') > sample.count(','):
+            delimiter = '\t'
+        
+        # Las filas salen de la copia columnar si este mismo contenido ya se leyó antes
+        reader = LectorCatalogo(archivo_csv, encoding, delimiter)
+        if not reader.fieldnames:
+            logging.error("❌ No se pudo parsear el CSV con ningún encoding")
+            return None
+        
+        logging.info(f"📋 Columnas detectadas ({encoding}): {list(reader.fieldnames)[:5]}...")
+        return reader, encoding
+    
+    def _detectar_formato(self, columnas: List[str]) -> Optional[str]:
+        """'shopify', 'convertible' o None si el formato no se reconoce"""
+        # Verificar si es formato Shopify válido O formato que podemos convertir
+        campos_shopify = ['Handle', 'Title', 'Variant Price', 'Variant Inventory Qty']
+        campos_alternativos = ['Codigo', 'Nombre', 'Precio', 'Stock', 'Descripcion', 'SKU']
+        
+        if any(campo in columnas for campo in campos_shopify):
+            return 'shopify'
+        if any(campo in columnas for campo in campos_alternativos):
+            return 'convertible'
+        return None
+    
+    def iterar_csv(self, archivo_csv: str) -> Iterator[Dict]:
+        """Leer el CSV fila por fila, convirtiendo cada producto sin cargar el archivo completo"""
+        abierto = self._abrir_lector(archivo_csv)
+        if not abierto:
+            return
+        reader, encoding = abierto
+        columnas = list(reader.fieldnames)
+        formato = self._detectar_formato(columnas)
+        
+        leidos = 0
+        if formato == 'shopify':
+            # Verificar y convertir categorías incluso en archivos Shopify
+            logging.info("🔄 Verificando y convirtiendo categorías en formato Shopify...")
+            for producto in reader:
+                leidos += 1
+                yield self._convertir_categoria_producto(producto)
+            logging.info(f"✅ CSV Shopify parseado con {encoding}: {leidos} productos")
+        elif formato == 'convertible':
+            logging.info(f"📋 Detectado formato no-Shopify convertible con {encoding}")
+            logging.info("🔄 Convirtiendo formato personalizado a Shopify...")
+            for producto_raw in reader:
+                yield self._convertir_fila_a_shopify(producto_raw, leidos)
+                leidos += 1
+            logging.info(f"✅ CSV convertido a Shopify con {encoding}: {leidos} productos")
+        else:
+            logging.warning(f"⚠️ Formato no reconocido con {encoding}")
+            logging.info(f"📋 Columnas disponibles: {', '.join(columnas)}")
+    
     def parsear_csv(self, archivo_csv: str) -> List[Dict]:
         """Parsear CSV con manejo robusto de encoding y formatos"""
-        productos = []
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        
-        for encoding in encodings:
-            try:
-                with open(archivo_csv, 'r', encoding=encoding, newline='') as f:
-                    # Leer una muestra más grande para detectar formato
-                    sample = f.read(2048)
-                    f.seek(0)
-                    
-                    # Verificar que no sea HTML
-                    if (sample.strip().startswith('<!DOCTYPE html>') or 
-                        sample.strip().startswith('<html') or
-                        '<html' in sample[:200]):
-                        logging.error(f"❌ El archivo {archivo_csv} contiene HTML en lugar de CSV")
-                        continue
-                    
-                    # Detectar delimitador
-                    delimiter = ','
-                    if sample.count(';') > sample.count(','):
-                        delimiter = ';'
-                    elif sample.count('\t') > sample.count(','):
-                        delimiter = '\t'
-                    
-                    # Intentar leer como CSV
-                    reader = csv.DictReader(f, delimiter=delimiter)
-                    
-                    if reader.fieldnames:
-                        columnas = list(reader.fieldnames)
-                        logging.info(f"📋 Columnas detectadas ({encoding}): {columnas[:5]}...")
-                        
-                        # Verificar si es formato Shopify válido O formato que podemos convertir
-                        campos_shopify = ['Handle', 'Title', 'Variant Price', 'Variant Inventory Qty']
-                        campos_alternativos = ['Codigo', 'Nombre', 'Precio', 'Stock', 'Descripcion', 'SKU']
-                        
-                        es_shopify = any(campo in columnas for campo in campos_shopify)
-                        es_convertible = any(campo in columnas for campo in campos_alternativos)
-                        
-                        if es_shopify:
-                            productos = list(reader)
-                            # Verificar y convertir categorías incluso en archivos Shopify
-                            productos = self.convertir_categorias_shopify(productos)
-                            logging.info(f"✅ CSV Shopify parseado con {encoding}: {len(productos)} productos")
-                            return productos
-                        elif es_convertible:
-                            logging.info(f"📋 Detectado formato no-Shopify convertible con {encoding}")
-                            productos_raw = list(reader)
-                            productos = self.convertir_a_formato_shopify(productos_raw, columnas)
-                            logging.info(f"✅ CSV convertido a Shopify con {encoding}: {len(productos)} productos")
-                            return productos
-                        else:
-                            logging.warning(f"⚠️ Formato no reconocido con {encoding}")
-                            logging.info(f"📋 Columnas disponibles: {', '.join(columnas)}")
-                            
-            except Exception as e:
-                logging.debug(f"Error con encoding {encoding}: {e}")
-                continue
-                
-        logging.error("❌ No se pudo parsear el CSV con ningún encoding")
-        return []
+        return list(self.iterar_csv(archivo_csv))
     
     def convertir_a_formato_shopify(self, productos_raw: List[Dict], columnas: List[str]) -> List[Dict]:
         """Convertir CSV de formato personalizado a formato Shopify"""
-        productos_shopify = []
-        
-        # Mapeo de campos comunes
-        mapeo_campos = {
-            # Campos principales
-            'Codigo': 'Variant SKU',
-            'SKU': 'Variant SKU', 
-            'Nombre': 'Title',
-            'Titulo': 'Title',
-            'Title': 'Title',
-            'Descripcion': 'Body (HTML)',
-            'Description': 'Body (HTML)',
-            'Precio': 'Variant Price',
-            'Price': 'Variant Price',
-            'Stock': 'Variant Inventory Qty',
-            'Inventory': 'Variant Inventory Qty',
-            'Cantidad': 'Variant Inventory Qty',
-            'Marca': 'Vendor',
-            'Brand': 'Vendor',
-            'Categoria': 'Product Category',
-            'Category': 'Product Category',
-            'Categorias': 'Product Category',
-            'Categories': 'Product Category',
-            'Categoria_Syscom': 'Product Category',
-            'Categoria_Principal': 'Product Category',
-            'Imagen': 'Image Src',
-            'Image': 'Image Src',
-            'URL_Imagen': 'Image Src',
-        }
-        
         logging.info("🔄 Convirtiendo formato personalizado a Shopify...")
-        
-        for i, producto_raw in enumerate(productos_raw):
-            producto_shopify = {}
-            
-            # Aplicar mapeo de campos
-            for campo_original, campo_shopify in mapeo_campos.items():
-                if campo_original in producto_raw and producto_raw[campo_original]:
-                    valor = str(producto_raw[campo_original]).strip()
-                    if valor:
-                        # Aplicar mapeo especial para categorías
-                        if campo_shopify == 'Product Category':
-                            categoria_original = valor
-                            valor = convertir_categoria(valor)
-                            
-                            # Registrar estadísticas de mapeo
-                            if valor != categoria_original:
-                                self.categorias_convertidas += 1
-                                # Guardar ejemplos de conversión (máximo 10)
-                                if len(self.ejemplos_conversion) < 10:
-                                    self.ejemplos_conversion[categoria_original] = valor
-                                logging.debug(f"Categoría convertida: {categoria_original} → {valor}")
-                            else:
-                                self.categorias_sin_mapeo += 1
-                                logging.debug(f"Categoría sin mapeo: {categoria_original}")
+        return [self._convertir_fila_a_shopify(producto_raw, i) for i, producto_raw in enumerate(productos_raw)]
+    
+    def _convertir_fila_a_shopify(self, producto_raw: Dict, i: int) -> Dict:
+        """Convertir una fila de formato personalizado a formato Shopify"""
+        producto_shopify = {}
+        
+        # Aplicar mapeo de campos
+        for campo_original, campo_shopify in MAPEO_FORMATO_PERSONALIZADO.items():
+            if campo_original in producto_raw and producto_raw[campo_original]:
+                valor = str(producto_raw[campo_original]).strip()
+                if valor:
+                    # Aplicar mapeo especial para categorías
+                    if campo_shopify == 'Product Category':
+                        categoria_original = valor
+                        valor = convertir_categoria(valor)
                         
-                        producto_shopify[campo_shopify] = valor
-            
-            # Generar campos obligatorios si no existen
-            if 'Title' not in producto_shopify:
-                # Buscar cualquier campo que pueda ser título
-                for campo in ['Nombre', 'Titulo', 'Descripcion', 'Description']:
-                    if campo in producto_raw and producto_raw[campo]:
-                        producto_shopify['Title'] = str(producto_raw[campo])[:100]
-                        break
-                else:
-                    producto_shopify['Title'] = f"Producto {i+1}"
-            
-            # Generar Handle desde título
-            if 'Title' in producto_shopify:
-                titulo = producto_shopify['Title']
-                handle = re.sub(r'[^a-z0-9\s-]', '', titulo.lower())
-                handle = re.sub(r'\s+', '-', handle).strip('-')
-                producto_shopify['Handle'] = handle[:100]
-            
-            # Campos por defecto requeridos por Shopify
-            if 'Variant Inventory Tracker' not in producto_shopify:
-                producto_shopify['Variant Inventory Tracker'] = 'shopify'
-            if 'Variant Inventory Policy' not in producto_shopify:
-                producto_shopify['Variant Inventory Policy'] = 'deny'
-            if 'Variant Fulfillment Service' not in producto_shopify:
-                producto_shopify['Variant Fulfillment Service'] = 'manual'
-            if 'Variant Requires Shipping' not in producto_shopify:
-                producto_shopify['Variant Requires Shipping'] = 'TRUE'
-            if 'Variant Taxable' not in producto_shopify:
-                producto_shopify['Variant Taxable'] = 'TRUE'
-            if 'Status' not in producto_shopify:
-                producto_shopify['Status'] = 'active'
-            
-            productos_shopify.append(producto_shopify)
-        
-        return productos_shopify
+                        # Registrar estadísticas de mapeo
+                        if valor != categoria_original:
+                            self.categorias_convertidas += 1
+                            # Guardar ejemplos de conversión (máximo 10)
+                            if len(self.ejemplos_conversion) < 10:
+                                self.ejemplos_conversion[categoria_original] = valor
+                            logging.debug(f"Categoría convertida: {categoria_original} → {valor}")
+                        else:
+                            self.categorias_sin_mapeo += 1
+                            logging.debug(f"Categoría sin mapeo: {categoria_original}")
+                    
+                    producto_shopify[campo_shopify] = valor
+        
+        # Generar campos obligatorios si no existen
+        if 'Title' not in producto_shopify:
+            # Buscar cualquier campo que pueda ser título
+            for campo in ['Nombre', 'Titulo', 'Descripcion', 'Description']:
+                if campo in producto_raw and producto_raw[campo]:
+                    producto_shopify['Title'] = str(producto_raw[campo])[:100]
+                    break
+            else:
+                producto_shopify['Title'] = f"Producto {i+1}"
+        
+        # Generar Handle desde título
+        if 'Title' in producto_shopify:
+            titulo = producto_shopify['Title']
+            handle = re.sub(r'[^a-z0-9\s-]', '', titulo.lower())
+            handle = re.sub(r'\s+', '-', handle).strip('-')
+            producto_shopify['Handle'] = handle[:100]
+        
+        # Campos por defecto requeridos por Shopify
+        if 'Variant Inventory Tracker' not in producto_shopify:
+            producto_shopify['Variant Inventory Tracker'] = 'shopify'
+        if 'Variant Inventory Policy' not in producto_shopify:
+            producto_shopify['Variant Inventory Policy'] = 'deny'
+        if 'Variant Fulfillment Service' not in producto_shopify:
+            producto_shopify['Variant Fulfillment Service'] = 'manual'
+        if 'Variant Requires Shipping' not in producto_shopify:
+            producto_shopify['Variant Requires Shipping'] = 'TRUE'
+        if 'Variant Taxable' not in producto_shopify:
+            producto_shopify['Variant Taxable'] = 'TRUE'
+        if 'Status' not in producto_shopify:
+            producto_shopify['Status'] = 'active'
+        
+        return producto_shopify
     
     def convertir_categorias_shopify(self, productos: List[Dict]) -> List[Dict]:
         """Convertir categorías en archivos que ya están en formato Shopify"""
         logging.info("🔄 Verificando y convirtiendo categorías en formato Shopify...")
         
         for producto in productos:
-            if 'Product Category' in producto and producto['Product Category']:
-                categoria_original = producto['Product Category']
-                categoria_convertida = convertir_categoria(categoria_original)
-                
-                # Registrar estadísticas de mapeo
-                if categoria_convertida != categoria_original:
-                    self.categorias_convertidas += 1
-                    # Guardar ejemplos de conversión (máximo 10)
-                    if len(self.ejemplos_conversion) < 10:
-                        self.ejemplos_conversion[categoria_original] = categoria_convertida
-                    logging.debug(f"Categoría convertida: {categoria_original} → {categoria_convertida}")
-                    producto['Product Category'] = categoria_convertida
-                else:
-                    self.categorias_sin_mapeo += 1
-                    logging.debug(f"Categoría sin mapeo: {categoria_original}")
+            self._convertir_categoria_producto(producto)
         
         return productos
     
-    def filtrar_productos_con_stock(self, productos: List[Dict]) -> List[Dict]:
-        """Filtrar productos que tienen stock disponible"""
-        productos_filtrados = []
-        productos_sin_stock = 0
+    def _convertir_categoria_producto(self, producto: Dict) -> Dict:
+        """Convertir la categoría de un producto que ya está en formato Shopify"""
+        if 'Product Category' in producto and producto['Product Category']:
+            categoria_original = producto['Product Category']
+            categoria_convertida = convertir_categoria(categoria_original)
+            
+            # Registrar estadísticas de mapeo
+            if categoria_convertida != categoria_original:
+                self.categorias_convertidas += 1
+                # Guardar ejemplos de conversión (máximo 10)
+                if len(self.ejemplos_conversion) < 10:
+                    self.ejemplos_conversion[categoria_original] = categoria_convertida
+                logging.debug(f"Categoría convertida: {categoria_original} → {categoria_convertida}")
+                producto['Product Category'] = categoria_convertida
+            else:
+                self.categorias_sin_mapeo += 1
+                logging.debug(f"Categoría sin mapeo: {categoria_original}")
+        
+        return producto
+    
+    def iterar_con_stock(self, productos: Iterable[Dict]) -> Iterator[Dict]:
+        """Dejar pasar solo los productos con stock, actualizando las estadísticas"""
+        # Intentar diferentes nombres de columna para stock
+        stock_campos = [
+            'Variant Inventory Qty',
+            'Inventory Qty',
+            'Stock',
+            'Quantity',
+            'Available'
+        ]
+        
+        handle_anterior = None
+        anterior_incluido = False
         
         for producto in productos:
+            # Las filas extra de un producto (imágenes, variantes) siguen a su primera fila
+            handle = producto.get('Handle')
+            if handle and handle == handle_anterior and not producto.get('Title'):
+                if anterior_incluido:
+                    yield producto
+                continue
+            handle_anterior = handle
+            
             try:
-                # Intentar diferentes nombres de columna para stock
-                stock_campos = [
-                    'Variant Inventory Qty',
-                    'Inventory Qty',
-                    'Stock',
-                    'Quantity',
-                    'Available'
-                ]
-                
                 stock = 0
                 for campo in stock_campos:
                     if campo in producto and producto[campo]:
@@ -398,158 +588,99 @@ class CSVSplitterShopify:
                             break
                         except (ValueError, TypeError):
                             continue
-                
-                if stock > 0:
-                    productos_filtrados.append(producto)
-                    self.stats['productos_con_stock'] += 1
-                else:
-                    productos_sin_stock += 1
-                    self.stats['productos_sin_stock'] += 1
-                    
             except Exception as e:
                 logging.debug(f"Error procesando stock: {e}")
-                productos_sin_stock += 1
+                stock = 0
+            
+            anterior_incluido = stock > 0
+            if anterior_incluido:
+                self.stats['productos_con_stock'] += 1
+                yield producto
+            else:
                 self.stats['productos_sin_stock'] += 1
+    
+    def filtrar_productos_con_stock(self, productos: List[Dict]) -> List[Dict]:
+        """Filtrar productos que tienen stock disponible"""
+        sin_stock_previo = self.stats['productos_sin_stock']
+        productos_filtrados = list(self.iterar_con_stock(productos))
+        productos_sin_stock = self.stats['productos_sin_stock'] - sin_stock_previo
         
         logging.info(f"📦 Productos filtrados - Con stock: {len(productos_filtrados)}, Sin stock: {productos_sin_stock}")
         return productos_filtrados
     
     def limpiar_producto_para_shopify(self, producto: Dict) -> Dict:
         """Limpiar y optimizar datos del producto para Shopify"""
-        producto_limpio = {}
-        
-        # Mapeo de campos
-        mapeo_campos = {
-            'Handle': 'Handle',
-            'Title': 'Title',
-            'Body (HTML)': 'Body (HTML)',
-            'Vendor': 'Vendor',
-            'Product Category': 'Product Category',
-            'Type': 'Type',
-            'Tags': 'Tags',
-            'Option1 Name': 'Option1 Name',
-            'Option1 Value': 'Option1 Value',
-            'Variant SKU': 'Variant SKU',
-            'Variant Grams': 'Variant Grams',
-            'Variant Inventory Tracker': 'Variant Inventory Tracker',
-            'Variant Inventory Qty': 'Variant Inventory Qty',
-            'Variant Inventory Policy': 'Variant Inventory Policy',
-            'Variant Fulfillment Service': 'Variant Fulfillment Service',
-            'Variant Price': 'Variant Price',
-            'Variant Compare At Price': 'Variant Compare At Price',
-            'Variant Requires Shipping': 'Variant Requires Shipping',
-            'Variant Taxable': 'Variant Taxable',
-            'Variant Barcode': 'Variant Barcode',
-            'Image Src': 'Image Src',
-            'Image Position': 'Image Position',
-            'Image Alt Text': 'Image Alt Text',
-            'Gift Card': 'Gift Card',
-            'SEO Title': 'SEO Title',
-            'SEO Description': 'SEO Description',
-            'Google Shopping / Google Product Category': 'Google Shopping / Google Product Category',
-            'Google Shopping / Gender': 'Google Shopping / Gender',
-            'Google Shopping / Age Group': 'Google Shopping / Age Group',
-            'Google Shopping / MPN': 'Google Shopping / MPN',
-            'Google Shopping / AdWords Grouping': 'Google Shopping / AdWords Grouping',
-            'Google Shopping / AdWords Labels': 'Google Shopping / AdWords Labels',
-            'Google Shopping / Condition': 'Google Shopping / Condition',
-            'Google Shopping / Custom Product': 'Google Shopping / Custom Product',
-            'Google Shopping / Custom Label 0': 'Google Shopping / Custom Label 0',
-            'Google Shopping / Custom Label 1': 'Google Shopping / Custom Label 1',
-            'Google Shopping / Custom Label 2': 'Google Shopping / Custom Label 2',
-            'Google Shopping / Custom Label 3': 'Google Shopping / Custom Label 3',
-            'Google Shopping / Custom Label 4': 'Google Shopping / Custom Label 4',
-            'Variant Image': 'Variant Image',
-            'Variant Weight Unit': 'Variant Weight Unit',
-            'Variant Tax Code': 'Variant Tax Code',
-            'Cost per item': 'Cost per item',
-            'Status': 'Status'
-        }
-        
-        # Copiar campos existentes
-        for campo_original, campo_shopify in mapeo_campos.items():
-            if campo_original in producto:
-                valor = producto[campo_original]
-                if valor:  # Solo si tiene valor
-                    # Aplicar corrección de encoding
-                    if isinstance(valor, str):
-                        valor = self.fix_encoding_issues(valor)
-                    producto_limpio[campo_shopify] = valor
-        
-        # Valores por defecto para campos requeridos
-        if 'Handle' not in producto_limpio and 'Title' in producto_limpio:
-            # Generar handle desde título
-            titulo = producto_limpio['Title']
-            handle = re.sub(r'[^a-z0-9\s-]', '', titulo.lower())
-            handle = re.sub(r'\s+', '-', handle).strip('-')
-            producto_limpio['Handle'] = handle[:255]
-        
-        if 'Variant Inventory Tracker' not in producto_limpio:
-            producto_limpio['Variant Inventory Tracker'] = 'shopify'
-        
-        if 'Variant Inventory Policy' not in producto_limpio:
-            producto_limpio['Variant Inventory Policy'] = 'deny'
-        
-        if 'Variant Fulfillment Service' not in producto_limpio:
-            producto_limpio['Variant Fulfillment Service'] = 'manual'
-        
-        if 'Variant Requires Shipping' not in producto_limpio:
-            producto_limpio['Variant Requires Shipping'] = 'TRUE'
-        
-        if 'Variant Taxable' not in producto_limpio:
-            producto_limpio['Variant Taxable'] = 'TRUE'
-        
-        if 'Status' not in producto_limpio:
-            producto_limpio['Status'] = 'active'
-        
-        return producto_limpio
+        return limpiar_producto(producto)
+    
+    def dividir_csv_en_archivos(self, productos: Iterable[Dict]) -> List[str]:
+        """Dividir productos en archivos CSV más pequeños"""
+        return self.dividir_csv_en_streaming(productos)
+    
+    def dividir_csv_en_streaming(self, productos: Iterable[Dict]) -> List[str]:
+        """
+        Limpiar y escribir los productos en una sola pasada, con memoria constante
+        
+        Usa el esquema fijo ESQUEMA_SHOPIFY, así que no necesita ver todo el catálogo antes
+        de escribir. Cada parte se llena hasta bytes_por_archivo (y lineas_por_archivo si
+        está configurado) sin separar nunca las filas de un mismo Handle. Se escribe con un
+        nombre provisional y, al conocer el total, se renombra a
+        shopify_productos_parte_NNN_de_TTT.csv.
+        """
+        grupos = iterar_grupos_por_handle(productos)
+        escritor = EscritorPartes(self.directorio_salida, 'shopify_productos_parte',
+                                  self.bytes_por_archivo, self.lineas_por_archivo)
+        try:
+            if self.jobs > 1:
+                self._escribir_en_paralelo(grupos, escritor)
+            else:
+                for grupo in grupos:
+                    escritor.agregar_grupo([limpiar_producto(producto) for producto in grupo])
+        finally:
+            partes = escritor.cerrar()
+        
+        return self._nombrar_partes(partes)
     
-    def dividir_csv_en_archivos(self, productos: List[Dict]) -> List[str]:
-        """Dividir lista de productos en archivos CSV más pequeños"""
+    def _escribir_en_paralelo(self, grupos: Iterable[List[Dict]], escritor: EscritorPartes):
+        """
+        Limpiar bloques de productos en self.jobs procesos y escribirlos aquí, en orden
+        
+        Los procesos devuelven cada Handle ya convertido a CSV, así que las partes se cortan
+        con el tamaño real de las filas limpias y quedan idénticas a las del modo secuencial.
+        """
+        pendientes = deque()
+        bloques = iter(lambda: list(islice(grupos, GRUPOS_POR_BLOQUE)), [])
+        
+        def escribir(futuro):
+            for datos, filas, handle in futuro.result():
+                escritor.agregar_datos(datos, filas, handle)
+        
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for bloque in bloques:
+                # Ventana acotada: no leer el CSV mucho más rápido de lo que se escribe
+                if len(pendientes) >= self.jobs * 2:
+                    escribir(pendientes.popleft())
+                pendientes.append(executor.submit(limpiar_bloque, bloque))
+            while pendientes:
+                escribir(pendientes.popleft())
+        
+        logging.info(f"⚙️ Productos limpiados con {self.jobs} procesos")
+    
+    def _nombrar_partes(self, partes: List[Tuple[str, int, int]]) -> List[str]:
+        """Ya se conoce el total: poner el nombre definitivo a cada parte"""
         archivos_generados = []
-        
-        # Obtener encabezados (todos los campos únicos)
-        todos_los_campos = set()
-        for producto in productos:
-            todos_los_campos.update(producto.keys())
-        
-        # Ordenar campos con Handle y Title primero
-        campos_ordenados = []
-        campos_prioritarios = ['Handle', 'Title', 'Body (HTML)', 'Vendor', 'Product Category', 'Type', 'Tags']
-        
-        for campo in campos_prioritarios:
-            if campo in todos_los_campos:
-                campos_ordenados.append(campo)
-                todos_los_campos.remove(campo)
-        
-        campos_ordenados.extend(sorted(todos_los_campos))
-        
-        # Dividir en lotes
-        total_archivos = (len(productos) + self.lineas_por_archivo - 1) // self.lineas_por_archivo
-        
-        for i in range(0, len(productos), self.lineas_por_archivo):
-            lote = productos[i:i + self.lineas_por_archivo]
-            numero_archivo = (i // self.lineas_por_archivo) + 1
-            
+        total_archivos = len(partes)
+        for numero_archivo, (ruta_parcial, filas, tamano) in enumerate(partes, 1):
             nombre_archivo = f"shopify_productos_parte_{numero_archivo:03d}_de_{total_archivos:03d}.csv"
             ruta_archivo = os.path.join(self.directorio_salida, nombre_archivo)
-            
             try:
-                with open(ruta_archivo, 'w', encoding='utf-8', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=campos_ordenados)
-                    writer.writeheader()
-                    
-                    for producto in lote:
-                        producto_limpio = self.limpiar_producto_para_shopify(producto)
-                        writer.writerow(producto_limpio)
-                
-                archivos_generados.append(ruta_archivo)
-                self.stats['archivos_generados'] += 1
-                
-                logging.info(f"✅ Archivo {numero_archivo}/{total_archivos}: {nombre_archivo} ({len(lote)} productos)")
-                
-            except Exception as e:
+                os.replace(ruta_parcial, ruta_archivo)
+            except OSError as e:
                 logging.error(f"❌ Error creando archivo {nombre_archivo}: {e}")
+                continue
+            
+            archivos_generados.append(ruta_archivo)
+            self.stats['archivos_generados'] += 1
+            logging.info(f"✅ Archivo {numero_archivo}/{total_archivos}: {nombre_archivo} ({filas} filas, {tamano / 1024 / 1024:.1f} MB)")
         
         return archivos_generados
     
@@ -563,7 +694,7 @@ INSTRUCCIONES PARA IMPORTAR A SHOPIFY
 
 Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
 Archivos generados: {len(archivos_generados)}
-Productos por archivo: {self.lineas_por_archivo}
+Tamaño máximo por archivo: {self.bytes_por_archivo / 1024 / 1024:.1f} MB
 Total productos: {self.stats['productos_con_stock']:,}
 
 PASOS PARA IMPORTAR:
@@ -607,6 +738,7 @@ NOTAS IMPORTANTES:
 =================
 
 • Importa los archivos en ORDEN para mantener consistencia
+• Las filas de un mismo producto (imágenes, variantes) siempre quedan en el mismo archivo
 • Espera que termine cada importación antes de subir el siguiente
 • Todos los productos tienen stock > 0
 • Los precios están en la moneda configurada en tu tienda
@@ -619,7 +751,7 @@ ESTADÍSTICAS:
 Productos con stock: {self.stats['productos_con_stock']:,}
 Productos sin stock: {self.stats['productos_sin_stock']:,}
 Archivos generados: {self.stats['archivos_generados']}
-Líneas por archivo: {self.lineas_por_archivo:,}
+Tamaño máximo por archivo: {self.bytes_por_archivo / 1024 / 1024:.1f} MB
 
 ¡Listo para importar! 🚀
 """
@@ -666,35 +798,29 @@ Líneas por archivo: {self.lineas_por_archivo:,}
         
         # Paso 2: Parsear CSV
         print(f"\n📋 PASO 2: PROCESAMIENTO DE CSV")
-        productos = self.parsear_csv(archivo_csv)
-        if not productos:
-            print("❌ No se pudieron parsear los productos")
-            print("\n🔍 DIAGNÓSTICO:")
-            print("   • Verifica que ProductosHora.csv contenga datos válidos")
-            print("   • El archivo no debe ser HTML (error de servidor)")
-            print("   • Debe tener columnas como: Codigo, Nombre, Precio, Stock")
+        if self.motor == 'pandas':
+            archivos_generados = self._dividir_con_pandas(archivo_csv)
+        else:
+            archivos_generados = self._dividir_por_filas(archivo_csv)
+        if archivos_generados is None:
             return
         
-        self.stats['lineas_totales'] = len(productos)
-        print(f"✅ {len(productos):,} productos encontrados")
+        if not self.solo_cambios:
+            self.stats['lineas_totales'] = self.stats['productos_con_stock'] + self.stats['productos_sin_stock']
+            if not self.stats['lineas_totales']:
+                self._diagnostico_parseo()
+                return
+            print(f"✅ {self.stats['lineas_totales']:,} productos encontrados")
+        logging.info(f"📦 Productos filtrados - Con stock: {self.stats['productos_con_stock']}, Sin stock: {self.stats['productos_sin_stock']}")
         
-        # Paso 3: Filtrar productos con stock
-        print(f"\n📦 PASO 3: FILTRADO POR STOCK")
-        productos_con_stock = self.filtrar_productos_con_stock(productos)
-        if not productos_con_stock:
+        if not self.stats['productos_con_stock']:
             print("❌ No hay productos con stock")
             print("\n🔍 DIAGNÓSTICO:")
             print("   • Verifica que el CSV tenga columna de stock/inventario")
             print("   • Los valores de stock deben ser números > 0")
             return
         
-        print(f"✅ {len(productos_con_stock):,} productos con stock > 0")
-        
-        # Paso 4: Dividir en archivos
-        print(f"\n✂️ PASO 4: DIVISIÓN EN ARCHIVOS")
-        print(f"📄 Creando archivos de {self.lineas_por_archivo:,} líneas cada uno...")
-        
-        archivos_generados = self.dividir_csv_en_archivos(productos_con_stock)
+        print(f"✅ {self.stats['productos_con_stock']:,} productos con stock > 0")
         
         if not archivos_generados:
             print("❌ No se pudieron generar archivos")
@@ -716,6 +842,78 @@ Líneas por archivo: {self.lineas_por_archivo:,}
             except:
                 pass
     
+    def _anunciar_division(self):
+        """Mensajes de los pasos 3 y 4"""
+        print(f"\n📦 PASO 3: FILTRADO POR STOCK")
+        print(f"\n✂️ PASO 4: DIVISIÓN EN ARCHIVOS")
+        print(f"📄 Creando archivos de hasta {self.bytes_por_archivo / 1024 / 1024:.1f} MB...")
+    
+    def _dividir_por_filas(self, archivo_csv: str) -> Optional[List[str]]:
+        """Leer, filtrar, limpiar y escribir fila por fila (None si no hay nada que dividir)"""
+        productos = self.iterar_csv(archivo_csv)
+        
+        if self.solo_cambios:
+            # El delta necesita el catálogo completo para comparar
+            productos = list(productos)
+            if not productos:
+                self._diagnostico_parseo()
+                return None
+            self.stats['lineas_totales'] = len(productos)
+            print(f"✅ {len(productos):,} productos encontrados")
+            
+            print(f"\n🔀 Comparando con el snapshot anterior...")
+            productos = aplicar_delta(archivo_csv, productos)
+            print(f"✅ {len(productos):,} productos nuevos o modificados")
+            if not productos:
+                print("✅ Sin cambios desde el último snapshot, no hay nada que dividir")
+                return None
+        
+        # Paso 3 y 4: filtrar por stock, limpiar y escribir en una sola pasada
+        self._anunciar_division()
+        if self.jobs > 1:
+            print(f"⚙️ Limpieza repartida en {self.jobs} procesos")
+        
+        return self.dividir_csv_en_streaming(self.iterar_con_stock(productos))
+    
+    def _dividir_con_pandas(self, archivo_csv: str) -> Optional[List[str]]:
+        """Mismo proceso que _dividir_por_filas, con operaciones por columna sobre un DataFrame"""
+        from pipeline_pandas import PipelinePandas
+        
+        pipeline = PipelinePandas(self)
+        catalogo = pipeline.leer(archivo_csv)
+        if catalogo is None:
+            catalogo = pipeline.catalogo_vacio()
+        
+        if self.solo_cambios:
+            if catalogo.empty:
+                self._diagnostico_parseo()
+                return None
+            self.stats['lineas_totales'] = len(catalogo)
+            print(f"✅ {len(catalogo):,} productos encontrados")
+            
+            print(f"\n🔀 Comparando con el snapshot anterior...")
+            productos = aplicar_delta(archivo_csv, pipeline.a_registros(catalogo))
+            print(f"✅ {len(productos):,} productos nuevos o modificados")
+            if not productos:
+                print("✅ Sin cambios desde el último snapshot, no hay nada que dividir")
+                return None
+            catalogo = pipeline.desde_registros(productos)
+        
+        self._anunciar_division()
+        if self.jobs > 1:
+            logging.info("ℹ️ El motor pandas limpia por columnas en un solo proceso; --jobs no aplica")
+        
+        con_stock = pipeline.filtrar_con_stock(catalogo)
+        return self._nombrar_partes(pipeline.escribir(con_stock, pipeline.limpiar(con_stock)))
+    
+    def _diagnostico_parseo(self):
+        """Explicar por qué no se pudieron leer productos del CSV"""
+        print("❌ No se pudieron parsear los productos")
+        print("\n🔍 DIAGNÓSTICO:")
+        print("   • Verifica que ProductosHora.csv contenga datos válidos")
+        print("   • El archivo no debe ser HTML (error de servidor)")
+        print("   • Debe tener columnas como: Codigo, Nombre, Precio, Stock")
+    
     def mostrar_estadisticas_finales(self, archivos_generados: List[str]):
         """Mostrar estadísticas finales"""
         print(f"\n{'='*60}")
@@ -730,7 +928,7 @@ Líneas por archivo: {self.lineas_por_archivo:,}
         print(f"📦 Con stock: {self.stats['productos_con_stock']:,}")
         print(f"❌ Sin stock: {self.stats['productos_sin_stock']:,}")
         print(f"📁 Archivos generados: {self.stats['archivos_generados']}")
-        print(f"📄 Líneas por archivo: {self.lineas_por_archivo:,}")
+        print(f"📄 Tamaño máximo por archivo: {self.bytes_por_archivo / 1024 / 1024:.1f} MB")
         
         # Estadísticas adicionales de mapeo de categorías
         if hasattr(self, 'categorias_convertidas'):
@@ -758,8 +956,17 @@ Líneas por archivo: {self.lineas_por_archivo:,}
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="CSV Splitter para Shopify")
+    parser.add_argument('--solo-cambios', action='store_true',
+                        help="Solo incluir productos nuevos o modificados desde el último snapshot")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Procesos que limpian los productos en paralelo (default: 1)")
+    parser.add_argument('--motor', choices=['filas', 'pandas'], default='filas',
+                        help="Motor de transformación: fila por fila en streaming o vectorizado con pandas")
+    args = parser.parse_args()
+    
     try:
-        splitter = CSVSplitterShopify()
+        splitter = CSVSplitterShopify(solo_cambios=args.solo_cambios, jobs=args.jobs, motor=args.motor)
         splitter.ejecutar_division()
     except KeyboardInterrupt:
         print("\n👋 División interrumpida por usuario")
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Motor pandas del CSV Splitter
+Hace la conversión de formato, el mapeo de categorías, el filtro de stock y la limpieza
+como operaciones por columna sobre un DataFrame. Las funciones por fila (categorías,
+encoding, números) se aplican una sola vez por valor distinto. Los archivos generados
+son idénticos, byte por byte, a los del motor por filas.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from category_mapping import convertir_categoria
+from csv_splitter_shopify import (
+    CAMPOS_SHOPIFY, ESQUEMA_SHOPIFY, MAPEO_FORMATO_PERSONALIZADO, EscritorPartes
+)
+from normalizacion_texto import fix_encoding_issues
+
+# Columnas donde se busca el stock, en el mismo orden que iterar_con_stock
+CAMPOS_STOCK = ['Variant Inventory Qty', 'Inventory Qty', 'Stock', 'Quantity', 'Available']
+
+# Valores que limpiar_producto agrega cuando la columna no trae nada
+VALORES_POR_DEFECTO = [
+    ('Variant Inventory Tracker', 'shopify'),
+    ('Variant Inventory Policy', 'deny'),
+    ('Variant Fulfillment Service', 'manual'),
+    ('Variant Requires Shipping', 'TRUE'),
+    ('Variant Taxable', 'TRUE'),
+]
+
+# Columnas que hacen que una fila sin Title siga siendo una variante (y lleve valores por defecto)
+CAMPOS_VARIANTE = ['Variant SKU', 'Variant Price', 'Option1 Value']
+
+# Marca para comparar Handles vacíos: en el motor por filas None == None agrupa las filas
+_SIN_HANDLE = '\x00'
+
+
+def _con_valor(serie: pd.Series) -> pd.Series:
+    """Equivalente vectorizado de `if valor:` para columnas de texto"""
+    return serie.notna() & (serie != '')
+
+
+def _mapear_unicos(serie: pd.Series, funcion: Callable) -> pd.Series:
+    """Aplicar una función de Python una sola vez por valor distinto"""
+    unicos = pd.unique(serie)
+    return serie.map(dict(zip(unicos, map(funcion, unicos)))).astype(object)
+
+
+def _generar_handle(titulos: pd.Series, largo: int) -> pd.Series:
+    """Handle desde el título, con las mismas expresiones que el motor por filas"""
+    handles = titulos.str.lower()
+    handles = handles.str.replace(r'[^a-z0-9\s-]', '', regex=True)
+    handles = handles.str.replace(r'\s+', '-', regex=True).str.strip('-')
+    return handles.str.slice(0, largo)
+
+
+class PipelinePandas:
+    def __init__(self, splitter):
+        """
+        Inicializar el motor pandas
+
+        Args:
+            splitter: CSVSplitterShopify cuyas estadísticas y configuración se usan
+        """
+        self.splitter = splitter
+        self.formato: Optional[str] = None
+
+    def catalogo_vacio(self) -> pd.DataFrame:
+        """DataFrame sin filas para cuando el CSV no se pudo leer"""
+        return pd.DataFrame(columns=['Handle'], dtype=object)
+
+    def leer(self, archivo_csv: str) -> Optional[pd.DataFrame]:
+        """Leer el CSV (o su copia columnar) y convertirlo a formato Shopify"""
+        abierto = self.splitter._abrir_lector(archivo_csv)
+        if not abierto:
+            return None
+        reader, encoding = abierto
+
+        if reader.desde_cache:
+            catalogo = pd.read_parquet(reader.ruta_parquet)
+        else:
+            columnas = list(dict.fromkeys(reader.fieldnames))
+            catalogo = pd.DataFrame.from_records(list(reader), columns=columnas)
+        catalogo = catalogo.astype(object).reset_index(drop=True)
+
+        self.formato = self.splitter._detectar_formato(list(catalogo.columns))
+        if self.formato == 'shopify':
+            logging.info("🔄 Verificando y convirtiendo categorías en formato Shopify...")
+            catalogo = self.convertir_categorias(catalogo)
+            logging.info(f"✅ CSV Shopify parseado con {encoding}: {len(catalogo)} productos")
+        elif self.formato == 'convertible':
+            logging.info(f"📋 Detectado formato no-Shopify convertible con {encoding}")
+            logging.info("🔄 Convirtiendo formato personalizado a Shopify...")
+            catalogo = self.convertir_formato(catalogo)
+            logging.info(f"✅ CSV convertido a Shopify con {encoding}: {len(catalogo)} productos")
+        else:
+            logging.warning(f"⚠️ Formato no reconocido con {encoding}")
+            logging.info(f"📋 Columnas disponibles: {', '.join(catalogo.columns)}")
+            return None
+        return catalogo
+
+    def a_registros(self, catalogo: pd.DataFrame) -> List[Dict]:
+        """Filas como diccionarios, con las mismas claves que entrega el motor por filas"""
+        registros = catalogo.astype(object).where(catalogo.notna(), None).to_dict('records')
+        if self.formato == 'convertible':
+            # La conversión por filas solo crea las columnas que traen valor
+            return [{campo: valor for campo, valor in fila.items() if valor is not None} for fila in registros]
+        return registros
+
+    def desde_registros(self, productos: List[Dict]) -> pd.DataFrame:
+        """DataFrame a partir de filas ya convertidas (por ejemplo, el resultado del delta)"""
+        return pd.DataFrame.from_records(productos).astype(object).reset_index(drop=True)
+
+    def _registrar_conversiones(self, conversiones: pd.DataFrame, sin_mapeo: int):
+        """Sumar contadores de categorías y guardar los primeros ejemplos en orden de lectura"""
+        self.splitter.categorias_convertidas += len(conversiones)
+        self.splitter.categorias_sin_mapeo += int(sin_mapeo)
+        ejemplos = self.splitter.ejemplos_conversion
+        for original, convertida in conversiones.drop_duplicates('original')[['original', 'convertida']].itertuples(index=False):
+            if len(ejemplos) >= 10:
+                break
+            ejemplos[original] = convertida
+
+    def convertir_categorias(self, catalogo: pd.DataFrame) -> pd.DataFrame:
+        """Mapear 'Product Category' con un valor convertido por categoría distinta"""
+        if 'Product Category' not in catalogo:
+            return catalogo
+        con_valor = _con_valor(catalogo['Product Category'])
+        originales = catalogo.loc[con_valor, 'Product Category']
+        convertidas = _mapear_unicos(originales, convertir_categoria)
+        cambio = convertidas != originales
+
+        self._registrar_conversiones(
+            pd.DataFrame({'original': originales[cambio], 'convertida': convertidas[cambio]}),
+            (~cambio).sum()
+        )
+        catalogo.loc[cambio[cambio].index, 'Product Category'] = convertidas[cambio]
+        return catalogo
+
+    def convertir_formato(self, catalogo: pd.DataFrame) -> pd.DataFrame:
+        """Renombrar columnas de un CSV personalizado (MAPEO_FORMATO_PERSONALIZADO) a columnas Shopify"""
+        convertido = pd.DataFrame(index=catalogo.index, dtype=object)
+        conversiones = []
+        sin_mapeo = 0
+
+        for orden, (campo_original, campo_shopify) in enumerate(MAPEO_FORMATO_PERSONALIZADO.items()):
+            if campo_original not in catalogo:
+                continue
+            columna = catalogo[campo_original]
+            valores = columna[_con_valor(columna)].astype(str).str.strip()
+            valores = valores[valores != '']
+
+            if campo_shopify == 'Product Category':
+                convertidas = _mapear_unicos(valores, convertir_categoria)
+                cambio = convertidas != valores
+                conversiones.append(pd.DataFrame({
+                    'fila': valores.index[cambio], 'orden': orden,
+                    'original': valores[cambio].to_numpy(), 'convertida': convertidas[cambio].to_numpy()
+                }))
+                sin_mapeo += (~cambio).sum()
+                valores = convertidas
+
+            # Si varias columnas llegan a la misma columna Shopify, gana la última del mapeo
+            if campo_shopify in convertido:
+                convertido.loc[valores.index, campo_shopify] = valores
+            else:
+                convertido[campo_shopify] = valores
+
+        if conversiones:
+            self._registrar_conversiones(
+                pd.concat(conversiones).sort_values(['fila', 'orden'], kind='stable'), sin_mapeo
+            )
+        else:
+            self._registrar_conversiones(pd.DataFrame(columns=['original', 'convertida']), sin_mapeo)
+
+        # Título: mapeado, o el primer campo alternativo con valor, o "Producto N"
+        if 'Title' in convertido:
+            titulos = convertido['Title'].copy()
+        else:
+            titulos = pd.Series(np.nan, index=catalogo.index, dtype=object)
+        falta = titulos.isna()
+        for campo in ['Nombre', 'Titulo', 'Descripcion', 'Description']:
+            if campo in catalogo:
+                usar = falta & _con_valor(catalogo[campo])
+                titulos[usar] = catalogo.loc[usar, campo].astype(str).str.slice(0, 100)
+                falta &= ~usar
+        titulos[falta] = [f"Producto {posicion + 1}" for posicion in np.flatnonzero(falta.to_numpy())]
+        convertido['Title'] = titulos
+        convertido['Handle'] = _generar_handle(titulos, 100)
+
+        for campo, valor in VALORES_POR_DEFECTO + [('Status', 'active')]:
+            convertido[campo] = valor
+        return convertido
+
+    def filtrar_con_stock(self, catalogo: pd.DataFrame) -> pd.DataFrame:
+        """
+        Dejar solo los productos con stock, con las mismas reglas que iterar_con_stock
+
+        El stock sale de la primera columna de CAMPOS_STOCK con un número válido, y las
+        filas extra de un Handle (sin Title) siguen la decisión de su primera fila.
+        """
+        stock = pd.Series(0.0, index=catalogo.index)
+        pendiente = pd.Series(True, index=catalogo.index)
+        for campo in CAMPOS_STOCK:
+            if campo not in catalogo:
+                continue
+            columna = catalogo[campo]
+            candidatos = pendiente & _con_valor(columna)
+            numeros = {}
+            for valor in pd.unique(columna[candidatos]):
+                try:
+                    numeros[valor] = float(valor)
+                except (ValueError, TypeError):
+                    continue
+            validos = candidatos & columna.isin(list(numeros))
+            stock[validos] = columna[validos].map(numeros).astype(float)
+            pendiente &= ~validos
+
+        if 'Handle' in catalogo:
+            handles = catalogo['Handle']
+            con_titulo = _con_valor(catalogo['Title']) if 'Title' in catalogo else pd.Series(False, index=catalogo.index)
+            continuacion = _con_valor(handles) & (handles == handles.shift()) & ~con_titulo
+        else:
+            continuacion = pd.Series(False, index=catalogo.index)
+
+        con_stock = stock > 0
+        principales = ~continuacion
+        self.splitter.stats['productos_con_stock'] += int((con_stock & principales).sum())
+        self.splitter.stats['productos_sin_stock'] += int((~con_stock & principales).sum())
+
+        incluidas = con_stock.astype(float).where(principales).ffill().fillna(0).astype(bool)
+        return catalogo[incluidas]
+
+    def limpiar(self, catalogo: pd.DataFrame) -> pd.DataFrame:
+        """Limpieza de limpiar_producto por columnas; devuelve texto en el orden de ESQUEMA_SHOPIFY"""
+        limpio = pd.DataFrame(index=catalogo.index, dtype=object)
+        ninguno = pd.Series(False, index=catalogo.index)
+        presentes: Dict[str, pd.Series] = {}
+
+        for campo_original, campo_shopify in CAMPOS_SHOPIFY.items():
+            if campo_original not in catalogo:
+                continue
+            columna = catalogo[campo_original]
+            con_valor = _con_valor(columna)
+            valores = columna.where(con_valor).astype(object)
+            reparar = con_valor
+            if pd.api.types.infer_dtype(columna[con_valor], skipna=True) != 'string':
+                reparar = con_valor & columna.map(lambda v: isinstance(v, str)).astype(bool)
+            valores[reparar] = _mapear_unicos(columna[reparar], fix_encoding_issues)
+            limpio[campo_shopify] = valores
+            presentes[campo_shopify] = con_valor
+
+        def presente(campo: str) -> pd.Series:
+            return presentes.get(campo, ninguno)
+
+        generar = ~presente('Handle') & presente('Title')
+        if generar.any():
+            limpio.loc[generar, 'Handle'] = _generar_handle(limpio.loc[generar, 'Title'], 255)
+            presentes['Handle'] = presente('Handle') | generar
+
+        # Filas extra de un producto de varias filas: solo llevan lo que traen
+        es_variante = ninguno
+        for campo in CAMPOS_VARIANTE:
+            es_variante = es_variante | presente(campo)
+        lleva_defaults = presente('Title') | es_variante
+
+        for campo, valor in VALORES_POR_DEFECTO:
+            limpio.loc[~presente(campo) & lleva_defaults, campo] = valor
+        limpio.loc[~presente('Status') & presente('Title'), 'Status'] = 'active'
+
+        return limpio.reindex(columns=ESQUEMA_SHOPIFY).fillna('')
+
+    def escribir(self, catalogo: pd.DataFrame, limpio: pd.DataFrame) -> List[Tuple[str, int, int]]:
+        """Escribir las filas limpias por grupos de Handle con el mismo escritor que el motor por filas"""
+        splitter = self.splitter
+        escritor = EscritorPartes(splitter.directorio_salida, 'shopify_productos_parte',
+                                  splitter.bytes_por_archivo, splitter.lineas_por_archivo)
+        if 'Handle' in catalogo:
+            handles = catalogo['Handle'].fillna(_SIN_HANDLE).to_numpy()
+        else:
+            handles = np.full(len(catalogo), _SIN_HANDLE, dtype=object)
+
+        # Límites de cada grupo de filas consecutivas con el mismo Handle
+        if len(handles):
+            inicios = np.flatnonzero(np.concatenate(([True], handles[1:] != handles[:-1])))
+        else:
+            inicios = np.array([], dtype=int)
+        finales = np.append(inicios[1:], len(handles))
+        filas = limpio.to_numpy().tolist()
+
+        try:
+            for inicio, final in zip(inicios, finales):
+                escritor.agregar_filas(filas[inicio:final], handles[inicio])
+        finally:
+            partes = escritor.cerrar()
+        return partes
@@ -7,18 +7,34 @@ Manejo robusto de errores y timeouts
 
 import os
 import sys
-import csv
 import json
 import logging
 import time
 import random
 import re
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from itertools import count, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 import shopify
 import requests
 from urllib.parse import urlparse
+from rate_limiter import ShopifyRateLimiter
+from catalogo_local import CatalogoLocal
+from cola_fallidos import ColaFallidos
+from delta_sync import aplicar_delta
+from descarga_csv import DescargaCSV
+from shopify_graphql import ShopifyGraphQL, gid
+from journal_importacion import JournalImportacion, ESTADOS_TERMINADOS
+from lector_csv import LectorCatalogo, detectar_encoding
+from normalizacion_texto import fix_encoding_issues
+from politica_reintentos import (CLASES_TRANSITORIAS, IMAGEN, TIMEOUT, VALIDACION, PoliticaReintentos,
+                                 clasificar_error, describir_error, retry_after)
+from snapshots_catalogo import AlmacenSnapshots
+from transporte_http import TransporteHTTP
 
 # Configurar logging
 logging.basicConfig(
@@ -39,8 +55,11 @@ class SyscomShopifyImporterRobusto:
         self.shop_name = os.getenv('SHOPIFY_SHOP_NAME')
         self.access_token = os.getenv('SHOPIFY_ACCESS_TOKEN')
         self.csv_url = os.getenv('CSV_URL')
+        # SHOPIFY_API_URL permite apuntar a un servidor local de prueba
+        self.api_url = os.getenv('SHOPIFY_API_URL') or f"https://{self.shop_name}/admin/api/2025-04"
         self.max_products_per_batch = int(os.getenv('MAX_PRODUCTS_PER_BATCH', 5))
-        self.delay_between_requests = float(os.getenv('DELAY_BETWEEN_REQUESTS', 2))
+        # Con RANDOMIZE_ORDER=false los productos se envían mientras se lee el CSV
+        self.randomizar_orden = os.getenv('RANDOMIZE_ORDER', 'true').lower() not in ('0', 'false', 'no')
         
         # Estado del sistema
         self.location_id = None
@@ -54,6 +73,10 @@ class SyscomShopifyImporterRobusto:
         self.backoff_factor = 0.5
         self.max_consecutive_errors = 3  # Pausa más frecuente
         
+        # Tamaño de lote para mutaciones GraphQL agrupadas
+        self.productos_por_mutacion = 25
+        self.cantidades_por_mutacion = 250
+        
         # Estadísticas completas
         self.stats = {
             'productos_procesados': 0,
@@ -66,61 +89,106 @@ class SyscomShopifyImporterRobusto:
             'errores_consecutivos': 0,
             'errores_timeout': 0,
             'errores_imagen': 0,
+            'precios_actualizados': 0,
+            'errores_actualizacion': 0,
             'tiempo_inicio': None,
             'tiempo_fin': None
         }
+        self._stats_lock = threading.Lock()
+        
+        # Reintentos por clase de error (429, 5xx, timeout, conexión, validación, imagen)
+        self.politica_reintentos = PoliticaReintentos()
         
         # Configurar sesión con retry
         self.session = self._crear_sesion_con_retry()
         
+        # Limitador compartido por todas las llamadas a Shopify
+        self.rate_limiter = ShopifyRateLimiter(
+            tasa_fuga=float(os.getenv('SHOPIFY_LEAK_RATE', 2.0))
+        )
+        
+        # Espejo local del catálogo para duplicados e IDs de inventario
+        self.catalogo = CatalogoLocal(os.getenv('CATALOGO_DB', 'catalogo_shopify.db'))
+        
+        # Journal por handle para poder reanudar una importación interrumpida
+        self.journal = JournalImportacion(os.getenv('JOURNAL_DB', 'journal_importacion.db'))
+        
+        # Productos que agotaron sus reintentos, para intentarlos primero en la siguiente corrida
+        self.fallidos = ColaFallidos(os.getenv('FALLIDOS_DB', 'fallidos_importacion.db'))
+        
+        # Cliente GraphQL para actualizaciones agrupadas
+        self.graphql = ShopifyGraphQL(
+            self._peticion_shopify, self.api_url,
+            headers={'X-Shopify-Access-Token': self.access_token}
+        )
+        
         # Configurar Shopify API
         if self.shop_name and self.access_token:
             self._setup_shopify_api()
             
     def _crear_sesion_con_retry(self):
-        """Crear sesión de requests con retry automático"""
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'SYSCOM-Shopify-Importer/2.3',
-            'Accept': 'text/csv, application/csv, text/plain, */*'
-        })
-        return session
+        """Crear la sesión compartida: pool de conexiones keep-alive y retry automático en el adaptador"""
+        self.transporte = TransporteHTTP(
+            reintentos=self.max_retries,
+            backoff=self.backoff_factor,
+            headers={
+                'User-Agent': 'SYSCOM-Shopify-Importer/2.3',
+                'Accept': 'text/csv, application/csv, text/plain, */*'
+            }
+        )
+        return self.transporte.session
+    
+    def _peticion_shopify(self, metodo: str, url: str, **kwargs) -> requests.Response:
+        """Hacer una petición REST a Shopify respetando el límite de API"""
+        self.rate_limiter.esperar_turno()
+        response = self.transporte.request(metodo, url, **kwargs)
+        self.rate_limiter.registrar_respuesta(response.headers, response.status_code)
+        return response
+            
+    def _inicializar_hilo_shopify(self):
+        """Configurar credenciales de Shopify en un hilo worker (los headers son por hilo)"""
+        shopify.ShopifyResource.set_headers({"X-Shopify-Access-Token": self.access_token})
+    
+    def _sumar_stat(self, clave: str, cantidad: int = 1):
+        """Incrementar una estadística de forma segura entre hilos"""
+        with self._stats_lock:
+            self.stats[clave] += cantidad
+    
+    def _registrar_en_journal(self, handle: str, estado: str, producto: Optional[Dict] = None,
+                              detalle: Optional[str] = None):
+        """Anotar el estado de un handle; acepta el JSON REST o una fila del espejo local"""
+        if not handle:
+            return
+        producto = producto or {}
+        variantes = producto.get('variants') or []
+        inventory_item_id = variantes[0].get('inventory_item_id') if variantes else None
+        if not inventory_item_id and producto.get('inventory_item_ids'):
+            inventory_item_id = producto['inventory_item_ids'][0]
+        try:
+            self.journal.registrar(handle, estado, producto.get('id') or producto.get('product_id'),
+                                   inventory_item_id, detalle)
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo escribir en el journal: {e}")
+
+    def _reiniciar_stat(self, clave: str):
+        """Poner una estadística en cero de forma segura entre hilos"""
+        with self._stats_lock:
+            self.stats[clave] = 0
             
     def _setup_shopify_api(self):
         """Configurar la API de Shopify"""
         try:
-            shopify.ShopifyResource.set_site(f"https://{self.shop_name}/admin/api/2025-04")
+            shopify.ShopifyResource.set_site(self.api_url)
             shopify.ShopifyResource.set_headers({"X-Shopify-Access-Token": self.access_token})
+            self.rate_limiter.instalar_en_shopify()
+            self.transporte.instalar_en_shopify()
             logging.info("✅ API de Shopify configurada correctamente")
         except Exception as e:
             logging.error(f"❌ Error configurando API de Shopify: {e}")
             
     def fix_encoding_issues(self, texto: str) -> str:
         """Corregir problemas comunes de encoding UTF-8"""
-        if not texto:
-            return texto
-            
-        # Tabla de correcciones comunes para problemas UTF-8
-        correcciones = {
-            'Ã¡': 'á', 'Ã ': 'à', 'Ã¢': 'â', 'Ã£': 'ã', 'Ã¤': 'ä',
-            'Ã©': 'é', 'Ã¨': 'è', 'Ãª': 'ê', 'Ã«': 'ë',
-            'Ã­': 'í', 'Ã¬': 'ì', 'Ã®': 'î', 'Ã¯': 'ï',
-            'Ã³': 'ó', 'Ã²': 'ò', 'Ã´': 'ô', 'Ãµ': 'õ', 'Ã¶': 'ö',
-            'Ãº': 'ú', 'Ã¹': 'ù', 'Ã»': 'û', 'Ã¼': 'ü',
-            'Ã±': 'ñ', 'Ã§': 'ç',
-            'Ã³n': 'ón', 'Ã±o': 'ño', 'Ã©s': 'és', 'Ã¡s': 'ás'
-        }
-        
-        # Aplicar correcciones
-        texto_corregido = texto
-        for incorrecto, correcto in correcciones.items():
-            texto_corregido = texto_corregido.replace(incorrecto, correcto)
-        
-        # Limpiar caracteres de control y espacios extra
-        texto_corregido = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', texto_corregido)
-        texto_corregido = re.sub(r'\s+', ' ', texto_corregido).strip()
-        
-        return texto_corregido
+        return fix_encoding_issues(texto)
 
     def verificar_permisos_shopify(self) -> Dict[str, bool]:
         """Verificar permisos de Shopify de forma robusta"""
@@ -181,18 +249,17 @@ class SyscomShopifyImporterRobusto:
 
     def descargar_csv(self) -> Optional[str]:
         """Descargar CSV desde URL o usar archivo local"""
-        # Intentar descarga desde URL
+        # Intentar descarga desde URL (streaming y condicional, ver descarga_csv.py)
         if self.csv_url:
             try:
                 logging.info(f"🔗 Descargando CSV desde URL...")
-                response = self.session.get(self.csv_url, timeout=self.timeout)
-                
-                if response.status_code == 200 and 'csv' in response.headers.get('content-type', '').lower():
-                    archivo_temp = f"productos_descargado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                    with open(archivo_temp, 'w', encoding='utf-8', newline='') as f:
-                        f.write(response.text)
-                    logging.info(f"✅ CSV descargado: {archivo_temp}")
-                    return archivo_temp
+                descarga = DescargaCSV(self.csv_url, "ProductosHora.csv", self.session, self.timeout)
+                snapshots = AlmacenSnapshots()
+                resultado = descarga.descargar(al_reemplazar=snapshots.guardar)
+                if resultado['estado'] == 'descargado':
+                    snapshots.guardar(resultado['ruta'])
+                if resultado['ruta']:
+                    return resultado['ruta']
             except Exception as e:
                 logging.warning(f"⚠️ Error descargando CSV: {e}")
         
@@ -206,53 +273,250 @@ class SyscomShopifyImporterRobusto:
         logging.error("❌ No se pudo obtener archivo CSV")
         return None
 
+    def iterar_productos(self, archivo_csv: str) -> Iterator[Dict]:
+        """Leer el CSV fila por fila, sin cargarlo completo en memoria"""
+        encoding = detectar_encoding(archivo_csv)
+        if not encoding:
+            logging.error("❌ No se pudo parsear el CSV")
+            return
+        
+        leidos = 0
+        reader = LectorCatalogo(archivo_csv, encoding)
+        if not reader.fieldnames or 'Handle' not in reader.fieldnames:
+            logging.error("❌ No se pudo parsear el CSV")
+            return
+        for producto in reader:
+            leidos += 1
+            yield producto
+        logging.info(f"✅ CSV parseado con {encoding}: {leidos} productos")
+
     def parsear_csv(self, archivo_csv: str) -> List[Dict]:
         """Parsear CSV con manejo robusto de encoding"""
-        productos = []
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        
-        for encoding in encodings:
+        return list(self.iterar_productos(archivo_csv))
+
+    def iterar_con_stock(self, productos: Iterable[Dict]) -> Iterator[Dict]:
+        """Dejar pasar solo los productos con stock, contando los descartados"""
+        for producto in productos:
             try:
-                with open(archivo_csv, 'r', encoding=encoding, newline='') as f:
-                    reader = csv.DictReader(f)
-                    if reader.fieldnames and 'Handle' in reader.fieldnames:
-                        productos = list(reader)
-                        logging.info(f"✅ CSV parseado con {encoding}: {len(productos)} productos")
-                        return productos
-            except Exception:
-                continue
-                
-        logging.error("❌ No se pudo parsear el CSV")
-        return []
+                stock = float(producto.get('Variant Inventory Qty', 0))
+            except (ValueError, TypeError):
+                stock = 0
+            if stock > 0:
+                yield producto
+            else:
+                self._sumar_stat('productos_sin_stock')
+                # Un fallido que se quedó sin stock ya no tiene que crearse
+                self.fallidos.quitar(producto.get('Handle', '').strip())
 
     def filtrar_productos_con_stock(self, productos: List[Dict]) -> List[Dict]:
         """Filtrar productos que tienen stock disponible"""
-        productos_filtrados = []
-        productos_sin_stock = 0
+        self.stats['productos_sin_stock'] = 0
+        productos_filtrados = list(self.iterar_con_stock(productos))
+        logging.info(f"📦 Productos con stock: {len(productos_filtrados)} de {len(productos)}")
+        return productos_filtrados
+
+    def sincronizar_catalogo(self) -> bool:
+        """Construir el espejo local con todo el catálogo de la tienda"""
+        print("\n📥 Sincronizando espejo local del catálogo...")
+        headers = {'X-Shopify-Access-Token': self.access_token}
+        try:
+            total = self.catalogo.construir_desde_shopify(
+                lambda metodo, url, **kwargs: self._peticion_shopify(metodo, url, headers=headers, **kwargs),
+                self.api_url
+            )
+            print(f"✅ Espejo local: {total:,} productos")
+            return True
+        except Exception as e:
+            logging.error(f"❌ Error sincronizando catálogo: {e}")
+            return False
+
+    def buscar_duplicado(self, handle: str) -> Optional[Dict]:
+        """Buscar un producto existente, en el espejo local si ya está sincronizado"""
+        if self.catalogo.sincronizado:
+            return self.catalogo.buscar(handle)
+        productos_existentes = shopify.Product.find(handle=handle)
+        return productos_existentes[0].to_dict() if productos_existentes else None
+
+    @staticmethod
+    def _normalizar_precio(valor) -> Optional[str]:
+        """Precio con dos decimales para comparar CSV contra Shopify ('1234' == '1234.00')"""
+        try:
+            return f"{float(valor):.2f}"
+        except (ValueError, TypeError):
+            return None
+
+    def actualizar_existentes(self, productos: List[Dict]):
+        """Enviar solo los precios y cantidades que cambiaron en productos que ya existen"""
+        if not self.catalogo.sincronizado:
+            logging.warning("⚠️ Espejo local sin sincronizar, no se pueden detectar cambios de precio/stock")
+            return
         
-        for producto in productos:
+        inicio = time.time()
+        cambios_precio = {}     # product_id -> (handle, variante GraphQL, campos para el espejo)
+        cambios_cantidad = []   # (handle, input GraphQL, cantidad)
+        
+        for producto_data in productos:
+            handle = (producto_data.get('Handle') or '').strip()
+            registro = self.catalogo.buscar(handle) if handle else None
+            if not registro or not registro['variant_ids']:
+                continue
+            
+            precio = self._normalizar_precio(producto_data.get('Variant Price'))
+            comparacion = self._normalizar_precio(producto_data.get('Variant Compare At Price'))
+            if precio and (precio != self._normalizar_precio(registro['price']) or
+                           comparacion != self._normalizar_precio(registro['compare_at_price'])):
+                cambios_precio[registro['product_id']] = (
+                    handle,
+                    {'id': gid('ProductVariant', registro['variant_ids'][0]),
+                     'price': precio, 'compareAtPrice': comparacion},
+                    {'price': precio, 'compare_at_price': comparacion}
+                )
+            
             try:
-                stock = float(producto.get('Variant Inventory Qty', 0))
-                if stock > 0:
-                    productos_filtrados.append(producto)
+                cantidad = max(0, int(float(producto_data.get('Variant Inventory Qty', 0))))
+            except (ValueError, TypeError):
+                continue
+            if self.location_id and registro['inventory_item_ids'] and cantidad != registro['qty']:
+                cambios_cantidad.append((
+                    handle,
+                    {'inventoryItemId': gid('InventoryItem', registro['inventory_item_ids'][0]),
+                     'locationId': gid('Location', self.location_id),
+                     'quantity': cantidad},
+                    cantidad
+                ))
+        
+        print(f"\n💲 Productos existentes con cambios - Precio: {len(cambios_precio):,}, Stock: {len(cambios_cantidad):,}")
+        
+        # Precios: varias mutaciones productVariantsBulkUpdate en cada petición
+        pendientes = list(cambios_precio.items())
+        for i in range(0, len(pendientes), self.productos_por_mutacion):
+            lote = dict(pendientes[i:i + self.productos_por_mutacion])
+            try:
+                errores = self.graphql.actualizar_variantes({pid: [datos[1]] for pid, datos in lote.items()})
+            except Exception as e:
+                logging.error(f"❌ Error actualizando precios: {e}")
+                self._sumar_stat('errores_actualizacion', len(lote))
+                continue
+            for product_id, (handle, _, campos) in lote.items():
+                if product_id in errores:
+                    logging.error(f"❌ Precio no actualizado {handle}: {'; '.join(errores[product_id])}")
+                    self._sumar_stat('errores_actualizacion')
                 else:
-                    productos_sin_stock += 1
+                    self.catalogo.actualizar_variante(handle, **campos)
+                    self._sumar_stat('precios_actualizados')
+        
+        self._enviar_cantidades(cambios_cantidad)
+        
+        logging.info(f"✅ Actualización de existentes: {self.stats['precios_actualizados']:,} precios, "
+                     f"{len(cambios_cantidad):,} cantidades en {time.time() - inicio:.1f}s")
+
+    def _enviar_cantidades(self, cambios_cantidad: List[Tuple[str, Dict, int]]) -> int:
+        """Fijar cantidades en lotes de una sola mutación inventorySetQuantities; devuelve las aplicadas"""
+        aplicadas = 0
+        for i in range(0, len(cambios_cantidad), self.cantidades_por_mutacion):
+            lote = cambios_cantidad[i:i + self.cantidades_por_mutacion]
+            try:
+                errores = self.graphql.fijar_inventario([entrada for _, entrada, _ in lote])
+            except Exception as e:
+                errores = [str(e)]
+            if errores:
+                logging.error(f"❌ Error actualizando inventario: {'; '.join(errores[:5])}")
+                self._sumar_stat('errores_actualizacion', len(lote))
+                continue
+            for handle, _, cantidad in lote:
+                self.catalogo.actualizar_cantidad(handle, cantidad)
+            self._sumar_stat('inventario_actualizado', len(lote))
+            aplicadas += len(lote)
+        return aplicadas
+
+    def descargar_niveles_inventario(self) -> Dict[int, int]:
+        """Descargar todos los niveles de inventario de la ubicación (250 por página)"""
+        headers = {'X-Shopify-Access-Token': self.access_token}
+        url = f"{self.api_url}/inventory_levels.json"
+        params = {'location_ids': self.location_id, 'limit': 250}
+        niveles = {}
+        
+        while url:
+            response = self._peticion_shopify('GET', url, headers=headers, params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"Error descargando inventario: {response.status_code}")
+            for nivel in response.json().get('inventory_levels', []):
+                niveles[nivel['inventory_item_id']] = nivel.get('available') or 0
+            url = response.links.get('next', {}).get('url')
+            params = None
+        
+        return niveles
+
+    def reconciliar_inventario(self, productos: List[Dict]) -> Dict[str, int]:
+        """Comparar en memoria el inventario de la ubicación contra el CSV y enviar solo las diferencias"""
+        resultado = {'niveles': 0, 'comparados': 0, 'diferencias': 0, 'aplicados': 0, 'sin_mapeo': 0}
+        if not self.location_id:
+            logging.warning("⚠️ No hay ubicación configurada para reconciliar inventario")
+            return resultado
+        if not self.catalogo.sincronizado:
+            logging.warning("⚠️ Espejo local sin sincronizar, no se puede reconciliar inventario")
+            return resultado
+        
+        inicio = time.time()
+        print(f"\n📦 Reconciliando inventario de {self.location_name or self.location_id}...")
+        try:
+            niveles = self.descargar_niveles_inventario()
+        except Exception as e:
+            logging.error(f"❌ {e}")
+            return resultado
+        resultado['niveles'] = len(niveles)
+        
+        diferencias = []
+        for producto_data in productos:
+            handle = (producto_data.get('Handle') or '').strip()
+            registro = self.catalogo.buscar(handle) if handle else None
+            if not registro or not registro['inventory_item_ids']:
+                resultado['sin_mapeo'] += 1
+                continue
+            try:
+                cantidad = max(0, int(float(producto_data.get('Variant Inventory Qty', 0))))
             except (ValueError, TypeError):
-                productos_sin_stock += 1
-                
-        self.stats['productos_sin_stock'] = productos_sin_stock
-        logging.info(f"📦 Productos con stock: {len(productos_filtrados)} de {len(productos)}")
-        return productos_filtrados
+                continue
+            
+            inventory_item_id = registro['inventory_item_ids'][0]
+            resultado['comparados'] += 1
+            if niveles.get(inventory_item_id) != cantidad:
+                diferencias.append((
+                    handle,
+                    {'inventoryItemId': gid('InventoryItem', inventory_item_id),
+                     'locationId': gid('Location', self.location_id),
+                     'quantity': cantidad},
+                    cantidad
+                ))
+        
+        resultado['diferencias'] = len(diferencias)
+        resultado['aplicados'] = self._enviar_cantidades(diferencias)
+        
+        duracion = time.time() - inicio
+        print(f"   📥 Niveles en Shopify: {resultado['niveles']:,}")
+        print(f"   🔍 Comparados: {resultado['comparados']:,} (sin mapeo: {resultado['sin_mapeo']:,})")
+        print(f"   ✏️ Diferencias: {resultado['diferencias']:,} - aplicadas: {resultado['aplicados']:,}")
+        print(f"   ⏱️ Tiempo: {duracion:.1f}s")
+        logging.info(f"✅ Reconciliación de inventario: {resultado['aplicados']:,}/{resultado['diferencias']:,} "
+                     f"diferencias aplicadas en {duracion:.1f}s")
+        return resultado
 
     def manejar_errores_consecutivos(self):
-        """Manejar errores consecutivos con pausa"""
-        if self.stats['errores_consecutivos'] >= self.max_consecutive_errors:
-            pausa = min(30, self.stats['errores_consecutivos'] * 5)  # Pausa progresiva
-            logging.warning(f"⚠️ {self.stats['errores_consecutivos']} errores consecutivos")
-            logging.info(f"😴 Pausa de {pausa}s para estabilizar conexión...")
-            time.sleep(pausa)
+        """Manejar errores consecutivos con pausa global para todos los workers"""
+        with self._stats_lock:
+            errores = self.stats['errores_consecutivos']
+            if errores < self.max_consecutive_errors:
+                return
+            # Ya se tiene el lock: _reiniciar_stat lo volvería a pedir
             self.stats['errores_consecutivos'] = 0
-            logging.info("🔄 Continuando...")
+
+        pausa = self.politica_reintentos.pausa_global(errores)  # Pausa progresiva con jitter
+        logging.warning(f"⚠️ {errores} errores consecutivos de red o del servidor")
+        logging.info(f"😴 Pausa de {pausa:.0f}s para estabilizar conexión...")
+        # La pausa se aplica en el limitador, así bloquea la siguiente llamada de cualquier hilo
+        self.rate_limiter.pausar(pausa)
+        time.sleep(pausa)
+        logging.info("🔄 Continuando...")
 
     def crear_producto_shopify_ultra_robusto(self, producto_data: Dict) -> Optional[shopify.Product]:
         """Crear producto con manejo ultra robusto de errores"""
@@ -261,25 +525,43 @@ class SyscomShopifyImporterRobusto:
         # Verificar stock
         try:
             stock = float(producto_data.get('Variant Inventory Qty', 0))
-            if stock <= 0:
-                return None
         except (ValueError, TypeError):
+            stock = 0
+        if stock <= 0:
+            # Sin stock no hay nada que crear; si venía de la cola de fallidos ya no se reintenta
+            self.fallidos.quitar(handle)
             return None
         
-        # Intentos múltiples
-        for intento in range(self.max_retries):
+        # Reintentos según la clase de cada falla (ver politica_reintentos.py)
+        intentos = self.politica_reintentos.iniciar()
+        con_imagen = True
+        # Tras una falla de red o del servidor no se sabe si el POST llegó a crear el producto
+        verificar_en_shopify = False
+        while True:
+            segundos_retry_after = None
+            tenia_imagen = False
             try:
+                if handle and verificar_en_shopify:
+                    # El espejo local no lo sabe: se pregunta a Shopify. Si esta consulta también
+                    # falla se reintenta sin volver a enviar el POST
+                    creados = shopify.Product.find(handle=handle)
+                    if creados:
+                        logging.info(f"✅ Creado en el intento anterior: {handle}")
+                        return self._producto_creado(handle, creados[0], stock)
+                    verificar_en_shopify = False
+                
                 # Verificar duplicados con timeout
                 try:
                     if handle:
-                        productos_existentes = shopify.Product.find(handle=handle)
-                        if productos_existentes:
+                        existente = self.buscar_duplicado(handle)
+                        if existente:
                             logging.info(f"⏭️ Duplicado saltado: {handle}")
-                            self.stats['productos_duplicados'] += 1
-                            self.stats['errores_consecutivos'] = 0
-                            return productos_existentes[0]
+                            self._sumar_stat('productos_duplicados')
+                            self._reiniciar_stat('errores_consecutivos')
+                            self._registrar_en_journal(handle, 'duplicado', existente)
+                            return existente
                 except Exception as e:
-                    if intento == self.max_retries - 1:
+                    if intentos.total == 0:
                         logging.warning(f"⚠️ No se pudo verificar duplicado: {handle}")
                     # Continuar con creación
                 
@@ -310,68 +592,79 @@ class SyscomShopifyImporterRobusto:
                 variante.inventory_policy = "deny"
                 
                 producto.variants = [variante]
-                  # Imagen (opcional, puede fallar sin detener el proceso)
+                # Imagen (opcional; si Shopify no la puede descargar se reintenta sin ella)
                 imagen_url = producto_data.get('Image Src', '')
-                if imagen_url and imagen_url.startswith('http'):
+                if con_imagen and imagen_url and imagen_url.startswith('http'):
                     try:
                         imagen_url_limpia = imagen_url.strip().replace(' ', '%20')
                         if any(imagen_url_limpia.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
                             imagen = shopify.Image()
                             imagen.src = imagen_url_limpia
                             producto.images = [imagen]
+                            tenia_imagen = True
                     except Exception:
                         pass  # Continuar sin imagen
                 
                 # Guardar con timeout implícito
                 if producto.save():
-                    logging.info(f"✅ Creado: {titulo_corregido[:50]} - Stock: {stock}")
-                    self.stats['productos_creados'] += 1
-                    self.stats['errores_consecutivos'] = 0
-                      # Actualizar inventario después de crear el producto
-                    try:
-                        stock_int = int(stock)
-                        if stock_int > 0:
-                            self.actualizar_inventario_producto(producto, stock_int)
-                    except (ValueError, TypeError):
-                        logging.warning(f"⚠️ No se pudo convertir stock a entero: {stock}")
-                    
-                    # Pausa de 10 segundos después de publicar cada producto
-                    logging.info("😴 Pausa de 10s después de publicar producto...")
-                    time.sleep(10)
-                    
-                    return producto
-                else:
-                    # Manejar errores específicos
-                    error_msg = str(producto.errors.full_messages()) if hasattr(producto, 'errors') else ''
-                    
-                    # Si es error de imagen, reintentar sin imagen
-                    if 'image' in error_msg.lower() and hasattr(producto, 'images'):
-                        producto.images = []
-                        if producto.save():
-                            logging.info(f"✅ Creado sin imagen: {titulo_corregido[:50]}")
-                            self.stats['productos_creados'] += 1
-                            self.stats['errores_consecutivos'] = 0
-                            return producto
-                    
-                    if intento < self.max_retries - 1:
-                        time.sleep(self.backoff_factor * (2 ** intento))
-                        continue
+                    if con_imagen:
+                        logging.info(f"✅ Creado: {titulo_corregido[:50]} - Stock: {stock}")
+                    else:
+                        logging.info(f"✅ Creado sin imagen: {titulo_corregido[:50]} - Stock: {stock}")
+                    return self._producto_creado(handle, producto, stock)
+                
+                # save() devuelve False cuando Shopify rechaza el producto (422)
+                detalle = str(producto.errors.full_messages()) if hasattr(producto, 'errors') else ''
+                clase = clasificar_error(status=422, errores=detalle)
                         
             except Exception as e:
-                error_type = "timeout" if "timeout" in str(e).lower() else "error"
-                if error_type == "timeout":
-                    self.stats['errores_timeout'] += 1
-                
-                if intento < self.max_retries - 1:
-                    tiempo_espera = self.backoff_factor * (2 ** intento)
-                    time.sleep(tiempo_espera)
-                    continue
+                clase = clasificar_error(excepcion=e)
+                detalle = describir_error(e)
+                segundos_retry_after = retry_after(excepcion=e)
+                if clase == TIMEOUT:
+                    self._sumar_stat('errores_timeout')
+            
+            if clase == IMAGEN and not tenia_imagen:
+                # Sin imagen en el producto no hay nada que quitar
+                clase = VALIDACION
+            if clase in CLASES_TRANSITORIAS:
+                verificar_en_shopify = True
+            espera = intentos.siguiente(clase, segundos_retry_after, detalle)
+            if espera is None:
+                logging.warning(f"⚠️ {handle}: error de {clase} sin más reintentos - {detalle[:200]}")
+                break
+            if clase == IMAGEN:
+                self._sumar_stat('errores_imagen')
+                con_imagen = False
+            logging.info(f"🔁 {handle}: error de {clase}, reintento en {espera:.1f}s")
+            time.sleep(espera)
         
         # Todos los intentos fallaron
-        self.stats['productos_con_error'] += 1
-        self.stats['errores_consecutivos'] += 1
+        self._sumar_stat('productos_con_error')
+        if intentos.transitoria:
+            # Solo los problemas de red o del servidor justifican la pausa global
+            self._sumar_stat('errores_consecutivos')
+        self._registrar_en_journal(handle, 'error', detalle=intentos.ultima_clase)
+        self.fallidos.agregar(handle, producto_data, intentos.ultima_clase, intentos.ultimo_detalle)
         return None
 
+    def _producto_creado(self, handle: str, producto: shopify.Product, stock: float) -> shopify.Product:
+        """Registrar un producto recién creado y fijar su inventario"""
+        self._sumar_stat('productos_creados')
+        self._reiniciar_stat('errores_consecutivos')
+        producto_dict = producto.to_dict()
+        self.catalogo.registrar_producto(producto_dict)
+        self._registrar_en_journal(handle, 'creado', producto_dict)
+        # Actualizar inventario después de crear el producto
+        try:
+            stock_int = int(stock)
+            if stock_int > 0 and self.actualizar_inventario_producto(producto, stock_int):
+                self._registrar_en_journal(handle, 'completado')
+        except (ValueError, TypeError):
+            logging.warning(f"⚠️ No se pudo convertir stock a entero: {stock}")
+        
+        return producto
+
     def actualizar_inventario_producto(self, producto: shopify.Product, cantidad: int) -> bool:
         """Actualizar inventario del producto después de crearlo"""
         try:
@@ -392,22 +685,26 @@ class SyscomShopifyImporterRobusto:
                 'Content-Type': 'application/json'
             }
             
-            # Primero, obtener el inventory_item_id
-            url_variant = f"https://{self.shop_name}/admin/api/2025-04/variants/{variant_id}.json"
-            response = self.session.get(url_variant, headers=headers, timeout=self.timeout)
-            
-            if response.status_code != 200:
-                logging.error(f"❌ Error obteniendo variante: {response.status_code}")
-                return False
-            
-            variant_data = response.json()
-            inventory_item_id = variant_data['variant']['inventory_item_id']
+            # El inventory_item_id viene en la respuesta de creación o en el espejo local
+            inventory_item_id = getattr(variante, 'inventory_item_id', None)
+            if not inventory_item_id:
+                registro = self.catalogo.buscar(producto.handle)
+                if registro and registro['inventory_item_ids']:
+                    inventory_item_id = registro['inventory_item_ids'][0]
             
-            # Pausa entre requests para evitar rate limiting
-            time.sleep(0.5)
+            if not inventory_item_id:
+                url_variant = f"{self.api_url}/variants/{variant_id}.json"
+                response = self._peticion_shopify('GET', url_variant, headers=headers)
+                
+                if response.status_code != 200:
+                    logging.error(f"❌ Error obteniendo variante: {response.status_code}")
+                    return False
+                
+                variant_data = response.json()
+                inventory_item_id = variant_data['variant']['inventory_item_id']
             
             # Ahora actualizar el nivel de inventario
-            url_inventory = f"https://{self.shop_name}/admin/api/2025-04/inventory_levels/set.json"
+            url_inventory = f"{self.api_url}/inventory_levels/set.json"
             
             payload = {
                 "location_id": self.location_id,
@@ -415,25 +712,26 @@ class SyscomShopifyImporterRobusto:
                 "available": cantidad
             }
             
-            response = self.session.post(url_inventory, headers=headers, json=payload, timeout=self.timeout)
+            response = self._peticion_shopify('POST', url_inventory, headers=headers, json=payload)
             
             if response.status_code in [200, 201]:
                 logging.info(f"✅ Inventario actualizado: {cantidad} unidades")
-                self.stats['inventario_actualizado'] += 1
-                # Pausa después de actualizar inventario exitosamente
-                time.sleep(0.3)
+                self._sumar_stat('inventario_actualizado')
+                self.catalogo.actualizar_cantidad(producto.handle, cantidad)
                 return True
             else:
                 logging.error(f"❌ Error actualizando inventario: {response.status_code} - {response.text}")
-                self.stats['errores_inventario'] += 1
+                self._sumar_stat('errores_inventario')
                 return False
                 
         except Exception as e:
             logging.error(f"❌ Error actualizando inventario: {e}")
-            self.stats['errores_inventario'] += 1
+            self._sumar_stat('errores_inventario')
             return False
 
-    def importar_productos_automatico(self):
+    def importar_productos_automatico(self, workers: int = 1, sincronizar_catalogo: bool = False,
+                                      delta: Optional[str] = None, actualizar: bool = False,
+                                      reconciliar: bool = False, reanudar: bool = False):
         """Importar todos los productos automáticamente"""
         print("\n" + "="*60)
         print("🛒 SYSCOM TO SHOPIFY - IMPORTADOR AUTOMÁTICO v2.3")
@@ -446,95 +744,291 @@ class SyscomShopifyImporterRobusto:
             print("❌ Sin permisos para crear productos")
             return
         
+        # El espejo local se construye una vez y luego lo mantiene el propio importador
+        if sincronizar_catalogo or not self.catalogo.sincronizado:
+            self.sincronizar_catalogo()
+        else:
+            print(f"🗄️ Espejo local: {self.catalogo.total():,} productos ({self.catalogo.ruta_db})")
+        
         # Obtener y procesar CSV
         archivo_csv = self.descargar_csv()
         if not archivo_csv:
             print("❌ No se pudo obtener CSV")
             return
         
-        productos = self.parsear_csv(archivo_csv)
-        if not productos:
-            print("❌ No se pudieron parsear productos")
-            return
+        productos = self.iterar_productos(archivo_csv)
+        total = None
         
-        productos_con_stock = self.filtrar_productos_con_stock(productos)
-        if not productos_con_stock:
-            print("❌ No hay productos con stock")
-            return
+        # Delta, actualización, reconciliación, --resume y el orden aleatorio necesitan el catálogo completo;
+        # sin ellos los productos se filtran y se envían a medida que se leen
+        if delta or actualizar or reconciliar or reanudar or self.randomizar_orden:
+            productos = list(productos)
+            if not productos:
+                print("❌ No se pudieron parsear productos")
+                return
+            
+            if delta:
+                # 'auto' compara contra el snapshot más reciente de ProductosHora.csv
+                productos = aplicar_delta(archivo_csv, productos, None if delta == 'auto' else delta)
+                print(f"🔀 Productos nuevos o modificados: {len(productos):,}")
+            
+            if actualizar:
+                self.actualizar_existentes(productos)
+            if reconciliar:
+                self.reconciliar_inventario(productos)
+            
+            productos_con_stock = self.filtrar_productos_con_stock(productos)
+            if not productos_con_stock:
+                print("❌ No hay productos con stock")
+                return
+        else:
+            productos_con_stock = self.iterar_con_stock(productos)
         
-        # Randomizar el orden de los productos para evitar patrones predecibles
-        random.shuffle(productos_con_stock)
-        print(f"🎲 Orden de productos randomizado")
+        if reanudar:
+            self.journal.reanudar_corrida(archivo_csv)
+            productos_con_stock = self.omitir_completados(productos_con_stock)
+        else:
+            self.journal.iniciar_corrida(archivo_csv)
+        print(f"📓 Journal: corrida {self.journal.run_id} ({self.journal.ruta_db})")
+        
+        if isinstance(productos_con_stock, list):
+            if self.randomizar_orden:
+                # Randomizar el orden de los productos para evitar patrones predecibles
+                random.shuffle(productos_con_stock)
+                print(f"🎲 Orden de productos randomizado")
+            productos_con_stock = self.anteponer_fallidos(productos_con_stock)
+            total = len(productos_con_stock)
 
-        # Mostrar estadísticas e iniciar
-        print(f"\n📊 ESTADÍSTICAS")
-        print(f"   📋 Total productos: {len(productos):,}")
-        print(f"   📦 Con stock > 0: {len(productos_con_stock):,}")
+            # Mostrar estadísticas e iniciar
+            print(f"\n📊 ESTADÍSTICAS")
+            print(f"   📋 Total productos: {len(productos):,}")
+            print(f"   📦 Con stock > 0: {total:,}")
+        else:
+            productos_con_stock = self.anteponer_fallidos(productos_con_stock)
+            print(f"\n🌊 Modo streaming: los productos se envían mientras se lee el CSV")
         print(f"   📍 Ubicación: {self.location_name}" if self.location_name else "   ⚠️ Sin ubicación")
         
         print(f"\n🚀 INICIANDO IMPORTACIÓN AUTOMÁTICA")
-        print(f"📦 Procesando {len(productos_con_stock):,} productos...")
+        if total is not None:
+            print(f"📦 Procesando {total:,} productos...")
         
         # Iniciar procesamiento
         self.stats['tiempo_inicio'] = datetime.now()
         print(f"⏰ Inicio: {self.stats['tiempo_inicio'].strftime('%H:%M:%S')}")
         
-        # Procesar por lotes
-        for i in range(0, len(productos_con_stock), self.max_products_per_batch):
-            lote = productos_con_stock[i:i + self.max_products_per_batch]
-            lote_num = (i // self.max_products_per_batch) + 1
-            total_lotes = (len(productos_con_stock) + self.max_products_per_batch - 1) // self.max_products_per_batch
-            
-            print(f"\n📦 Lote {lote_num}/{total_lotes}")
-            for j, producto_data in enumerate(lote):
-                # Manejar errores consecutivos
-                self.manejar_errores_consecutivos()
-                
-                self.stats['productos_procesados'] += 1
-                producto_num = i + j + 1
-                
-                titulo = producto_data.get('Title', 'Sin título')[:50]
-                print(f"🔄 {producto_num}/{len(productos_con_stock)}: {titulo}")
-                
-                try:
-                    producto = self.crear_producto_shopify_ultra_robusto(producto_data)
-                    if producto:
-                        self.stats['errores_consecutivos'] = 0
-                        
-                        # Pausa de 1 minuto cada 5 productos creados exitosamente
-                        if self.stats['productos_creados'] % 5 == 0:
-                            print(f"🕐 Pausa de 1 minuto después de {self.stats['productos_creados']} productos creados...")
-                            logging.info(f"🕐 Pausa de 1 minuto después de {self.stats['productos_creados']} productos creados...")
-                            time.sleep(60)  # 1 minuto
-                            
-                except Exception as e:
-                    logging.error(f"❌ Error crítico: {e}")
-                    self.stats['productos_con_error'] += 1
-                    self.stats['errores_consecutivos'] += 1
-                
-                # Pausa entre productos
-                time.sleep(self.delay_between_requests)
-            
-            # Pausa entre lotes
-            if i + self.max_products_per_batch < len(productos_con_stock):
-                time.sleep(self.delay_between_requests * 2)
-                
-                # Progreso cada 10 lotes
-                if lote_num % 10 == 0:
-                    print(f"📊 Progreso: {lote_num}/{total_lotes} lotes")
-                    print(f"✅ Creados: {self.stats['productos_creados']:,}")
-                    print(f"❌ Errores: {self.stats['productos_con_error']:,}")
+        self._procesar_productos(productos_con_stock, workers, total)
+        self.journal.terminar_corrida()
         
         # Finalizar
         self.stats['tiempo_fin'] = datetime.now()
         self.mostrar_estadisticas_finales()
+
+    def anteponer_fallidos(self, productos_con_stock: Iterable[Dict]) -> Iterable[Dict]:
+        """
+        Reintentar los productos de la cola de fallidos cuya espera ya venció
+
+        Si el handle viene en el CSV de esta corrida se envía su fila actual; la fila guardada
+        solo se usa para los que ya no vienen (así un --delta también reintenta productos que no
+        cambiaron). Con el catálogo en memoria los fallidos van primero; en streaming van en el
+        orden del CSV y los que no aparecieron se envían al final.
+        """
+        pendientes = {}
+        for producto_data in self.fallidos.pendientes():
+            pendientes.setdefault(producto_data.get('Handle', '').strip(), producto_data)
+        if not pendientes:
+            return productos_con_stock
+        print(f"📮 Reintentando {len(pendientes):,} productos fallidos en corridas anteriores")
         
-        # Limpiar temporal
-        if archivo_csv.startswith("productos_descargado_"):
-            try:
-                os.remove(archivo_csv)
-            except:
-                pass
+        if isinstance(productos_con_stock, list):
+            actuales = {}
+            resto = []
+            for producto_data in productos_con_stock:
+                handle = producto_data.get('Handle', '').strip()
+                if handle in pendientes:
+                    actuales.setdefault(handle, producto_data)
+                else:
+                    resto.append(producto_data)
+            primero = [actuales.get(handle, producto_data) for handle, producto_data in pendientes.items()]
+            return primero + resto
+        return self._fallidos_al_final(productos_con_stock, pendientes)
+
+    def _fallidos_al_final(self, productos_con_stock: Iterable[Dict], pendientes: Dict[str, Dict]) -> Iterator[Dict]:
+        """Streaming: el CSV tal cual y después las filas guardadas de los fallidos que no aparecieron"""
+        vistos = set()
+        for producto_data in productos_con_stock:
+            handle = producto_data.get('Handle', '').strip()
+            if handle in pendientes:
+                vistos.add(handle)
+            yield producto_data
+        for handle, producto_data in pendientes.items():
+            # Un fallido que vino sin stock se quitó de la cola al filtrarlo
+            if handle not in vistos and self.fallidos.contiene(handle):
+                yield producto_data
+
+    def omitir_completados(self, productos_con_stock: Iterable[Dict]) -> List[Dict]:
+        """
+        Quitar los handles que la corrida reanudada ya terminó
+
+        Los productos creados cuyo inventario no llegó a fijarse no se reenvían (la búsqueda de
+        duplicados los daría por terminados sin inventario): se completan con mutaciones agrupadas
+        usando el inventory_item_id del journal, del espejo local o, si falta, de la API.
+        """
+        estados = self.journal.estados()
+        pendientes = []
+        inventario_pendiente = []
+        terminados = 0
+        sin_inventario = 0
+
+        for producto_data in productos_con_stock:
+            handle = producto_data.get('Handle', '').strip()
+            registro = estados.get(handle)
+            if registro and registro['estado'] in ESTADOS_TERMINADOS:
+                terminados += 1
+            elif registro and registro['estado'] == 'creado':
+                inventory_item_id = registro['inventory_item_id'] if self.location_id else None
+                if self.location_id and not inventory_item_id:
+                    inventory_item_id = self._buscar_inventory_item_id(handle, registro['product_id'])
+                if not inventory_item_id:
+                    # Queda como 'creado' para completarlo en otra reanudación o con --reconciliar-inventario
+                    sin_inventario += 1
+                    continue
+                cantidad = int(float(producto_data.get('Variant Inventory Qty', 0)))
+                inventario_pendiente.append((handle, {
+                    'inventoryItemId': gid('InventoryItem', inventory_item_id),
+                    'locationId': gid('Location', self.location_id),
+                    'quantity': cantidad
+                }, cantidad))
+            else:
+                pendientes.append(producto_data)
+
+        print(f"⏭️ Reanudando: {terminados:,} productos ya completados, {len(pendientes):,} pendientes")
+        if sin_inventario:
+            motivo = "sin ubicación configurada" if not self.location_id else "sin inventory_item_id"
+            print(f"⚠️ {sin_inventario:,} productos ya creados quedan sin inventario ({motivo})")
+
+        if inventario_pendiente:
+            print(f"📦 Completando inventario de {len(inventario_pendiente):,} productos ya creados")
+            for i in range(0, len(inventario_pendiente), self.cantidades_por_mutacion):
+                lote = inventario_pendiente[i:i + self.cantidades_por_mutacion]
+                if self._enviar_cantidades(lote) == len(lote):
+                    for handle, _, _ in lote:
+                        self._registrar_en_journal(handle, 'completado')
+
+        return pendientes
+
+    def _buscar_inventory_item_id(self, handle: str, product_id: Optional[int]) -> Optional[int]:
+        """inventory_item_id de un producto ya creado: primero el espejo local, después la API"""
+        registro = self.catalogo.buscar(handle)
+        if registro and registro['inventory_item_ids'] and registro['inventory_item_ids'][0]:
+            return registro['inventory_item_ids'][0]
+        if not product_id:
+            return None
+        try:
+            response = self._peticion_shopify(
+                'GET', f"{self.api_url}/products/{product_id}.json",
+                headers={'X-Shopify-Access-Token': self.access_token}, params={'fields': 'variants'}
+            )
+            if response.status_code != 200:
+                logging.warning(f"⚠️ No se pudo obtener el producto {product_id}: {response.status_code}")
+                return None
+            variantes = response.json()['product'].get('variants') or []
+            return variantes[0].get('inventory_item_id') if variantes else None
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo obtener el producto {product_id}: {e}")
+            return None
+
+    def _procesar_productos(self, productos_con_stock: Iterable[Dict], workers: int,
+                            total: Optional[int] = None):
+        """Elegir el modo de procesamiento según el número de workers (total es None en streaming)"""
+        if workers > 1:
+            self._procesar_con_workers(productos_con_stock, workers, total)
+        else:
+            self._procesar_por_lotes(productos_con_stock, total)
+
+    def _procesar_producto(self, producto_data: Dict, producto_num: int, total: Optional[int]):
+        """Procesar un producto del CSV (usado tanto en modo secuencial como con workers)"""
+        # Manejar errores consecutivos
+        self.manejar_errores_consecutivos()
+        
+        self._sumar_stat('productos_procesados')
+        
+        titulo = producto_data.get('Title', 'Sin título')[:50]
+        print(f"🔄 {producto_num}/{total}: {titulo}" if total else f"🔄 {producto_num}: {titulo}")
+        
+        try:
+            producto = self.crear_producto_shopify_ultra_robusto(producto_data)
+            if producto:
+                self._reiniciar_stat('errores_consecutivos')
+                self.fallidos.quitar(producto_data.get('Handle', '').strip())
+                    
+        except Exception as e:
+            logging.error(f"❌ Error crítico: {e}")
+            clase = clasificar_error(excepcion=e)
+            self._sumar_stat('productos_con_error')
+            if clase in CLASES_TRANSITORIAS:
+                self._sumar_stat('errores_consecutivos')
+            self.fallidos.agregar(producto_data.get('Handle', '').strip(), producto_data,
+                                  clase, describir_error(e))
+
+    def _mostrar_progreso(self, mensaje: str):
+        """Mostrar progreso parcial de la importación"""
+        print(f"📊 Progreso: {mensaje}")
+        print(f"✅ Creados: {self.stats['productos_creados']:,}")
+        print(f"❌ Errores: {self.stats['productos_con_error']:,}")
+
+    def _procesar_por_lotes(self, productos_con_stock: Iterable[Dict], total: Optional[int] = None):
+        """Procesar productos uno por uno, agrupados en lotes"""
+        productos = iter(productos_con_stock)
+        total_lotes = (total + self.max_products_per_batch - 1) // self.max_products_per_batch if total else None
+        producto_num = 0
+        
+        for lote_num in count(1):
+            lote = list(islice(productos, self.max_products_per_batch))
+            if not lote:
+                break
+            
+            print(f"\n📦 Lote {lote_num}/{total_lotes}" if total_lotes else f"\n📦 Lote {lote_num}")
+            for producto_data in lote:
+                producto_num += 1
+                self._procesar_producto(producto_data, producto_num, total)
+            
+            # Progreso cada 10 lotes
+            if lote_num % 10 == 0 and (total is None or producto_num < total):
+                self._mostrar_progreso(f"{lote_num}/{total_lotes} lotes" if total_lotes else f"{lote_num} lotes")
+
+    def _procesar_con_workers(self, productos_con_stock: Iterable[Dict], workers: int,
+                              total: Optional[int] = None):
+        """Procesar productos en un pool de hilos que comparte el mismo limitador de API"""
+        print(f"🧵 Modo concurrente: {workers} workers")
+        
+        # Solo se leen del CSV los productos que caben en la ventana de trabajo
+        ventana = workers * 2
+        intervalo_progreso = self.max_products_per_batch * 10
+        completados = 0
+        
+        def recoger(terminados):
+            nonlocal completados
+            for futuro in terminados:
+                futuro.result()
+                completados += 1
+                if completados % intervalo_progreso == 0 and (total is None or completados < total):
+                    self._mostrar_progreso(f"{completados:,}/{total:,} productos" if total else f"{completados:,} productos")
+        
+        # Una conexión keep-alive por hilo para que ninguno tenga que abrir la suya
+        self.transporte.redimensionar(max(self.transporte.tamano_pool, workers))
+        executor = ThreadPoolExecutor(max_workers=workers, initializer=self._inicializar_hilo_shopify)
+        try:
+            en_vuelo = set()
+            for producto_num, producto_data in enumerate(productos_con_stock, 1):
+                if len(en_vuelo) >= ventana:
+                    terminados, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    recoger(terminados)
+                en_vuelo.add(executor.submit(self._procesar_producto, producto_data, producto_num, total))
+            recoger(as_completed(en_vuelo))
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
 
     def mostrar_estadisticas_finales(self):
         """Mostrar estadísticas finales"""
@@ -551,8 +1045,19 @@ class SyscomShopifyImporterRobusto:
         print(f"📦 Inventario actualizado: {self.stats['inventario_actualizado']:,}")
         print(f"❌ Errores inventario: {self.stats['errores_inventario']:,}")
         print(f"⏭️ Duplicados: {self.stats['productos_duplicados']:,}")
+        print(f"💲 Precios actualizados: {self.stats['precios_actualizados']:,}")
+        print(f"❌ Errores de actualización: {self.stats['errores_actualizacion']:,}")
         print(f"❌ Errores: {self.stats['productos_con_error']:,}")
         print(f"⏰ Timeouts: {self.stats['errores_timeout']:,}")
+        print(f"🚦 Esperas por límite de API: {self.rate_limiter.stats['esperas']:,} ({self.rate_limiter.stats['tiempo_espera']:.0f}s)")
+        print(f"🔁 Reintentos: {self.politica_reintentos.stats['reintentos']:,} "
+              f"({self.politica_reintentos.stats['tiempo_espera']:.0f}s); errores por clase: {self.politica_reintentos.resumen()}")
+        if self.fallidos.total():
+            por_clase = ", ".join(f"{clase}: {n:,}" for clase, n in self.fallidos.resumen().items())
+            print(f"📮 En cola de fallidos: {self.fallidos.total():,} ({por_clase}) - {self.fallidos.ruta_db}")
+        conexiones = self.transporte.estadisticas()
+        print(f"🔌 Conexiones: {conexiones['conexiones_nuevas']:,} abiertas, "
+              f"{conexiones['conexiones_reutilizadas']:,} de {conexiones['peticiones']:,} peticiones reutilizadas")
         
         if self.stats['productos_procesados'] > 0:
             tasa_exito = (self.stats['productos_creados'] / self.stats['productos_procesados']) * 100
@@ -565,9 +1070,51 @@ class SyscomShopifyImporterRobusto:
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description="Importador SYSCOM to Shopify")
+    parser.add_argument('--workers', type=int,
+                        help="Productos procesados en paralelo (comparten el límite de API). "
+                             "Default: 1; con --backend async, el tamaño de la cubeta de la API")
+    parser.add_argument('--backend', choices=['sync', 'async', 'bulk'], default='sync',
+                        help="Motor de importación: hilos con la librería shopify, asyncio con aiohttp "
+                             "o una sola operación bulk de GraphQL")
+    parser.add_argument('--sincronizar-catalogo', action='store_true',
+                        help="Reconstruir el espejo local del catálogo antes de importar")
+    parser.add_argument('--delta', nargs='?', const='auto', metavar='CSV_ANTERIOR',
+                        help="Procesar solo lo que cambió respecto a un snapshot anterior")
+    parser.add_argument('--actualizar', action='store_true',
+                        help="Actualizar precio y stock de productos que ya existen en la tienda")
+    parser.add_argument('--reconciliar-inventario', action='store_true',
+                        help="Comparar el inventario de la ubicación contra el CSV y corregir diferencias")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanudar la última importación interrumpida saltando lo ya completado")
+    args = parser.parse_args()
+    
     try:
-        importador = SyscomShopifyImporterRobusto()
-        importador.importar_productos_automatico()
+        if args.backend == 'async':
+            from shopify_async import SyscomShopifyImporterAsync
+            importador = SyscomShopifyImporterAsync()
+        elif args.backend == 'bulk':
+            from importacion_bulk import SyscomShopifyImporterBulk
+            importador = SyscomShopifyImporterBulk()
+        else:
+            importador = SyscomShopifyImporterRobusto()
+        
+        workers = args.workers
+        if args.backend == 'async':
+            if workers is None:
+                # Productos en vuelo: los que caben en la cubeta, el limitador regula el resto
+                workers = importador.rate_limiter.capacidad
+            elif workers <= 1:
+                logging.warning("⚠️ --backend async con --workers 1 envía un producto a la vez; "
+                                "omite --workers para usar la concurrencia por defecto")
+        importador.importar_productos_automatico(
+            workers=max(1, workers or 1),
+            sincronizar_catalogo=args.sincronizar_catalogo,
+            delta=args.delta,
+            actualizar=args.actualizar,
+            reconciliar=args.reconciliar_inventario,
+            reanudar=args.resume
+        )
     except KeyboardInterrupt:
         print("\n👋 Importación interrumpida")
     except Exception as e:
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Cálculo de cambios entre dos snapshots del catálogo SYSCOM
+Compara por Handle/Variant SKU y separa productos nuevos, cambios de precio,
+cambios de stock, cambios de contenido y productos eliminados
+"""
+
+import glob
+import hashlib
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from lector_csv import LectorCatalogo, analizar_archivo, detectar_encoding
+from snapshots_catalogo import AlmacenSnapshots
+
+CAMPOS_PRECIO = ('Variant Price', 'Variant Compare At Price')
+CAMPO_STOCK = 'Variant Inventory Qty'
+
+TIPOS_CAMBIO = ('nuevos', 'precio', 'stock', 'contenido', 'eliminados')
+
+
+def _numero(valor: Optional[str]):
+    """Normalizar valores numéricos para que '5' y '5.00' se consideren iguales"""
+    try:
+        return float(valor)
+    except (ValueError, TypeError):
+        return (valor or '').strip()
+
+
+def _hash_contenido(producto: Dict) -> str:
+    """Hash de todos los campos que no son precio ni stock"""
+    h = hashlib.blake2b(digest_size=16)
+    # csv.DictReader guarda los campos de sobra de una fila larga bajo la clave None
+    for campo in sorted(k for k in producto if k is not None):
+        if campo in CAMPOS_PRECIO or campo == CAMPO_STOCK:
+            continue
+        h.update(campo.encode('utf-8'))
+        h.update(b'\x1f')
+        h.update((producto[campo] or '').encode('utf-8'))
+        h.update(b'\x1e')
+    return h.hexdigest()
+
+
+def _claves(productos: Iterable[Dict]):
+    """Generar (clave, producto); las filas extra de un mismo Handle/SKU se numeran"""
+    vistos: Dict[Tuple[str, str], int] = {}
+    for producto in productos:
+        base = ((producto.get('Handle') or '').strip(), (producto.get('Variant SKU') or '').strip())
+        if not any(base):
+            continue
+        n = vistos.get(base, 0)
+        vistos[base] = n + 1
+        yield base + (n,), producto
+
+
+def indexar_snapshot(productos: Iterable[Dict]) -> Dict[Tuple[str, str, int], Tuple]:
+    """Resumir un snapshot en {clave: (precios, stock, hash de contenido)}"""
+    return {
+        clave: (
+            tuple(_numero(producto.get(campo)) for campo in CAMPOS_PRECIO),
+            _numero(producto.get(CAMPO_STOCK)),
+            _hash_contenido(producto)
+        )
+        for clave, producto in _claves(productos)
+    }
+
+
+def calcular_delta(anterior: Iterable[Dict], nuevo: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Comparar dos snapshots del catálogo
+
+    Args:
+        anterior: Filas del snapshot previo
+        nuevo: Filas del snapshot actual
+
+    Returns:
+        Diccionario con las listas 'nuevos', 'precio', 'stock', 'contenido' y 'eliminados'.
+        Una fila puede aparecer en varios tipos (p.ej. cambió precio y stock).
+        'eliminados' solo contiene Handle y Variant SKU.
+    """
+    indice_anterior = indexar_snapshot(anterior)
+    cambios: Dict[str, List[Dict]] = {tipo: [] for tipo in TIPOS_CAMBIO}
+
+    for clave, producto in _claves(nuevo):
+        previo = indice_anterior.pop(clave, None)
+        if previo is None:
+            cambios['nuevos'].append(producto)
+            continue
+
+        precios, stock, contenido = previo
+        if tuple(_numero(producto.get(campo)) for campo in CAMPOS_PRECIO) != precios:
+            cambios['precio'].append(producto)
+        if _numero(producto.get(CAMPO_STOCK)) != stock:
+            cambios['stock'].append(producto)
+        if _hash_contenido(producto) != contenido:
+            cambios['contenido'].append(producto)
+
+    cambios['eliminados'] = [
+        {'Handle': handle, 'Variant SKU': sku}
+        for handle, sku, n in indice_anterior
+        if n == 0
+    ]
+    return cambios
+
+
+def claves_modificadas(cambios: Dict[str, List[Dict]]) -> Set[Tuple[str, str]]:
+    """(Handle, Variant SKU) de las filas nuevas o con algún cambio"""
+    return {
+        ((producto.get('Handle') or '').strip(), (producto.get('Variant SKU') or '').strip())
+        for tipo in ('nuevos', 'precio', 'stock', 'contenido')
+        for producto in cambios[tipo]
+    }
+
+
+def filtrar_modificados(productos: Iterable[Dict], claves: Set[Tuple[str, str]]) -> List[Dict]:
+    """Conservar solo los productos cuya clave está en el conjunto de cambios"""
+    return [
+        producto for producto in productos
+        if ((producto.get('Handle') or '').strip(), (producto.get('Variant SKU') or '').strip()) in claves
+    ]
+
+
+def resumen_delta(cambios: Dict[str, List[Dict]]) -> str:
+    """Texto corto con el conteo de cada tipo de cambio"""
+    return ", ".join(f"{tipo}: {len(cambios[tipo]):,}" for tipo in TIPOS_CAMBIO)
+
+
+def snapshot_anterior(directorio: str = '.') -> Optional[str]:
+    """Ruta del backup sin comprimir más reciente (versiones anteriores al almacén de snapshots)"""
+    backups = sorted(glob.glob(os.path.join(directorio, 'ProductosHora_backup_*.csv')))
+    return backups[-1] if backups else None
+
+
+def leer_snapshot(ruta: str) -> List[Dict]:
+    """Leer un snapshot CSV con el encoding detectado por el lector compartido"""
+    encoding = detectar_encoding(ruta)
+    if not encoding:
+        logging.error(f"❌ No se pudo leer el snapshot {ruta}")
+        return []
+    # El snapshot es una copia de un CSV ya leído: normalmente sale de la copia columnar
+    return list(LectorCatalogo(ruta, encoding))
+
+
+def leer_anterior(archivo_actual: str, archivo_anterior: Optional[str] = None) -> Tuple[Optional[str], List[Dict]]:
+    """
+    Filas del snapshot contra el que se compara archivo_actual
+
+    Sin archivo_anterior se usa el snapshot más reciente con un contenido distinto al actual
+    y, si el almacén está vacío, el último ProductosHora_backup_*.csv.
+
+    Returns:
+        (nombre del snapshot, filas); (None, []) si no hay snapshot anterior
+    """
+    if archivo_anterior:
+        if not os.path.exists(archivo_anterior):
+            return None, []
+        return os.path.basename(archivo_anterior), leer_snapshot(archivo_anterior)
+
+    almacen = AlmacenSnapshots()
+    analisis = analizar_archivo(archivo_actual)
+    entrada = almacen.anterior_a(analisis['hash'] if analisis else None)
+    if entrada:
+        return f"snapshot del {entrada['fecha']}", almacen.leer_entrada(entrada)
+
+    respaldo = snapshot_anterior(os.path.dirname(os.path.abspath(archivo_actual)))
+    if respaldo:
+        return os.path.basename(respaldo), leer_snapshot(respaldo)
+    return None, []
+
+
+def aplicar_delta(archivo_actual: str, productos: List[Dict], archivo_anterior: Optional[str] = None) -> List[Dict]:
+    """
+    Reducir los productos parseados a los que cambiaron respecto al snapshot anterior
+
+    Args:
+        archivo_actual: CSV del que salieron los productos
+        productos: Productos ya parseados (pueden tener categorías convertidas)
+        archivo_anterior: CSV de referencia; por defecto el snapshot más reciente del almacén
+
+    Returns:
+        Lista con solo los productos nuevos o modificados
+    """
+    nombre_anterior, anteriores = leer_anterior(archivo_actual, archivo_anterior)
+    if not nombre_anterior:
+        logging.info("📭 Sin snapshot anterior, se procesa el catálogo completo")
+        return productos
+
+    # Se compara el CSV crudo de ambos lados: los productos parseados ya pueden venir transformados
+    cambios = calcular_delta(anteriores, leer_snapshot(archivo_actual))
+    logging.info(f"🔀 Cambios contra {nombre_anterior}: {resumen_delta(cambios)}")
+    if cambios['eliminados']:
+        logging.info(f"🗑️ {len(cambios['eliminados']):,} productos ya no están en el catálogo SYSCOM")
+
+    return filtrar_modificados(productos, claves_modificadas(cambios))
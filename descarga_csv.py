@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Descarga del CSV de SYSCOM compartida por el importador y el splitter
+Escribe el cuerpo a disco por bloques (con gzip aceptado), revisa HTML vs CSV solo en
+los primeros KB y guarda ETag/Last-Modified junto al archivo. Como el servidor solo
+permite una descarga por hora, dentro de esa ventana no se hace ninguna petición.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import requests
+
+# Segundos durante los que la copia local se considera vigente (1 descarga por hora)
+VENTANA_DESCARGA = int(os.getenv('CSV_DOWNLOAD_WINDOW', 3600))
+
+TAMANO_MUESTRA = 2048
+TAMANO_BLOQUE = 1 << 16
+
+
+def es_html(muestra: str, content_type: str = '') -> bool:
+    """El servidor responde una página HTML cuando se excede el límite de descargas"""
+    muestra = muestra.lstrip()
+    return (muestra.startswith('<!DOCTYPE html>') or
+            muestra.startswith('<html') or
+            '<html' in muestra[:100] or
+            'text/html' in content_type)
+
+
+def parece_csv(muestra: str, content_type: str = '') -> bool:
+    """Verificar con los primeros KB que el contenido sea CSV"""
+    muestra = muestra.lstrip()
+    return ('csv' in content_type or
+            muestra.count(',') > muestra.count(';') and
+            '\n' in muestra and
+            not muestra.startswith('<'))
+
+
+class DescargaCSV:
+    def __init__(self, url: str, destino: str = 'ProductosHora.csv',
+                 session: Optional[requests.Session] = None, timeout: int = 30,
+                 ventana: int = VENTANA_DESCARGA):
+        """
+        Inicializar la descarga
+
+        Args:
+            url: URL del reporte de SYSCOM
+            destino: Archivo local que se reemplaza con cada descarga válida
+            session: Sesión HTTP a reutilizar (se crea una si no se indica)
+            timeout: Timeout de conexión y de lectura entre bloques
+            ventana: Segundos en los que la copia local se usa sin consultar al servidor
+        """
+        self.url = url
+        self.destino = destino
+        self.ruta_meta = f"{destino}.meta.json"
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.ventana = ventana
+
+    def leer_meta(self) -> Dict:
+        """ETag, Last-Modified y fecha de la última descarga (vacío si no hay)"""
+        try:
+            with open(self.ruta_meta, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return meta if isinstance(meta, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_meta(self, meta: Dict):
+        temporal = f"{self.ruta_meta}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+            os.replace(temporal, self.ruta_meta)
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudieron guardar los metadatos de descarga: {e}")
+
+    def segundos_desde_descarga(self) -> Optional[float]:
+        """Antigüedad de la copia local según los metadatos (None si no hay copia)"""
+        meta = self.leer_meta()
+        if not os.path.exists(self.destino) or 'consultado_en' not in meta:
+            return None
+        return time.time() - meta['consultado_en']
+
+    def dentro_de_ventana(self) -> bool:
+        """True si la copia local es de esta misma ventana y no vale la pena consultar"""
+        antiguedad = self.segundos_desde_descarga()
+        return antiguedad is not None and 0 <= antiguedad < self.ventana
+
+    def descargar(self, forzar: bool = False,
+                  al_reemplazar: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        Actualizar el archivo local si el servidor tiene una versión nueva
+
+        Args:
+            forzar: Consultar al servidor aunque la copia local esté dentro de la ventana
+            al_reemplazar: Se llama con la ruta del archivo anterior justo antes de reemplazarlo
+
+        Returns:
+            {'estado': ..., 'ruta': ...}; estado es 'vigente' (sin petición), 'no_modificado' (304),
+            'descargado', 'html' (límite del servidor), 'invalido' o 'error'
+        """
+        if not forzar and self.dentro_de_ventana():
+            minutos = self.segundos_desde_descarga() / 60
+            logging.info(f"🕐 {self.destino} se descargó hace {minutos:.0f} min, se usa sin consultar al servidor")
+            return {'estado': 'vigente', 'ruta': self.destino}
+
+        meta = self.leer_meta()
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if os.path.exists(self.destino):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        temporal = f"{self.destino}.descarga"
+        try:
+            with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    meta['consultado_en'] = time.time()
+                    self._guardar_meta(meta)
+                    logging.info(f"✅ {self.destino} sin cambios en el servidor (304)")
+                    return {'estado': 'no_modificado', 'ruta': self.destino}
+                if response.status_code != 200:
+                    logging.warning(f"⚠️ Error HTTP: {response.status_code}")
+                    return {'estado': 'error', 'ruta': None, 'status': response.status_code}
+
+                content_type = response.headers.get('content-type', '').lower()
+                estado = self._guardar_cuerpo(response, temporal, content_type)
+                if estado != 'descargado':
+                    self._borrar(temporal)
+                    return {'estado': estado, 'ruta': None}
+
+                nuevo_meta = {
+                    'url': self.url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'descargado_en': datetime.now().isoformat(),
+                    'consultado_en': time.time(),
+                    'bytes': os.path.getsize(temporal)
+                }
+        except Exception:
+            self._borrar(temporal)
+            raise
+
+        if al_reemplazar and os.path.exists(self.destino):
+            al_reemplazar(self.destino)
+        os.replace(temporal, self.destino)
+        self._guardar_meta(nuevo_meta)
+        logging.info(f"✅ CSV descargado y actualizado: {self.destino} ({nuevo_meta['bytes']:,} bytes)")
+        return {'estado': 'descargado', 'ruta': self.destino}
+
+    def _guardar_cuerpo(self, response: requests.Response, temporal: str, content_type: str) -> str:
+        """Escribir el cuerpo por bloques, revisando solo el inicio; devuelve el estado"""
+        muestra = b''
+        revisado = False
+        with open(temporal, 'wb') as f:
+            for bloque in response.iter_content(chunk_size=TAMANO_BLOQUE):
+                if not revisado:
+                    muestra += bloque
+                    if len(muestra) < TAMANO_MUESTRA:
+                        continue
+                    estado = self._revisar_muestra(muestra, content_type)
+                    if estado:
+                        return estado
+                    revisado = True
+                    bloque = muestra
+                f.write(bloque)
+
+            if not revisado:
+                # Cuerpo más chico que la muestra
+                estado = self._revisar_muestra(muestra, content_type)
+                if estado:
+                    return estado
+                f.write(muestra)
+        return 'descargado'
+
+    def _revisar_muestra(self, muestra: bytes, content_type: str) -> Optional[str]:
+        """None si el inicio del cuerpo es CSV; si no, el estado de error"""
+        texto = muestra[:TAMANO_MUESTRA].decode('utf-8', errors='replace')
+        if es_html(texto, content_type):
+            logging.warning(f"⚠️ Servidor devolvió HTML en lugar de CSV (restricción de descarga)")
+            logging.info("📋 Parece que hay límite de 1 descarga por hora")
+            return 'html'
+        if not parece_csv(texto, content_type):
+            logging.warning(f"⚠️ Contenido no parece CSV válido")
+            return 'invalido'
+        return None
+
+    def _borrar(self, ruta: str):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
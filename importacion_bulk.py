@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Importación masiva con Bulk Operations de Shopify
+Serializa los productos en un JSONL de mutaciones productSet, lo sube con un staged upload,
+lanza una sola operación bulk y lee el JSONL de resultados para actualizar estadísticas y espejo local
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+from csv_to_shopify import SyscomShopifyImporterRobusto
+from politica_reintentos import SERVIDOR, clasificar_error, describir_error
+from shopify_graphql import ShopifyGraphQL, gid
+
+MUTACION_PRODUCT_SET = """
+mutation call($input: ProductSetInput!) {
+  productSet(input: $input) {
+    product {
+      id
+      handle
+      variants(first: 1) { nodes { id sku price inventoryItem { id } } }
+    }
+    userErrors { field message }
+  }
+}
+"""
+
+ESTADOS_FINALES = ('COMPLETED', 'FAILED', 'CANCELED', 'EXPIRED')
+
+
+def id_numerico(gid_shopify: Optional[str]) -> Optional[int]:
+    """Extraer el ID numérico de un ID global (gid://shopify/Product/123 -> 123)"""
+    if not gid_shopify:
+        return None
+    return int(gid_shopify.rsplit('/', 1)[-1])
+
+
+class ImportadorBulkShopify:
+    def __init__(self, graphql: ShopifyGraphQL, session: requests.Session,
+                 intervalo_sondeo: float = 5.0, timeout: int = 60):
+        """
+        Inicializar el importador bulk
+
+        Args:
+            graphql: Cliente GraphQL apuntando a la tienda (o a un servidor local de prueba)
+            session: Sesión HTTP para subir el JSONL y descargar los resultados
+            intervalo_sondeo: Segundos entre consultas de estado de la operación
+            timeout: Timeout de subida/descarga
+        """
+        self.graphql = graphql
+        self.session = session
+        self.intervalo_sondeo = intervalo_sondeo
+        self.timeout = timeout
+        # Último estado de la operación (status, errorCode, objectCount)
+        self.operacion: Optional[Dict] = None
+
+    def escribir_jsonl(self, entradas: Iterable[Dict], ruta: str) -> int:
+        """Escribir una línea de variables {"input": ...} por producto"""
+        total = 0
+        with open(ruta, 'w', encoding='utf-8') as f:
+            for entrada in entradas:
+                f.write(json.dumps({'input': entrada}, ensure_ascii=False))
+                f.write('\n')
+                total += 1
+        return total
+
+    def subir_jsonl(self, ruta: str) -> str:
+        """Crear un staged upload, subir el archivo y devolver el stagedUploadPath"""
+        data = self.graphql.ejecutar("""
+            mutation SubirVariables($input: [StagedUploadInput!]!) {
+              stagedUploadsCreate(input: $input) {
+                stagedTargets { url resourceUrl parameters { name value } }
+                userErrors { field message }
+              }
+            }
+        """, {'input': [{
+            'resource': 'BULK_MUTATION_VARIABLES',
+            'filename': os.path.basename(ruta),
+            'mimeType': 'text/jsonl',
+            'httpMethod': 'POST'
+        }]})
+
+        resultado = data['stagedUploadsCreate']
+        if resultado['userErrors']:
+            raise RuntimeError(f"stagedUploadsCreate: {resultado['userErrors']}")
+        destino = resultado['stagedTargets'][0]
+        parametros = {p['name']: p['value'] for p in destino['parameters']}
+
+        with open(ruta, 'rb') as f:
+            response = self.session.post(
+                destino['url'], data=parametros,
+                files={'file': (os.path.basename(ruta), f, 'text/jsonl')},
+                timeout=self.timeout
+            )
+        if response.status_code not in (200, 201, 204):
+            raise RuntimeError(f"Error subiendo JSONL: {response.status_code} - {response.text[:200]}")
+
+        return parametros['key']
+
+    def lanzar_operacion(self, staged_path: str) -> str:
+        """Lanzar bulkOperationRunMutation y devolver el ID de la operación"""
+        data = self.graphql.ejecutar("""
+            mutation LanzarBulk($mutation: String!, $path: String!) {
+              bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $path) {
+                bulkOperation { id status }
+                userErrors { field message }
+              }
+            }
+        """, {'mutation': MUTACION_PRODUCT_SET, 'path': staged_path})
+
+        resultado = data['bulkOperationRunMutation']
+        if resultado['userErrors']:
+            raise RuntimeError(f"bulkOperationRunMutation: {resultado['userErrors']}")
+        return resultado['bulkOperation']['id']
+
+    def esperar_operacion(self, operacion_id: str) -> Dict:
+        """Consultar el estado de la operación hasta que termine"""
+        while True:
+            data = self.graphql.ejecutar("""
+                query EstadoBulk($id: ID!) {
+                  node(id: $id) {
+                    ... on BulkOperation { id status errorCode objectCount url partialDataUrl }
+                  }
+                }
+            """, {'id': operacion_id})
+            operacion = data['node']
+            logging.info(f"⏳ Operación bulk {operacion['status']}: {operacion.get('objectCount') or 0} objetos")
+            if operacion['status'] in ESTADOS_FINALES:
+                return operacion
+            time.sleep(self.intervalo_sondeo)
+
+    def leer_resultados(self, url: str) -> Iterator[Dict]:
+        """Descargar el JSONL de resultados línea por línea"""
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            for linea in response.iter_lines(decode_unicode=True):
+                if not linea:
+                    continue
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    # Descarga cortada: los productos sin resultado se cuentan como fallidos
+                    logging.warning(f"⚠️ Línea de resultados incompleta: {linea[:100]}")
+
+    def ejecutar(self, entradas: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Correr la importación completa y generar un resultado por producto, en el orden de entrada
+
+        Cada resultado trae 'linea', 'producto' (JSON de productSet o None), 'errores' y
+        'rechazado' (True si los errores son userErrors de validación)
+        """
+        fd, ruta = tempfile.mkstemp(prefix='productos_bulk_', suffix='.jsonl')
+        os.close(fd)
+        try:
+            total = self.escribir_jsonl(entradas, ruta)
+            logging.info(f"📝 JSONL generado: {total:,} productos")
+            if not total:
+                return
+            staged_path = self.subir_jsonl(ruta)
+        finally:
+            os.remove(ruta)
+
+        operacion_id = self.lanzar_operacion(staged_path)
+        logging.info(f"🚀 Operación bulk lanzada: {operacion_id}")
+        operacion = self.esperar_operacion(operacion_id)
+        self.operacion = operacion
+
+        url = operacion.get('url') or operacion.get('partialDataUrl')
+        if operacion['status'] != 'COMPLETED':
+            logging.error(f"❌ Operación bulk {operacion['status']}: {operacion.get('errorCode')}")
+        if not url:
+            return
+
+        for resultado in self.leer_resultados(url):
+            datos = (resultado.get('data') or {}).get('productSet') or {}
+            errores = [e.get('message') for e in datos.get('userErrors') or []]
+            errores.extend(e.get('message') for e in resultado.get('errors') or [])
+            yield {
+                'linea': resultado.get('__lineNumber'),
+                'producto': datos.get('product'),
+                'errores': errores,
+                'rechazado': bool(datos.get('userErrors'))
+            }
+
+
+class SyscomShopifyImporterBulk(SyscomShopifyImporterRobusto):
+    """Importador que crea todos los productos en una sola operación bulk del lado de Shopify"""
+
+    def _entrada_product_set(self, producto_data: Dict) -> Dict:
+        """Convertir una fila del CSV en ProductSetInput con los mismos datos que la creación REST"""
+        stock = int(float(producto_data.get('Variant Inventory Qty', 0)))
+        sku = producto_data.get('Variant SKU', '')
+
+        variante = {
+            'optionValues': [{'optionName': 'Title', 'name': 'Default Title'}],
+            'price': float(producto_data.get('Variant Price', 0)),
+            'inventoryPolicy': 'DENY',
+            'inventoryItem': {'sku': sku, 'tracked': True}
+        }
+        if self.location_id:
+            variante['inventoryQuantities'] = [{
+                'locationId': gid('Location', self.location_id),
+                'name': 'available',
+                'quantity': stock
+            }]
+
+        entrada = {
+            'title': self.fix_encoding_issues(producto_data.get('Title', ''))[:255],
+            'handle': producto_data.get('Handle', '').strip(),
+            'descriptionHtml': self.fix_encoding_issues(producto_data.get('Body (HTML)', '')),
+            'vendor': self.fix_encoding_issues(producto_data.get('Vendor', '')),
+            'productType': self.fix_encoding_issues(producto_data.get('Product Category', 'General')),
+            'status': 'ACTIVE',
+            'productOptions': [{'name': 'Title', 'values': [{'name': 'Default Title'}]}],
+            'variants': [variante]
+        }
+
+        tags = producto_data.get('Tags', '')
+        if tags:
+            entrada['tags'] = [t.strip() for t in self.fix_encoding_issues(tags).split(',') if t.strip()]
+
+        imagen_url = producto_data.get('Image Src', '')
+        if imagen_url and imagen_url.startswith('http'):
+            imagen_url_limpia = imagen_url.strip().replace(' ', '%20')
+            if any(imagen_url_limpia.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
+                entrada['files'] = [{'originalSource': imagen_url_limpia, 'contentType': 'IMAGE'}]
+
+        return entrada
+
+    def _iterar_entradas(self, productos_con_stock: Iterable[Dict], enviados: List[Dict]) -> Iterator[Dict]:
+        """Generar el ProductSetInput de cada producto nuevo, anotando su fila del CSV por línea del JSONL"""
+        sincronizado = self.catalogo.sincronizado
+        for producto_data in productos_con_stock:
+            self._sumar_stat('productos_procesados')
+            handle = producto_data.get('Handle', '').strip()
+            if handle and sincronizado and self.catalogo.existe(handle):
+                self._sumar_stat('productos_duplicados')
+                self._registrar_en_journal(handle, 'duplicado', self.catalogo.buscar(handle))
+                self.fallidos.quitar(handle)
+                continue
+            try:
+                entrada = self._entrada_product_set(producto_data)
+            except (ValueError, TypeError) as e:
+                logging.warning(f"⚠️ Producto inválido {handle}: {e}")
+                self._registrar_fallo(producto_data, clasificar_error(excepcion=e), str(e))
+                continue
+            enviados.append(producto_data)
+            yield entrada
+
+    def _registrar_fallo(self, producto_data: Dict, clase: str, detalle: str):
+        """Contar el error, anotarlo en el journal y dejar la fila en la cola de fallidos"""
+        handle = producto_data.get('Handle', '').strip()
+        self._sumar_stat('productos_con_error')
+        self._registrar_en_journal(handle, 'error', detalle=detalle)
+        self.fallidos.agregar(handle, producto_data, clase, detalle)
+
+    def _procesar_productos(self, productos_con_stock: Iterable[Dict], workers: int,
+                            total: Optional[int] = None):
+        """Enviar los productos nuevos como una sola operación bulk"""
+        enviados: List[Dict] = []
+        entradas = self._iterar_entradas(productos_con_stock, enviados)
+
+        print(f"📦 Preparando operación bulk con los productos nuevos")
+        importador = ImportadorBulkShopify(self.graphql, self.session, timeout=self.timeout * 6)
+
+        reportados = set()
+        clase_faltantes, detalle_faltantes = SERVIDOR, "Sin resultado en la operación bulk"
+        try:
+            for resultado in importador.ejecutar(entradas):
+                linea = resultado['linea']
+                if linea is None or not 0 <= linea < len(enviados) or linea in reportados:
+                    logging.warning(f"⚠️ Resultado bulk sin línea válida: {linea}")
+                    continue
+                reportados.add(linea)
+                producto_data = enviados[linea]
+                producto = resultado['producto']
+                if producto and not resultado['errores']:
+                    variante = (producto.get('variants') or {}).get('nodes') or [{}]
+                    cantidad = int(float(producto_data.get('Variant Inventory Qty', 0)))
+                    producto_rest = {
+                        'id': id_numerico(producto['id']),
+                        'handle': producto['handle'],
+                        'variants': [{
+                            'id': id_numerico(variante[0].get('id')),
+                            'inventory_item_id': id_numerico((variante[0].get('inventoryItem') or {}).get('id')),
+                            'sku': variante[0].get('sku'),
+                            'price': variante[0].get('price'),
+                            'inventory_quantity': cantidad if self.location_id else None
+                        }]
+                    }
+                    self.catalogo.registrar_producto(producto_rest)
+                    # productSet ya fija el inventario en la misma mutación
+                    self._registrar_en_journal(producto['handle'], 'completado', producto_rest)
+                    self.fallidos.quitar(producto['handle'])
+                    self._sumar_stat('productos_creados')
+                else:
+                    detalle = '; '.join(resultado['errores']) or "productSet sin producto"
+                    # userErrors son rechazos del dato; 'errors' de la línea, fallas del lado de Shopify
+                    clase = clasificar_error(status=422 if resultado['rechazado'] else None, errores=detalle)
+                    logging.error(f"❌ Error creando {producto_data.get('Handle', '?')}: {detalle}")
+                    self._registrar_fallo(producto_data, clase, detalle)
+        except Exception as e:
+            logging.error(f"❌ Error en la operación bulk: {e}")
+            clase_faltantes, detalle_faltantes = clasificar_error(excepcion=e), describir_error(e)
+
+        # Una operación FAILED, CANCELED o con resultados parciales o cortados no reporta todas las líneas
+        faltantes = [linea for linea in range(len(enviados)) if linea not in reportados]
+        if faltantes:
+            operacion = importador.operacion or {}
+            if operacion.get('status') and operacion['status'] != 'COMPLETED':
+                detalle_faltantes = f"{detalle_faltantes} ({operacion['status']}: {operacion.get('errorCode')})"
+            logging.error(f"❌ {len(faltantes):,} productos sin resultado en la operación bulk")
+            for linea in faltantes:
+                self._registrar_fallo(enviados[linea], clase_faltantes, detalle_faltantes)
+
+        if not enviados:
+            print("✅ No hay productos nuevos para crear")
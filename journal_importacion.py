@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Journal de importación en SQLite, seguro ante caídas
+Registra (solo agregando filas) el estado de cada handle y sus IDs de Shopify por corrida,
+para que --resume pueda saltar el trabajo ya hecho sin llamar a la API
+"""
+
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+# Estados que no requieren más trabajo al reanudar
+ESTADOS_TERMINADOS = ('completado', 'duplicado')
+
+
+class JournalImportacion:
+    def __init__(self, ruta_db: str = 'journal_importacion.db'):
+        """Abrir (o crear) el journal; cada escritura se sincroniza a disco antes de seguir"""
+        self.ruta_db = ruta_db
+        self.run_id: Optional[str] = None
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(ruta_db, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self._crear_esquema()
+
+    def _crear_esquema(self):
+        """Crear tablas e índices si no existen"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS corridas (
+                    run_id TEXT PRIMARY KEY,
+                    archivo_csv TEXT,
+                    iniciada_en TEXT NOT NULL,
+                    terminada_en TEXT
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS eventos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    handle TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    product_id INTEGER,
+                    inventory_item_id INTEGER,
+                    detalle TEXT,
+                    registrado_en TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_eventos_run_handle ON eventos(run_id, handle)")
+
+    def iniciar_corrida(self, archivo_csv: Optional[str] = None) -> str:
+        """Abrir una corrida nueva y devolver su run_id"""
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO corridas (run_id, archivo_csv, iniciada_en) VALUES (?, ?, ?)",
+                (self.run_id, archivo_csv, datetime.now().isoformat())
+            )
+        return self.run_id
+
+    def reanudar_corrida(self, archivo_csv: Optional[str] = None) -> str:
+        """Continuar la última corrida sin terminar; si no hay, abrir una nueva"""
+        with self._lock:
+            fila = self.conn.execute(
+                "SELECT run_id FROM corridas WHERE terminada_en IS NULL ORDER BY iniciada_en DESC LIMIT 1"
+            ).fetchone()
+        if not fila:
+            return self.iniciar_corrida(archivo_csv)
+        self.run_id = fila[0]
+        return self.run_id
+
+    def terminar_corrida(self):
+        """Marcar la corrida actual como terminada (ya no se reanuda)"""
+        if not self.run_id:
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE corridas SET terminada_en = ? WHERE run_id = ?",
+                (datetime.now().isoformat(), self.run_id)
+            )
+
+    def registrar(self, handle: str, estado: str, product_id: Optional[int] = None,
+                  inventory_item_id: Optional[int] = None, detalle: Optional[str] = None):
+        """Agregar un evento de estado para un handle en la corrida actual"""
+        if not self.run_id:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO eventos (run_id, handle, estado, product_id, inventory_item_id, detalle, registrado_en)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (self.run_id, handle, estado, product_id, inventory_item_id, detalle, datetime.now().isoformat()))
+
+    def estados(self) -> Dict[str, Dict]:
+        """Último estado de cada handle en la corrida actual"""
+        if not self.run_id:
+            return {}
+        with self._lock:
+            filas = self.conn.execute("""
+                SELECT e.handle, e.estado, e.product_id, e.inventory_item_id
+                FROM eventos e
+                JOIN (SELECT MAX(id) AS id FROM eventos WHERE run_id = ? GROUP BY handle) u ON e.id = u.id
+            """, (self.run_id,)).fetchall()
+        return {
+            handle: {'estado': estado, 'product_id': product_id, 'inventory_item_id': inventory_item_id}
+            for handle, estado, product_id, inventory_item_id in filas
+        }
+
+    def cerrar(self):
+        """Cerrar la conexión al journal"""
+        self.conn.close()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Lectura en streaming de los CSV de SYSCOM
+Detecta el encoding en una sola pasada sobre los bytes del archivo (mmap) y
+guarda el resultado por hash de contenido para las siguientes corridas.
+Con pyarrow instalado, el catálogo ya parseado se guarda además en Parquet con el mismo
+hash, así que el mismo CSV no se vuelve a parsear y se pueden leer solo algunas columnas.
+"""
+
+import codecs
+import csv
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+
+ENCODINGS = ('utf-8', 'latin-1', 'cp1252', 'iso-8859-1')
+TAMANO_BLOQUE = 1 << 20
+
+# latin-1 decodifica cualquier secuencia de bytes, así que si el archivo no es UTF-8 válido
+# es el resultado que daba el recorrido de ENCODINGS en orden
+ENCODING_RESPALDO = 'latin-1'
+
+RUTA_CACHE = os.getenv('CSV_CACHE_ENCODING', '.cache_encoding_csv.json')
+
+# Copias Parquet del catálogo parseado, una por hash de contenido
+DIRECTORIO_COLUMNAR = os.getenv('CSV_CACHE_COLUMNAR', '.cache_catalogo')
+COPIAS_COLUMNARES_CONSERVADAS = 4
+FILAS_POR_LOTE = 10000
+
+_lock_cache = threading.Lock()
+
+
+def _cargar_cache() -> Dict:
+    """Leer la caché de encodings; un archivo dañado se trata como vacío"""
+    try:
+        with open(RUTA_CACHE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if isinstance(cache.get('archivos'), dict) and isinstance(cache.get('encodings'), dict):
+            return cache
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {'archivos': {}, 'encodings': {}}
+
+
+def _guardar_cache(cache: Dict):
+    """Escribir la caché de forma atómica"""
+    temporal = f"{RUTA_CACHE}.tmp"
+    try:
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(temporal, RUTA_CACHE)
+    except OSError as e:
+        logging.debug(f"No se pudo guardar la caché de encodings: {e}")
+
+
+def _recorrer_bytes(ruta: str) -> Dict:
+    """Una sola pasada por los bytes: hash del contenido y validación UTF-8 a la vez"""
+    h = hashlib.blake2b(digest_size=16)
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    es_utf8 = True
+    con_bom = False
+
+    with open(ruta, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return {'hash': h.hexdigest(), 'encoding': 'utf-8'}
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            con_bom = datos[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8
+            with memoryview(datos) as vista:
+                for inicio in range(0, len(datos), TAMANO_BLOQUE):
+                    with vista[inicio:inicio + TAMANO_BLOQUE] as bloque:
+                        h.update(bloque)
+                        if not es_utf8:
+                            continue
+                        try:
+                            decodificador.decode(bloque)
+                        except UnicodeDecodeError:
+                            es_utf8 = False
+            if es_utf8:
+                try:
+                    decodificador.decode(b'', final=True)
+                except UnicodeDecodeError:
+                    es_utf8 = False
+
+    if not es_utf8:
+        encoding = ENCODING_RESPALDO
+    elif con_bom:
+        # Sin quitar el BOM la primera columna no se llamaría 'Handle'
+        encoding = 'utf-8-sig'
+    else:
+        encoding = 'utf-8'
+    return {'hash': h.hexdigest(), 'encoding': encoding}
+
+
+def analizar_archivo(ruta: str) -> Optional[Dict]:
+    """
+    Hash de contenido y encoding de un CSV, usando la caché cuando es posible
+
+    Si la ruta, el tamaño y la fecha de modificación coinciden con la corrida anterior
+    no se lee el archivo; si cambió, se recorre una sola vez para obtener ambos.
+
+    Returns:
+        {'hash': ..., 'encoding': ...} o None si el archivo no se puede leer
+    """
+    try:
+        estado = os.stat(ruta)
+    except OSError as e:
+        logging.error(f"❌ No se pudo leer {ruta}: {e}")
+        return None
+
+    clave = os.path.abspath(ruta)
+    firma = {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+    with _lock_cache:
+        cache = _cargar_cache()
+    registro = cache['archivos'].get(clave)
+    if registro and registro.get('tamano') == firma['tamano'] and registro.get('mtime_ns') == firma['mtime_ns']:
+        encoding = cache['encodings'].get(registro.get('hash'))
+        if encoding:
+            return {'hash': registro['hash'], 'encoding': encoding}
+
+    try:
+        resultado = _recorrer_bytes(ruta)
+    except (OSError, ValueError) as e:
+        logging.error(f"❌ No se pudo leer {ruta}: {e}")
+        return None
+
+    with _lock_cache:
+        cache = _cargar_cache()
+        cache['archivos'][clave] = dict(firma, hash=resultado['hash'])
+        cache['encodings'][resultado['hash']] = resultado['encoding']
+        # Olvidar archivos borrados (descargas temporales, backups rotados)
+        cache['archivos'] = {r: d for r, d in cache['archivos'].items() if os.path.exists(r)}
+        vigentes = {d.get('hash') for d in cache['archivos'].values()}
+        cache['encodings'] = {h: e for h, e in cache['encodings'].items() if h in vigentes}
+        _guardar_cache(cache)
+    return resultado
+
+
+def detectar_encoding(ruta: str) -> Optional[str]:
+    """Encoding con el que se debe abrir el CSV (None si no se puede leer)"""
+    resultado = analizar_archivo(ruta)
+    return resultado['encoding'] if resultado else None
+
+
+def _pyarrow():
+    """pyarrow es opcional: sin él se lee siempre el CSV"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def ruta_columnar(hash_contenido: str, delimiter: str = ',') -> str:
+    """Archivo Parquet que corresponde a un contenido y delimitador"""
+    return os.path.join(DIRECTORIO_COLUMNAR, f"{hash_contenido}_{ord(delimiter)}.parquet")
+
+
+def copia_columnar_disponible(hash_contenido: str, delimiter: str = ',') -> bool:
+    """True si ese contenido ya se puede leer desde su copia Parquet"""
+    return _pyarrow() is not None and os.path.exists(ruta_columnar(hash_contenido, delimiter))
+
+
+def _podar_copias_columnares():
+    """Conservar solo las copias Parquet más recientes"""
+    copias = sorted(glob.glob(os.path.join(DIRECTORIO_COLUMNAR, '*.parquet')), key=os.path.getmtime)
+    for ruta in copias[:-COPIAS_COLUMNARES_CONSERVADAS]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+class LectorCatalogo:
+    """
+    Lector de filas con la misma interfaz que csv.DictReader (fieldnames e iteración)
+
+    La primera lectura de un CSV parsea el texto y, mientras entrega las filas, escribe su
+    copia Parquet; las siguientes lecturas del mismo contenido salen de esa copia. Con
+    columnas solo se leen (y se entregan) esas columnas. Si se conoce el hash del contenido
+    (p.ej. un snapshot comprimido) no se recorre el archivo, y con copia Parquet ni se abre.
+    """
+
+    def __init__(self, ruta_csv: str, encoding: Optional[str] = None, delimiter: str = ',',
+                 columnas: Optional[List[str]] = None, hash_contenido: Optional[str] = None):
+        self.ruta_csv = ruta_csv
+        self.delimiter = delimiter
+        self.columnas = columnas
+        self.fieldnames: Optional[List[str]] = None
+        self.ruta_parquet: Optional[str] = None
+
+        if hash_contenido:
+            analisis = {'hash': hash_contenido, 'encoding': encoding}
+        else:
+            analisis = analizar_archivo(ruta_csv)
+        self.encoding = encoding or (analisis['encoding'] if analisis else None)
+        pa = _pyarrow()
+        if analisis and pa:
+            self.ruta_parquet = ruta_columnar(analisis['hash'], delimiter)
+            try:
+                self.fieldnames = pa.parquet.read_schema(self.ruta_parquet).names
+                self.desde_cache = True
+                return
+            except (OSError, pa.ArrowException):
+                pass
+
+        self.desde_cache = False
+        with open(ruta_csv, 'r', encoding=self.encoding, newline='') as f:
+            self.fieldnames = csv.DictReader(f, delimiter=delimiter).fieldnames
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self.desde_cache:
+            return self._iterar_parquet()
+        return self._iterar_csv()
+
+    def _proyectar(self, fila: Dict) -> Dict:
+        return {columna: fila.get(columna) for columna in self.columnas} if self.columnas else fila
+
+    def _iterar_parquet(self) -> Iterator[Dict]:
+        pa = _pyarrow()
+        columnas = [c for c in self.columnas if c in self.fieldnames] if self.columnas else None
+        archivo = pa.parquet.ParquetFile(self.ruta_parquet)
+        try:
+            for lote in archivo.iter_batches(batch_size=FILAS_POR_LOTE, columns=columnas):
+                for fila in lote.to_pylist():
+                    if self.columnas:
+                        fila = self._proyectar(fila)
+                    yield fila
+        finally:
+            archivo.close()
+
+    def _iterar_csv(self) -> Iterator[Dict]:
+        pa = _pyarrow()
+        nombres = self.fieldnames or []
+        # Solo se puede guardar una tabla con nombres de columna únicos
+        guardar = bool(pa and self.ruta_parquet and nombres and len(set(nombres)) == len(nombres))
+        temporal = f"{self.ruta_parquet}.{os.getpid()}.tmp" if guardar else None
+        escritor = None
+        lote = {nombre: [] for nombre in nombres}
+        en_lote = 0
+        completo = False
+
+        def volcar():
+            nonlocal escritor
+            tabla = pa.table({nombre: pa.array(valores, type=pa.string()) for nombre, valores in lote.items()})
+            if escritor is None:
+                os.makedirs(DIRECTORIO_COLUMNAR, exist_ok=True)
+                escritor = pa.parquet.ParquetWriter(temporal, tabla.schema)
+            escritor.write_table(tabla)
+            for valores in lote.values():
+                valores.clear()
+
+        try:
+            with open(self.ruta_csv, 'r', encoding=self.encoding, newline='') as f:
+                for fila in csv.DictReader(f, delimiter=self.delimiter):
+                    if guardar:
+                        if None in fila:
+                            # Fila con más campos que el encabezado: la copia no sería fiel
+                            guardar = False
+                        else:
+                            # Copiar antes de entregar: quien lee puede modificar la fila
+                            for nombre in nombres:
+                                lote[nombre].append(fila[nombre])
+                            en_lote += 1
+                            if en_lote >= FILAS_POR_LOTE:
+                                volcar()
+                                en_lote = 0
+                    yield self._proyectar(fila)
+            if guardar:
+                if en_lote or escritor is None:
+                    volcar()
+                escritor.close()
+                escritor = None
+                os.replace(temporal, self.ruta_parquet)
+                completo = True
+                _podar_copias_columnares()
+                logging.info(f"🗃️ Copia columnar guardada: {self.ruta_parquet}")
+        finally:
+            if escritor is not None:
+                escritor.close()
+            if temporal and not completo and os.path.exists(temporal):
+                os.remove(temporal)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Normalización de texto compartida por el importador y el divisor de CSV
+Repara mojibake (UTF-8 leído como latin-1) en una sola pasada y guarda en caché
+los valores que se repiten mucho en el catálogo (Vendor, Tags, categorías)
+"""
+
+import re
+from functools import lru_cache
+
+# Tabla de correcciones comunes para problemas UTF-8
+CORRECCIONES = {
+    'Ã¡': 'á', 'Ã ': 'à', 'Ã¢': 'â', 'Ã£': 'ã', 'Ã¤': 'ä',
+    'Ã©': 'é', 'Ã¨': 'è', 'Ãª': 'ê', 'Ã«': 'ë',
+    'Ã­': 'í', 'Ã¬': 'ì', 'Ã®': 'î', 'Ã¯': 'ï',
+    'Ã³': 'ó', 'Ã²': 'ò', 'Ã´': 'ô', 'Ãµ': 'õ', 'Ã¶': 'ö',
+    'Ãº': 'ú', 'Ã¹': 'ù', 'Ã»': 'û', 'Ã¼': 'ü',
+    'Ã±': 'ñ', 'Ã§': 'ç',
+    'Ã³n': 'ón', 'Ã±o': 'ño', 'Ã©s': 'és', 'Ã¡s': 'ás'
+}
+
+# Una sola alternancia compilada; las claves más largas primero
+_PATRON_CORRECCIONES = re.compile(
+    '|'.join(re.escape(clave) for clave in sorted(CORRECCIONES, key=len, reverse=True))
+)
+_PATRON_CONTROL = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]')
+
+# Todo mojibake de una letra acentuada empieza con uno de estos caracteres
+_MARCAS_MOJIBAKE = ('Ã', 'Â')
+
+# Los textos más largos (Body HTML) casi nunca se repiten y solo llenarían la caché
+LARGO_MAXIMO_CACHE = 256
+
+
+def _reparar_mojibake(texto: str) -> str:
+    """Deshacer la doble codificación; si el texto mezcla ambos, usar la tabla de correcciones"""
+    try:
+        return texto.encode('latin-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return _PATRON_CORRECCIONES.sub(lambda m: CORRECCIONES[m.group(0)], texto)
+
+
+def _normalizar(texto: str) -> str:
+    """Reparar mojibake, quitar caracteres de control y colapsar espacios"""
+    if any(marca in texto for marca in _MARCAS_MOJIBAKE):
+        texto = _reparar_mojibake(texto)
+    texto = _PATRON_CONTROL.sub('', texto)
+    # split() sin argumentos usa los mismos espacios Unicode que \s y además recorta los extremos
+    return ' '.join(texto.split())
+
+
+_normalizar_en_cache = lru_cache(maxsize=65536)(_normalizar)
+
+
+def fix_encoding_issues(texto: str) -> str:
+    """Corregir problemas comunes de encoding UTF-8"""
+    if not texto:
+        return texto
+    if len(texto) > LARGO_MAXIMO_CACHE:
+        return _normalizar(texto)
+    return _normalizar_en_cache(texto)
+
+
+def _fix_encoding_issues_anterior(texto: str) -> str:
+    """Implementación anterior (reemplazos secuenciales), solo para el benchmark"""
+    if not texto:
+        return texto
+    texto_corregido = texto
+    for incorrecto, correcto in CORRECCIONES.items():
+        texto_corregido = texto_corregido.replace(incorrecto, correcto)
+    texto_corregido = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', texto_corregido)
+    texto_corregido = re.sub(r'\s+', ' ', texto_corregido).strip()
+    return texto_corregido
+
+
+if __name__ == "__main__":
+    # Microbenchmark con una distribución parecida al CSV de SYSCOM
+    import random
+    import time
+
+    random.seed(42)
+    marcas = ['HIKVISION', 'EPCOM', 'Ubiquiti', 'Cámaras Ópticas', 'SYSCOM Telecomunicación']
+    etiquetas = ['videovigilancia, cámaras', 'redes, switches', 'energía, baterías', 'cableado, fibra óptica']
+    titulos = [
+        'Cámara bala 4MP con visión nocturna', 'Switch PoE de 8 puertos', 'Batería de respaldo 12V',
+        'Antena sectorial 5GHz para exteriores', 'Bobina de cable UTP Cat6 de 305 m'
+    ]
+    descripcion = '<p>Descripción técnica con especificaciones de instalación y garantía extendida.</p>' * 8
+
+    def con_mojibake(texto: str) -> str:
+        return texto.encode('utf-8').decode('latin-1') if random.random() < 0.3 else texto
+
+    valores = []
+    for i in range(23000):
+        valores.append(con_mojibake(random.choice(marcas)))
+        valores.append(con_mojibake(random.choice(etiquetas)))
+        valores.append(con_mojibake(f"{random.choice(titulos)} modelo {i}"))
+        valores.append(con_mojibake(descripcion))
+
+    # Mismo resultado que la tabla anterior en los casos que la tabla cubre;
+    # las mayúsculas acentuadas (Ó, É...) que la tabla dejaba rotas ahora también se reparan
+    reparados_extra = 0
+    for valor in valores[:2000]:
+        anterior = _fix_encoding_issues_anterior(valor)
+        if 'Ã' in anterior:
+            reparados_extra += 1
+            assert 'Ã' not in fix_encoding_issues(valor), valor
+        else:
+            assert fix_encoding_issues(valor) == anterior, valor
+
+    _normalizar_en_cache.cache_clear()
+    inicio = time.perf_counter()
+    for valor in valores:
+        _fix_encoding_issues_anterior(valor)
+    tiempo_anterior = time.perf_counter() - inicio
+
+    _normalizar_en_cache.cache_clear()
+    inicio = time.perf_counter()
+    for valor in valores:
+        fix_encoding_issues(valor)
+    tiempo_nuevo = time.perf_counter() - inicio
+
+    print(f"📊 {len(valores):,} campos normalizados")
+    print(f"   🐢 Implementación anterior: {tiempo_anterior:.3f}s")
+    print(f"   ⚡ Normalización compilada: {tiempo_nuevo:.3f}s")
+    print(f"   🚀 Aceleración: {tiempo_anterior / tiempo_nuevo:.1f}x")
+    print(f"   🗄️ Caché: {_normalizar_en_cache.cache_info()}")
+    print(f"   🔧 Valores que la tabla anterior dejaba con mojibake: {reparados_extra} de 2,000")
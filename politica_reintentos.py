@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Política de reintentos por clase de error para las llamadas a Shopify
+Cada falla se clasifica (límite de API, 5xx, timeout, conexión, validación 4xx, imagen)
+y solo se reintenta dentro del presupuesto de su clase, con espera exponencial con jitter
+o la que indique Retry-After. Los errores de validación no se reintentan.
+"""
+
+import asyncio
+import random
+import socket
+import threading
+import urllib.error
+from typing import Dict, Mapping, Optional, Tuple
+
+import requests
+
+LIMITE_API = 'limite_api'
+SERVIDOR = 'servidor'
+TIMEOUT = 'timeout'
+CONEXION = 'conexion'
+VALIDACION = 'validacion'
+IMAGEN = 'imagen'
+DESCONOCIDO = 'desconocido'
+
+CLASES_ERROR = (LIMITE_API, SERVIDOR, TIMEOUT, CONEXION, VALIDACION, IMAGEN, DESCONOCIDO)
+
+# Clases que indican un problema pasajero de la tienda o de la red (cuentan para la pausa global)
+CLASES_TRANSITORIAS = (SERVIDOR, TIMEOUT, CONEXION)
+
+# Por clase: (reintentos, espera base en segundos, espera máxima)
+PRESUPUESTOS: Dict[str, Tuple[int, float, float]] = {
+    LIMITE_API: (5, 1.0, 60.0),
+    SERVIDOR: (3, 1.0, 30.0),
+    TIMEOUT: (2, 2.0, 20.0),
+    CONEXION: (3, 0.5, 10.0),
+    VALIDACION: (0, 0.0, 0.0),
+    # El reintento de imagen se hace sin la imagen, no hace falta esperar
+    IMAGEN: (1, 0.0, 0.0),
+    DESCONOCIDO: (1, 0.5, 5.0)
+}
+
+# Reintentos totales de una operación sumando todas las clases
+REINTENTOS_TOTALES = 6
+
+PAUSA_GLOBAL_MAXIMA = 30.0
+
+_TEXTOS_TIMEOUT = ('timeout', 'timed out')
+_TEXTOS_CONEXION = ('connection reset', 'connection aborted', 'connection refused',
+                    'remote end closed', 'broken pipe', 'server disconnected',
+                    'cannot connect to host')
+
+
+def _codigo(excepcion: BaseException) -> Optional[int]:
+    """Código HTTP de una excepción de pyactiveresource, requests o urllib"""
+    for atributo in ('code', 'status'):
+        codigo = getattr(excepcion, atributo, None)
+        if isinstance(codigo, int):
+            return codigo
+    respuesta = getattr(excepcion, 'response', None)
+    for atributo in ('code', 'status_code', 'status'):
+        codigo = getattr(respuesta, atributo, None)
+        if isinstance(codigo, int):
+            return codigo
+    return None
+
+
+def _causas(excepcion: BaseException):
+    """La excepción y las que envuelve (URLError.reason, el primer argumento de pyactiveresource.Error)"""
+    vistas = []
+    actual = excepcion
+    while isinstance(actual, BaseException) and actual not in vistas:
+        vistas.append(actual)
+        siguiente = getattr(actual, 'reason', None) or actual.__cause__
+        if not isinstance(siguiente, BaseException) and actual.args:
+            siguiente = actual.args[0]
+        actual = siguiente
+    return vistas
+
+
+def _menciona_imagen(texto: str) -> bool:
+    return 'image' in texto.lower()
+
+
+def clasificar_error(status: Optional[int] = None, excepcion: Optional[BaseException] = None,
+                     errores: str = '') -> str:
+    """
+    Clase de una falla a partir del código HTTP, la excepción o el texto de errores
+
+    Args:
+        status: Código HTTP de la respuesta (si hubo respuesta)
+        excepcion: Excepción lanzada por la llamada
+        errores: Mensajes de error devueltos por Shopify
+    """
+    if status is None and excepcion is not None:
+        status = _codigo(excepcion)
+
+    if status == 429:
+        return LIMITE_API
+    if status is not None and 500 <= status < 600:
+        return SERVIDOR
+    if status is not None and 400 <= status < 500:
+        return IMAGEN if _menciona_imagen(errores or str(excepcion or '')) else VALIDACION
+    if excepcion is None:
+        return IMAGEN if _menciona_imagen(errores) else DESCONOCIDO
+
+    # Excepciones de transporte; urllib y pyactiveresource las envuelven
+    for candidata in _causas(excepcion):
+        if isinstance(candidata, (requests.exceptions.Timeout, socket.timeout, asyncio.TimeoutError)):
+            return TIMEOUT
+        if isinstance(candidata, (requests.exceptions.ConnectionError, ConnectionError)):
+            return CONEXION
+
+    texto = str(excepcion).lower()
+    if any(marca in texto for marca in _TEXTOS_TIMEOUT):
+        return TIMEOUT
+    if isinstance(excepcion, urllib.error.URLError) or any(marca in texto for marca in _TEXTOS_CONEXION):
+        return CONEXION
+    return DESCONOCIDO
+
+
+def retry_after(headers: Optional[Mapping] = None, excepcion: Optional[BaseException] = None) -> Optional[float]:
+    """Segundos del header Retry-After de una respuesta o de la respuesta guardada en la excepción"""
+    if headers is None and excepcion is not None:
+        respuesta = getattr(excepcion, 'response', None)
+        headers = getattr(respuesta, 'headers', None)
+    if not headers:
+        return None
+    for clave, valor in headers.items():
+        if str(clave).lower() == 'retry-after':
+            try:
+                return max(0.0, float(valor))
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def describir_error(excepcion: BaseException) -> str:
+    """Texto del error con el código y el cuerpo de la última respuesta, si la hubo"""
+    respuesta = getattr(excepcion, 'response', None)
+    cuerpo = getattr(respuesta, 'body', None)
+    if cuerpo is None:
+        cuerpo = getattr(respuesta, 'text', None)
+    if isinstance(cuerpo, bytes):
+        cuerpo = cuerpo.decode('utf-8', errors='replace')
+    codigo = _codigo(excepcion)
+    if codigo and cuerpo:
+        return f"HTTP {codigo}: {cuerpo}"
+    return str(excepcion) or type(excepcion).__name__
+
+
+class PoliticaReintentos:
+    def __init__(self, presupuestos: Optional[Dict[str, Tuple[int, float, float]]] = None,
+                 reintentos_totales: int = REINTENTOS_TOTALES, aleatorio: Optional[random.Random] = None):
+        """
+        Inicializar la política
+
+        Args:
+            presupuestos: Reintentos y esperas por clase (por defecto PRESUPUESTOS)
+            reintentos_totales: Tope de reintentos por operación entre todas las clases
+            aleatorio: Generador para el jitter (inyectable para pruebas)
+        """
+        self.presupuestos = dict(PRESUPUESTOS, **(presupuestos or {}))
+        self.reintentos_totales = reintentos_totales
+        self._aleatorio = aleatorio or random.Random()
+        self._lock = threading.Lock()
+        self.stats = {
+            'reintentos': 0,
+            'sin_reintento': 0,
+            'tiempo_espera': 0.0,
+            'errores': {clase: 0 for clase in CLASES_ERROR}
+        }
+
+    def iniciar(self) -> 'IntentosOperacion':
+        """Contador de reintentos para una operación (p.ej. crear un producto)"""
+        return IntentosOperacion(self)
+
+    def jitter(self, espera: float) -> float:
+        """Entre la mitad y el total de la espera, para que los hilos no reintenten juntos"""
+        return self._aleatorio.uniform(espera / 2, espera) if espera > 0 else 0.0
+
+    def espera(self, clase: str, reintento: int, segundos_retry_after: Optional[float] = None) -> float:
+        """Espera antes del reintento número `reintento` (desde 0) de una clase"""
+        _, base, maximo = self.presupuestos.get(clase, self.presupuestos[DESCONOCIDO])
+        espera = self.jitter(min(maximo, base * (2 ** reintento)))
+        if segundos_retry_after is not None:
+            # El servidor sabe cuándo se vacía la cubeta; el jitter solo reparte a los hilos
+            espera = segundos_retry_after + self.jitter(base)
+        return espera
+
+    def pausa_global(self, errores_consecutivos: int) -> float:
+        """Pausa de todos los workers tras varios errores transitorios seguidos"""
+        return self.jitter(min(PAUSA_GLOBAL_MAXIMA, errores_consecutivos * 5.0))
+
+    def _registrar(self, clase: str, espera: Optional[float]):
+        with self._lock:
+            self.stats['errores'][clase] = self.stats['errores'].get(clase, 0) + 1
+            if espera is None:
+                self.stats['sin_reintento'] += 1
+            else:
+                self.stats['reintentos'] += 1
+                self.stats['tiempo_espera'] += espera
+
+    def resumen(self) -> str:
+        """Errores por clase (solo las que ocurrieron)"""
+        errores = ", ".join(f"{clase}: {n:,}" for clase, n in self.stats['errores'].items() if n)
+        return errores or "sin errores"
+
+
+class IntentosOperacion:
+    """Reintentos consumidos por una operación, por clase y en total"""
+
+    def __init__(self, politica: PoliticaReintentos):
+        self.politica = politica
+        self.por_clase = {clase: 0 for clase in CLASES_ERROR}
+        self.total = 0
+        self.ultima_clase: Optional[str] = None
+        self.ultimo_detalle: Optional[str] = None
+
+    def siguiente(self, clase: str, segundos_retry_after: Optional[float] = None,
+                  detalle: Optional[str] = None) -> Optional[float]:
+        """
+        Registrar una falla y decidir si se reintenta
+
+        Returns:
+            Segundos a esperar antes de reintentar, o None si la clase no tiene más presupuesto
+        """
+        self.ultima_clase = clase
+        self.ultimo_detalle = detalle
+        reintentos, _, _ = self.politica.presupuestos.get(clase, self.politica.presupuestos[DESCONOCIDO])
+        usados = self.por_clase.get(clase, 0)
+
+        if usados >= reintentos or self.total >= self.politica.reintentos_totales:
+            self.politica._registrar(clase, None)
+            return None
+
+        espera = self.politica.espera(clase, usados, segundos_retry_after)
+        self.por_clase[clase] = usados + 1
+        self.total += 1
+        self.politica._registrar(clase, espera)
+        return espera
+
+    @property
+    def transitoria(self) -> bool:
+        """True si la última falla fue de red o del servidor"""
+        return self.ultima_clase in CLASES_TRANSITORIAS
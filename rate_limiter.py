@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Limitador de tasa adaptativo para la API de Shopify
+Modelo de cubeta con fuga (leaky bucket) ajustado con los headers
+X-Shopify-Shop-Api-Call-Limit y Retry-After de cada respuesta
+"""
+
+import logging
+import threading
+import time
+from typing import Mapping, Optional
+
+
+class ShopifyRateLimiter:
+    def __init__(self, capacidad: int = 40, tasa_fuga: float = 2.0, margen: int = 2):
+        """
+        Inicializar el limitador
+
+        Args:
+            capacidad: Tamaño de la cubeta (40 en tiendas estándar); se ajusta con el header
+            tasa_fuga: Llamadas por segundo que Shopify drena de la cubeta
+            margen: Llamadas que se dejan libres para no tocar el límite
+        """
+        self.capacidad = capacidad
+        self.tasa_fuga = tasa_fuga
+        self.margen = margen
+
+        self._nivel = 0.0
+        self._ultima_actualizacion = time.monotonic()
+        self._bloqueado_hasta = 0.0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'peticiones': 0,
+            'esperas': 0,
+            'tiempo_espera': 0.0,
+            'respuestas_429': 0
+        }
+
+    def _drenar(self, ahora: float):
+        """Descontar de la cubeta lo que Shopify ya drenó desde la última actualización"""
+        transcurrido = ahora - self._ultima_actualizacion
+        if transcurrido > 0:
+            self._nivel = max(0.0, self._nivel - transcurrido * self.tasa_fuga)
+            self._ultima_actualizacion = ahora
+
+    def reservar(self) -> float:
+        """Reservar un lugar en la cubeta y devolver los segundos que hay que esperar antes de usarlo"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._drenar(ahora)
+
+            limite = max(1, self.capacidad - self.margen)
+            espera = max(0.0, self._bloqueado_hasta - ahora)
+            exceso = self._nivel + 1 - limite
+            if exceso > 0:
+                espera = max(espera, exceso / self.tasa_fuga)
+
+            self._nivel += 1
+            self.stats['peticiones'] += 1
+            if espera > 0:
+                self.stats['esperas'] += 1
+                self.stats['tiempo_espera'] += espera
+            return espera
+
+    def esperar_turno(self):
+        """Bloquear hasta que haya espacio en la cubeta"""
+        espera = self.reservar()
+        if espera > 0:
+            time.sleep(espera)
+
+    def pausar(self, segundos: float):
+        """Detener todas las peticiones durante los segundos indicados"""
+        with self._lock:
+            self._bloqueado_hasta = max(self._bloqueado_hasta, time.monotonic() + segundos)
+
+    def registrar_respuesta(self, headers: Optional[Mapping], status: Optional[int] = None):
+        """Ajustar el estado de la cubeta con los headers de una respuesta de Shopify"""
+        headers = {str(k).lower(): v for k, v in (headers or {}).items()}
+        limite = headers.get('x-shopify-shop-api-call-limit')
+        retry_after = headers.get('retry-after')
+
+        with self._lock:
+            ahora = time.monotonic()
+            self._drenar(ahora)
+
+            if limite:
+                try:
+                    usados, capacidad = (int(parte) for parte in str(limite).split('/'))
+                    self.capacidad = capacidad
+                    # El servidor también ve el consumo de otras apps de la tienda
+                    self._nivel = max(self._nivel, float(usados))
+                except ValueError:
+                    logging.debug(f"Header de límite no reconocido: {limite}")
+
+            if status == 429 or retry_after:
+                try:
+                    segundos = float(retry_after) if retry_after else 1.0
+                except ValueError:
+                    segundos = 1.0
+                self._bloqueado_hasta = max(self._bloqueado_hasta, ahora + segundos)
+                self._nivel = float(self.capacidad)
+                if status == 429:
+                    self.stats['respuestas_429'] += 1
+                    logging.warning(f"🚦 Límite de API alcanzado, esperando {segundos:.1f}s (Retry-After)")
+
+    def instalar_en_shopify(self):
+        """Hacer que todas las llamadas de la librería shopify pasen por este limitador"""
+        import shopify.base
+
+        conexion = shopify.base.ShopifyConnection
+        open_original = getattr(conexion, '_open_sin_limitador', conexion._open)
+        limitador = self
+
+        def _open_limitado(self, *args, **kwargs):
+            limitador.esperar_turno()
+            try:
+                return open_original(self, *args, **kwargs)
+            finally:
+                if self.response is not None:
+                    limitador.registrar_respuesta(self.response.headers, self.response.code)
+
+        conexion._open_sin_limitador = open_original
+        conexion._open = _open_limitado
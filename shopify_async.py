@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Motor asíncrono del importador SYSCOM to Shopify
+Un solo event loop y una sola sesión HTTP con keep-alive para todas las llamadas REST,
+con concurrencia acotada y el mismo limitador de API que el importador síncrono
+"""
+
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from csv_to_shopify import SyscomShopifyImporterRobusto
+from politica_reintentos import (CLASES_TRANSITORIAS, IMAGEN, LIMITE_API, TIMEOUT, VALIDACION,
+                                 clasificar_error, describir_error)
+
+
+class SyscomShopifyImporterAsync(SyscomShopifyImporterRobusto):
+    def _procesar_productos(self, productos_con_stock: Iterable[Dict], workers: int,
+                            total: Optional[int] = None):
+        """Procesar todos los productos dentro de un único event loop"""
+        asyncio.run(self._procesar_async(productos_con_stock, workers, total))
+
+    async def _procesar_async(self, productos_con_stock: Iterable[Dict], concurrencia: int,
+                              total: Optional[int] = None):
+        """Lanzar una corrutina por producto con un máximo de productos en vuelo"""
+        print(f"⚡ Motor asíncrono: hasta {concurrencia} productos en vuelo")
+
+        semaforo = asyncio.Semaphore(concurrencia)
+        conector = aiohttp.TCPConnector(limit=concurrencia, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=self.timeout * 3, connect=self.timeout)
+        headers = {
+            'X-Shopify-Access-Token': self.access_token,
+            'Content-Type': 'application/json',
+            'User-Agent': 'SYSCOM-Shopify-Importer/2.3'
+        }
+
+        intervalo_progreso = self.max_products_per_batch * 10
+        completados = 0
+
+        async with aiohttp.ClientSession(connector=conector, timeout=timeout, headers=headers) as session:
+            async def procesar(producto_data: Dict, producto_num: int):
+                nonlocal completados
+                try:
+                    await self._procesar_producto_async(session, producto_data, producto_num, total)
+                finally:
+                    semaforo.release()
+                completados += 1
+                if completados % intervalo_progreso == 0 and (total is None or completados < total):
+                    self._mostrar_progreso(f"{completados:,}/{total:,} productos" if total else f"{completados:,} productos")
+
+            # El siguiente producto se lee del CSV solo cuando hay lugar en el semáforo
+            en_vuelo = set()
+            for producto_num, producto_data in enumerate(productos_con_stock, 1):
+                await semaforo.acquire()
+                tarea = asyncio.create_task(procesar(producto_data, producto_num))
+                en_vuelo.add(tarea)
+                tarea.add_done_callback(en_vuelo.discard)
+            await asyncio.gather(*en_vuelo)
+
+    async def _procesar_producto_async(self, session: aiohttp.ClientSession, producto_data: Dict,
+                                       producto_num: int, total: Optional[int]):
+        """Versión asíncrona de _procesar_producto"""
+        await self._manejar_errores_consecutivos_async()
+
+        self._sumar_stat('productos_procesados')
+
+        titulo = producto_data.get('Title', 'Sin título')[:50]
+        print(f"🔄 {producto_num}/{total}: {titulo}" if total else f"🔄 {producto_num}: {titulo}")
+
+        try:
+            producto = await self.crear_producto_async(session, producto_data)
+            if producto:
+                self._reiniciar_stat('errores_consecutivos')
+                self.fallidos.quitar(producto_data.get('Handle', '').strip())
+        except Exception as e:
+            logging.error(f"❌ Error crítico: {e}")
+            clase = clasificar_error(excepcion=e)
+            self._sumar_stat('productos_con_error')
+            if clase in CLASES_TRANSITORIAS:
+                self._sumar_stat('errores_consecutivos')
+            self.fallidos.agregar(producto_data.get('Handle', '').strip(), producto_data,
+                                  clase, describir_error(e))
+
+    async def _manejar_errores_consecutivos_async(self):
+        """Pausa global por errores consecutivos sin bloquear el event loop"""
+        with self._stats_lock:
+            errores = self.stats['errores_consecutivos']
+            if errores < self.max_consecutive_errors:
+                return
+            self.stats['errores_consecutivos'] = 0
+
+        pausa = self.politica_reintentos.pausa_global(errores)
+        logging.warning(f"⚠️ {errores} errores consecutivos de red o del servidor")
+        logging.info(f"😴 Pausa de {pausa:.0f}s para estabilizar conexión...")
+        self.rate_limiter.pausar(pausa)
+        await asyncio.sleep(pausa)
+        logging.info("🔄 Continuando...")
+
+    async def _peticion(self, session: aiohttp.ClientSession, metodo: str, ruta: str,
+                        **kwargs) -> Tuple[int, Dict]:
+        """Hacer una petición REST a Shopify respetando el límite de API"""
+        espera = self.rate_limiter.reservar()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+        async with session.request(metodo, f"{self.api_url}/{ruta}", **kwargs) as response:
+            self.rate_limiter.registrar_respuesta(response.headers, response.status)
+            try:
+                datos = await response.json(content_type=None)
+            except ValueError:
+                datos = {}
+            return response.status, datos or {}
+
+    async def verificar_duplicado(self, session: aiohttp.ClientSession, handle: str,
+                                  remoto: bool = False) -> Optional[Dict]:
+        """
+        Buscar un producto existente por handle
+
+        Con remoto=True se consulta a Shopify aunque el espejo local esté sincronizado
+        """
+        if self.catalogo.sincronizado and not remoto:
+            return self.catalogo.buscar(handle)
+
+        status, datos = await self._peticion(
+            session, 'GET', 'products.json',
+            params={'handle': handle, 'fields': 'id,handle,variants', 'limit': 1}
+        )
+        if status != 200:
+            raise RuntimeError(f"Error verificando duplicado: {status}")
+        productos = datos.get('products', [])
+        return productos[0] if productos else None
+
+    def _payload_producto(self, producto_data: Dict) -> Dict:
+        """Construir el JSON de creación con los mismos datos que el importador síncrono"""
+        producto = {
+            'title': self.fix_encoding_issues(producto_data.get('Title', ''))[:255],
+            'handle': producto_data.get('Handle', '').strip(),
+            'body_html': self.fix_encoding_issues(producto_data.get('Body (HTML)', '')),
+            'vendor': self.fix_encoding_issues(producto_data.get('Vendor', '')),
+            'product_type': self.fix_encoding_issues(producto_data.get('Product Category', 'General')),
+            'status': 'active',
+            'variants': [{
+                'title': 'Default Title',
+                'sku': producto_data.get('Variant SKU', ''),
+                'price': float(producto_data.get('Variant Price', 0)),
+                'inventory_management': 'shopify',
+                'inventory_policy': 'deny'
+            }]
+        }
+
+        tags = producto_data.get('Tags', '')
+        if tags:
+            producto['tags'] = self.fix_encoding_issues(tags)
+
+        imagen_url = producto_data.get('Image Src', '')
+        if imagen_url and imagen_url.startswith('http'):
+            imagen_url_limpia = imagen_url.strip().replace(' ', '%20')
+            if any(imagen_url_limpia.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
+                producto['images'] = [{'src': imagen_url_limpia}]
+
+        return producto
+
+    async def crear_producto_async(self, session: aiohttp.ClientSession, producto_data: Dict) -> Optional[Dict]:
+        """Crear producto con la misma política de reintentos por clase que crear_producto_shopify_ultra_robusto"""
+        handle = producto_data.get('Handle', '').strip()
+
+        try:
+            stock = float(producto_data.get('Variant Inventory Qty', 0))
+        except (ValueError, TypeError):
+            stock = 0
+        if stock <= 0:
+            # Sin stock no hay nada que crear; si venía de la cola de fallidos ya no se reintenta
+            self.fallidos.quitar(handle)
+            return None
+
+        intentos = self.politica_reintentos.iniciar()
+        con_imagen = True
+        # Tras una falla de red o del servidor no se sabe si el POST llegó a crear el producto
+        verificar_en_shopify = False
+        while True:
+            tenia_imagen = False
+            try:
+                if handle and verificar_en_shopify:
+                    # Si esta consulta también falla se reintenta sin volver a enviar el POST
+                    creado = await self.verificar_duplicado(session, handle, remoto=True)
+                    if creado:
+                        logging.info(f"✅ Creado en el intento anterior: {handle}")
+                        return await self._producto_creado_async(session, handle, creado, stock)
+                    verificar_en_shopify = False
+
+                try:
+                    if handle:
+                        existente = await self.verificar_duplicado(session, handle)
+                        if existente:
+                            logging.info(f"⏭️ Duplicado saltado: {handle}")
+                            self._sumar_stat('productos_duplicados')
+                            self._reiniciar_stat('errores_consecutivos')
+                            self._registrar_en_journal(handle, 'duplicado', existente)
+                            return existente
+                except Exception:
+                    if intentos.total == 0:
+                        logging.warning(f"⚠️ No se pudo verificar duplicado: {handle}")
+
+                payload = self._payload_producto(producto_data)
+                if not con_imagen:
+                    payload.pop('images', None)
+                tenia_imagen = 'images' in payload
+                status, datos = await self._peticion(session, 'POST', 'products.json', json={'product': payload})
+
+                if status in (200, 201) and 'product' in datos:
+                    logging.info(f"✅ Creado: {payload['title'][:50]} - Stock: {stock}")
+                    return await self._producto_creado_async(session, handle, datos['product'], stock)
+
+                detalle = str(datos.get('errors', '')) or f"HTTP {status}"
+                clase = clasificar_error(status=status, errores=detalle)
+
+            except Exception as e:
+                clase = clasificar_error(excepcion=e)
+                detalle = describir_error(e)
+                if clase == TIMEOUT:
+                    self._sumar_stat('errores_timeout')
+
+            if clase == IMAGEN and not tenia_imagen:
+                clase = VALIDACION
+            if clase in CLASES_TRANSITORIAS:
+                verificar_en_shopify = True
+            # Con 429 el limitador ya bloquea todas las peticiones hasta que venza Retry-After
+            espera = intentos.siguiente(clase, 0.0 if clase == LIMITE_API else None, detalle)
+            if espera is None:
+                logging.warning(f"⚠️ {handle}: error de {clase} sin más reintentos - {detalle[:200]}")
+                break
+            if clase == IMAGEN:
+                self._sumar_stat('errores_imagen')
+                con_imagen = False
+            await asyncio.sleep(espera)
+
+        self._sumar_stat('productos_con_error')
+        if intentos.transitoria:
+            self._sumar_stat('errores_consecutivos')
+        self._registrar_en_journal(handle, 'error', detalle=intentos.ultima_clase)
+        self.fallidos.agregar(handle, producto_data, intentos.ultima_clase, intentos.ultimo_detalle)
+        return None
+
+    async def _producto_creado_async(self, session: aiohttp.ClientSession, handle: str, producto: Dict,
+                                     stock: float) -> Dict:
+        """Registrar un producto recién creado y fijar su inventario"""
+        self._sumar_stat('productos_creados')
+        self._reiniciar_stat('errores_consecutivos')
+        self.catalogo.registrar_producto(producto)
+        self._registrar_en_journal(handle, 'creado', producto)
+
+        stock_int = int(stock)
+        if stock_int > 0 and await self.actualizar_inventario_async(session, producto, stock_int):
+            self._registrar_en_journal(handle, 'completado')
+        return producto
+
+    async def actualizar_inventario_async(self, session: aiohttp.ClientSession, producto: Dict,
+                                          cantidad: int) -> bool:
+        """Fijar el inventario del producto recién creado en la ubicación configurada"""
+        if not self.location_id:
+            logging.warning("⚠️ No hay ubicación configurada para actualizar inventario")
+            return False
+
+        variantes = producto.get('variants') or []
+        if not variantes:
+            logging.warning(f"⚠️ Producto {producto.get('id')} no tiene variantes")
+            return False
+
+        try:
+            # La respuesta de creación ya incluye el inventory_item_id de la variante
+            inventory_item_id = variantes[0].get('inventory_item_id')
+            if not inventory_item_id:
+                status, datos = await self._peticion(session, 'GET', f"variants/{variantes[0]['id']}.json")
+                if status != 200:
+                    logging.error(f"❌ Error obteniendo variante: {status}")
+                    self._sumar_stat('errores_inventario')
+                    return False
+                inventory_item_id = datos['variant']['inventory_item_id']
+
+            payload = {
+                'location_id': self.location_id,
+                'inventory_item_id': inventory_item_id,
+                'available': cantidad
+            }
+            status, datos = await self._peticion(session, 'POST', 'inventory_levels/set.json', json=payload)
+
+            if status in (200, 201):
+                logging.info(f"✅ Inventario actualizado: {cantidad} unidades")
+                self._sumar_stat('inventario_actualizado')
+                self.catalogo.actualizar_cantidad(producto['handle'], cantidad)
+                return True
+
+            logging.error(f"❌ Error actualizando inventario: {status} - {datos}")
+            self._sumar_stat('errores_inventario')
+            return False
+
+        except Exception as e:
+            logging.error(f"❌ Error actualizando inventario: {e}")
+            self._sumar_stat('errores_inventario')
+            return False
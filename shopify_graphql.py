@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Cliente mínimo para la Admin GraphQL API de Shopify
+Respeta el límite por costo (throttleStatus) y permite agrupar mutaciones en una sola petición
+"""
+
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+
+def gid(tipo: str, id_numerico) -> str:
+    """Construir un ID global de GraphQL a partir de un ID numérico REST"""
+    return f"gid://shopify/{tipo}/{id_numerico}"
+
+
+class ShopifyGraphQL:
+    def __init__(self, peticion: Callable[..., requests.Response], api_url: str,
+                 headers: Optional[Dict] = None, max_reintentos: int = 5):
+        """
+        Inicializar el cliente
+
+        Args:
+            peticion: Función (metodo, url, **kwargs) que hace la petición HTTP
+            api_url: URL base de la API, p.ej. https://tienda.myshopify.com/admin/api/2025-04
+            headers: Headers adicionales (token de acceso)
+            max_reintentos: Reintentos cuando Shopify responde THROTTLED
+        """
+        self.peticion = peticion
+        self.url = f"{api_url}/graphql.json"
+        self.headers = headers or {}
+        self.max_reintentos = max_reintentos
+
+    def ejecutar(self, consulta: str, variables: Optional[Dict] = None) -> Dict:
+        """Ejecutar una consulta o mutación y devolver el bloque 'data'"""
+        for intento in range(self.max_reintentos):
+            response = self.peticion('POST', self.url, headers=self.headers,
+                                     json={'query': consulta, 'variables': variables or {}})
+            if response.status_code != 200:
+                raise RuntimeError(f"GraphQL HTTP {response.status_code}: {response.text[:200]}")
+
+            resultado = response.json()
+            costo = resultado.get('extensions', {}).get('cost', {})
+            errores = resultado.get('errors') or []
+
+            if any(e.get('extensions', {}).get('code') == 'THROTTLED' for e in errores):
+                espera = self._espera_por_costo(costo)
+                logging.warning(f"🚦 GraphQL limitado por costo, esperando {espera:.1f}s")
+                time.sleep(espera)
+                continue
+
+            if errores:
+                raise RuntimeError(f"GraphQL: {'; '.join(e.get('message', '') for e in errores)}")
+
+            # Si la cubeta queda casi vacía, esperar antes de la siguiente llamada
+            estado = costo.get('throttleStatus', {})
+            if estado and estado.get('currentlyAvailable', 0) < estado.get('maximumAvailable', 0) * 0.1:
+                time.sleep(self._espera_por_costo(costo))
+
+            return resultado.get('data') or {}
+
+        raise RuntimeError("GraphQL: se agotaron los reintentos por límite de costo")
+
+    @staticmethod
+    def _espera_por_costo(costo: Dict) -> float:
+        """Segundos necesarios para que la cubeta recupere el costo solicitado"""
+        estado = costo.get('throttleStatus', {})
+        solicitado = costo.get('requestedQueryCost') or 100
+        disponible = estado.get('currentlyAvailable', 0)
+        tasa = estado.get('restoreRate') or 50
+        return max(1.0, (solicitado - disponible) / tasa)
+
+    @staticmethod
+    def errores_usuario(data: Dict) -> Dict[str, List[str]]:
+        """Juntar los userErrors de todas las mutaciones de una respuesta, por alias"""
+        errores = {}
+        for alias, resultado in data.items():
+            mensajes = [e.get('message') for e in (resultado or {}).get('userErrors') or []]
+            if mensajes:
+                errores[alias] = mensajes
+        return errores
+
+    def actualizar_variantes(self, cambios_por_producto: Dict[int, List[Dict]]) -> Dict[int, List[str]]:
+        """
+        Actualizar variantes de varios productos en una sola petición
+
+        Args:
+            cambios_por_producto: {product_id: [{'id': gid variante, 'price': ..., 'compareAtPrice': ...}]}
+
+        Returns:
+            Errores de usuario por product_id (vacío si todo se aplicó)
+        """
+        if not cambios_por_producto:
+            return {}
+
+        declaraciones = []
+        mutaciones = []
+        variables = {}
+        productos = list(cambios_por_producto)
+        for i, product_id in enumerate(productos):
+            variantes = cambios_por_producto[product_id]
+            declaraciones.append(f"$p{i}: ID!, $v{i}: [ProductVariantsBulkInput!]!")
+            mutaciones.append(
+                f"p{i}: productVariantsBulkUpdate(productId: $p{i}, variants: $v{i}) "
+                f"{{ userErrors {{ field message }} }}"
+            )
+            variables[f"p{i}"] = gid('Product', product_id)
+            variables[f"v{i}"] = variantes
+
+        consulta = f"mutation ActualizarVariantes({', '.join(declaraciones)}) {{ {' '.join(mutaciones)} }}"
+        errores = self.errores_usuario(self.ejecutar(consulta, variables))
+        return {productos[int(alias[1:])]: mensajes for alias, mensajes in errores.items()}
+
+    def fijar_inventario(self, cantidades: List[Dict]) -> List[str]:
+        """
+        Fijar cantidades disponibles de muchos inventory items en una sola mutación
+
+        Args:
+            cantidades: [{'inventoryItemId': gid, 'locationId': gid, 'quantity': int}]
+
+        Returns:
+            Lista de errores de usuario (vacía si todo se aplicó)
+        """
+        if not cantidades:
+            return []
+
+        consulta = """
+            mutation FijarInventario($input: InventorySetQuantitiesInput!) {
+                inventorySetQuantities(input: $input) { userErrors { field message } }
+            }
+        """
+        variables = {
+            'input': {
+                'name': 'available',
+                'reason': 'correction',
+                'ignoreCompareQuantity': True,
+                'quantities': cantidades
+            }
+        }
+        errores = self.errores_usuario(self.ejecutar(consulta, variables))
+        return errores.get('inventorySetQuantities', [])
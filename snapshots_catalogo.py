@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Almacén de snapshots del catálogo SYSCOM direccionado por contenido
+Cada versión de ProductosHora.csv se guarda una sola vez, comprimida (zstd si está
+instalado, si no gzip) y con el mismo hash que usa lector_csv, así que una descarga
+idéntica no ocupa espacio y un snapshot con copia Parquet se lee sin descomprimirlo.
+Reemplaza las copias ProductosHora_backup_<timestamp>.csv sin comprimir.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from lector_csv import LectorCatalogo, analizar_archivo, copia_columnar_disponible
+
+DIRECTORIO_SNAPSHOTS = os.getenv('SNAPSHOT_DIR', '.snapshots')
+# Retención: como máximo SNAPSHOT_KEEP versiones y ninguna más vieja que SNAPSHOT_MAX_DAYS (0 = sin límite)
+SNAPSHOTS_CONSERVADOS = int(os.getenv('SNAPSHOT_KEEP', 24))
+DIAS_CONSERVADOS = int(os.getenv('SNAPSHOT_MAX_DAYS', 30))
+
+NIVEL_ZSTD = 10
+NIVEL_GZIP = 6
+TAMANO_BLOQUE = 1 << 20
+
+_lock_indice = threading.Lock()
+
+
+def _zstandard():
+    """zstandard es opcional: sin él los snapshots se comprimen con gzip"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+class AlmacenSnapshots:
+    """
+    Snapshots numerados del más reciente (0) al más antiguo
+
+    El índice (indice.json) guarda una entrada por versión guardada con su hash, encoding,
+    fecha y objeto comprimido; varias entradas pueden compartir objeto si el catálogo volvió
+    a un contenido anterior.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_SNAPSHOTS,
+                 conservar: int = SNAPSHOTS_CONSERVADOS, dias: int = DIAS_CONSERVADOS):
+        self.directorio = directorio
+        self.directorio_objetos = os.path.join(directorio, 'objetos')
+        self.ruta_indice = os.path.join(directorio, 'indice.json')
+        self.conservar = conservar
+        self.dias = dias
+
+    def _cargar_indice(self) -> List[Dict]:
+        """Entradas del más antiguo al más reciente; un índice dañado se trata como vacío"""
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                entradas = json.load(f).get('snapshots', [])
+            return [e for e in entradas if isinstance(e, dict) and 'hash' in e and 'objeto' in e]
+        except (OSError, ValueError, AttributeError):
+            return []
+
+    def _guardar_indice(self, entradas: List[Dict]):
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = f"{self.ruta_indice}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'snapshots': entradas}, f, indent=2)
+        os.replace(temporal, self.ruta_indice)
+
+    def listar(self) -> List[Dict]:
+        """Entradas del índice, la más reciente primero (posición = número de snapshot)"""
+        return list(reversed(self._cargar_indice()))
+
+    def entrada(self, n: int = 0) -> Optional[Dict]:
+        """Entrada del snapshot n (0 = el más reciente)"""
+        entradas = self.listar()
+        return entradas[n] if 0 <= n < len(entradas) else None
+
+    def anterior_a(self, hash_contenido: Optional[str]) -> Optional[Dict]:
+        """Snapshot más reciente con un contenido distinto al indicado"""
+        for entrada in self.listar():
+            if entrada['hash'] != hash_contenido:
+                return entrada
+        return None
+
+    def _objeto_existente(self, hash_contenido: str) -> Optional[str]:
+        for extension in ('.csv.zst', '.csv.gz'):
+            nombre = f"{hash_contenido}{extension}"
+            if os.path.exists(os.path.join(self.directorio_objetos, nombre)):
+                return nombre
+        return None
+
+    def _comprimir(self, ruta_csv: str, hash_contenido: str) -> str:
+        """Escribir el objeto comprimido de forma atómica; devuelve su nombre"""
+        os.makedirs(self.directorio_objetos, exist_ok=True)
+        zstd = _zstandard()
+        nombre = f"{hash_contenido}{'.csv.zst' if zstd else '.csv.gz'}"
+        destino = os.path.join(self.directorio_objetos, nombre)
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        try:
+            with open(ruta_csv, 'rb') as origen:
+                if zstd:
+                    with open(temporal, 'wb') as f:
+                        zstd.ZstdCompressor(level=NIVEL_ZSTD).copy_stream(origen, f)
+                else:
+                    with gzip.open(temporal, 'wb', compresslevel=NIVEL_GZIP) as f:
+                        shutil.copyfileobj(origen, f, TAMANO_BLOQUE)
+            os.replace(temporal, destino)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        return nombre
+
+    def guardar(self, ruta_csv: str, fecha: Optional[float] = None) -> Optional[Dict]:
+        """
+        Guardar una versión del catálogo
+
+        Args:
+            ruta_csv: CSV a guardar
+            fecha: Momento del snapshot (epoch); por defecto ahora
+
+        Returns:
+            La entrada del snapshot, o None si no se pudo guardar. Si el contenido es igual
+            al del snapshot más reciente no se agrega nada y se devuelve esa entrada.
+        """
+        analisis = analizar_archivo(ruta_csv)
+        if not analisis:
+            return None
+
+        try:
+            with _lock_indice:
+                entradas = self._cargar_indice()
+                if entradas and entradas[-1]['hash'] == analisis['hash']:
+                    logging.info(f"📁 {os.path.basename(ruta_csv)} sin cambios desde el último snapshot")
+                    return entradas[-1]
+
+                objeto = self._objeto_existente(analisis['hash'])
+                if objeto is None:
+                    objeto = self._comprimir(ruta_csv, analisis['hash'])
+                fecha = time.time() if fecha is None else fecha
+                entrada = {
+                    'hash': analisis['hash'],
+                    'encoding': analisis['encoding'],
+                    'objeto': objeto,
+                    'fecha': datetime.fromtimestamp(fecha).isoformat(timespec='seconds'),
+                    'creado_en': fecha,
+                    'origen': os.path.basename(ruta_csv),
+                    'bytes': os.path.getsize(ruta_csv),
+                    'bytes_comprimido': os.path.getsize(os.path.join(self.directorio_objetos, objeto))
+                }
+                entradas.append(entrada)
+                entradas.sort(key=lambda e: e.get('creado_en', 0))
+                entradas = self._podar(entradas)
+                self._guardar_indice(entradas)
+        except OSError as e:
+            logging.warning(f"⚠️ No se pudo crear backup: {e}")
+            return None
+
+        logging.info(f"📁 Snapshot guardado: {entrada['objeto']} "
+                     f"({entrada['bytes']:,} → {entrada['bytes_comprimido']:,} bytes)")
+        return entrada
+
+    def _podar(self, entradas: List[Dict]) -> List[Dict]:
+        """Aplicar la retención y borrar los objetos que ya no usa ninguna entrada"""
+        if self.dias > 0:
+            limite = time.time() - self.dias * 86400
+            # El snapshot más reciente se conserva aunque sea viejo
+            entradas = [e for e in entradas[:-1] if e.get('creado_en', 0) >= limite] + entradas[-1:]
+        if self.conservar > 0:
+            entradas = entradas[-self.conservar:]
+
+        en_uso = {e['objeto'] for e in entradas}
+        for ruta in glob.glob(os.path.join(self.directorio_objetos, '*.csv.*')):
+            if os.path.basename(ruta) not in en_uso and not ruta.endswith('.tmp'):
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+        return entradas
+
+    def podar(self) -> int:
+        """Aplicar la retención al índice actual; devuelve cuántas entradas se quitaron"""
+        with _lock_indice:
+            entradas = self._cargar_indice()
+            conservadas = self._podar(entradas)
+            if len(conservadas) != len(entradas):
+                self._guardar_indice(conservadas)
+        return len(entradas) - len(conservadas)
+
+    def _abrir_objeto(self, entrada: Dict):
+        ruta = os.path.join(self.directorio_objetos, entrada['objeto'])
+        if ruta.endswith('.zst'):
+            zstd = _zstandard()
+            if zstd is None:
+                raise OSError(f"{entrada['objeto']} requiere el paquete zstandard")
+            return zstd.ZstdDecompressor().stream_reader(open(ruta, 'rb'), closefd=True)
+        return gzip.open(ruta, 'rb')
+
+    def _extraer_entrada(self, entrada: Dict, destino: str) -> str:
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        try:
+            with self._abrir_objeto(entrada) as origen, open(temporal, 'wb') as f:
+                shutil.copyfileobj(origen, f, TAMANO_BLOQUE)
+            os.replace(temporal, destino)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        return destino
+
+    def extraer(self, n: int, destino: str) -> Optional[str]:
+        """Descomprimir el snapshot n en destino (para restaurarlo o compararlo a mano)"""
+        entrada = self.entrada(n)
+        if entrada is None:
+            logging.error(f"❌ No existe el snapshot {n}")
+            return None
+        return self._extraer_entrada(entrada, destino)
+
+    def leer(self, n: int = 0) -> List[Dict]:
+        """
+        Filas del snapshot n
+
+        Si el contenido ya tiene copia Parquet se lee de ahí sin descomprimir el objeto;
+        si no, se descomprime a un archivo temporal y la lectura deja la copia Parquet.
+        """
+        return self.leer_entrada(self.entrada(n))
+
+    def leer_entrada(self, entrada: Optional[Dict]) -> List[Dict]:
+        """Filas de una entrada del índice (ver leer)"""
+        if entrada is None:
+            return []
+
+        ruta_csv = os.path.join(self.directorio, f"{entrada['hash']}.csv")
+        extraido = False
+        try:
+            if not copia_columnar_disponible(entrada['hash']):
+                self._extraer_entrada(entrada, ruta_csv)
+                extraido = True
+            return list(LectorCatalogo(ruta_csv, entrada['encoding'], hash_contenido=entrada['hash']))
+        finally:
+            if extraido and os.path.exists(ruta_csv):
+                os.remove(ruta_csv)
+
+    def restaurar(self, n: int, destino: str = 'ProductosHora.csv') -> Optional[str]:
+        """Volver a una versión anterior; la actual se guarda antes como snapshot"""
+        restaurado = self.extraer(n, f"{destino}.restaurar")
+        if not restaurado:
+            return None
+        # Se extrae primero: guardar la versión actual puede podar el objeto del snapshot n
+        if os.path.exists(destino):
+            self.guardar(destino)
+        os.replace(restaurado, destino)
+        return destino
+
+    def importar_backups(self, patron: str = 'ProductosHora_backup_*.csv') -> int:
+        """Agregar al almacén las copias sin comprimir que dejaban las versiones anteriores"""
+        importados = 0
+        for ruta in sorted(glob.glob(patron), key=os.path.getmtime):
+            if self.guardar(ruta, fecha=os.path.getmtime(ruta)):
+                importados += 1
+        return importados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from delta_sync import calcular_delta, resumen_delta
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Snapshots comprimidos de ProductosHora.csv")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    subcomandos.add_parser('listar', help="Mostrar los snapshots guardados (0 = el más reciente)")
+    sub = subcomandos.add_parser('guardar', help="Guardar un CSV como snapshot")
+    sub.add_argument('csv', nargs='?', default='ProductosHora.csv')
+    sub = subcomandos.add_parser('restaurar', help="Reemplazar el CSV por el snapshot N")
+    sub.add_argument('n', type=int)
+    sub.add_argument('destino', nargs='?', default='ProductosHora.csv')
+    sub = subcomandos.add_parser('diff', help="Resumir los cambios del snapshot ANTERIOR al NUEVO")
+    sub.add_argument('anterior', type=int)
+    sub.add_argument('nuevo', type=int, nargs='?', default=0)
+    subcomandos.add_parser('podar', help="Aplicar la retención configurada")
+    subcomandos.add_parser('importar-backups', help="Agregar los ProductosHora_backup_*.csv existentes")
+    args = parser.parse_args()
+
+    almacen = AlmacenSnapshots()
+    if args.comando == 'listar':
+        entradas = almacen.listar()
+        if not entradas:
+            print("📭 No hay snapshots guardados")
+        for n, entrada in enumerate(entradas):
+            print(f"{n:>3}  {entrada['fecha']}  {entrada['hash'][:12]}  "
+                  f"{entrada['bytes']:>12,} → {entrada['bytes_comprimido']:>11,} bytes  {entrada['origen']}")
+    elif args.comando == 'guardar':
+        almacen.guardar(args.csv)
+    elif args.comando == 'restaurar':
+        if almacen.restaurar(args.n, args.destino):
+            print(f"✅ {args.destino} restaurado desde el snapshot {args.n}")
+    elif args.comando == 'diff':
+        cambios = calcular_delta(almacen.leer(args.anterior), almacen.leer(args.nuevo))
+        print(f"🔀 Snapshot {args.anterior} → {args.nuevo}: {resumen_delta(cambios)}")
+    elif args.comando == 'podar':
+        print(f"🗑️ {almacen.podar()} snapshots eliminados")
+    elif args.comando == 'importar-backups':
+        print(f"📁 {almacen.importar_backups()} backups importados")
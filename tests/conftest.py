@@ -0,0 +1,79 @@
+"""Configuración común de las pruebas: módulos del repositorio e importador sin credenciales"""
+
+import logging
+import os
+import sys
+import threading
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for ruta in (RAIZ, os.path.join(RAIZ, 'csv_shopify_split')):
+    if ruta not in sys.path:
+        sys.path.insert(0, ruta)
+
+
+@pytest.fixture(autouse=True)
+def sin_log_en_archivo():
+    """Los módulos del importador escriben import_log.txt; las pruebas solo loguean a consola"""
+    raiz = logging.getLogger()
+    manejadores = [h for h in raiz.handlers if isinstance(h, logging.FileHandler)]
+    for manejador in manejadores:
+        raiz.removeHandler(manejador)
+    yield
+    for manejador in manejadores:
+        raiz.addHandler(manejador)
+
+
+@pytest.fixture
+def fabrica_importador(tmp_path, monkeypatch):
+    """Construir importadores con bases en tmp_path y sin credenciales de la API real"""
+    for variable in ('SHOPIFY_SHOP_NAME', 'SHOPIFY_ACCESS_TOKEN', 'SHOPIFY_API_URL'):
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setenv('CATALOGO_DB', str(tmp_path / 'catalogo.db'))
+    monkeypatch.setenv('JOURNAL_DB', str(tmp_path / 'journal.db'))
+    monkeypatch.setenv('FALLIDOS_DB', str(tmp_path / 'fallidos.db'))
+    creados = []
+
+    def crear(clase=None, api_url=None):
+        if clase is None:
+            from csv_to_shopify import SyscomShopifyImporterRobusto as clase
+        if api_url:
+            monkeypatch.setenv('SHOPIFY_API_URL', api_url)
+        importador = clase()
+        creados.append(importador)
+        return importador
+
+    yield crear
+    for importador in creados:
+        importador.catalogo.cerrar()
+        importador.journal.cerrar()
+        importador.fallidos.cerrar()
+
+
+@pytest.fixture
+def importador(fabrica_importador):
+    """SyscomShopifyImporterRobusto con bases en tmp_path y sin tocar la API real"""
+    return fabrica_importador()
+
+
+@pytest.fixture
+def en_hilo():
+    """Ejecutar en otro hilo y fallar (en vez de colgar la suite) si no termina a tiempo"""
+    def ejecutar(funcion, timeout=10):
+        errores = []
+
+        def objetivo():
+            try:
+                funcion()
+            except BaseException as e:
+                errores.append(e)
+
+        hilo = threading.Thread(target=objetivo, daemon=True)
+        hilo.start()
+        hilo.join(timeout)
+        assert not hilo.is_alive(), "la llamada no terminó (¿deadlock en _stats_lock?)"
+        if errores:
+            raise errores[0]
+
+    return ejecutar
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la parte de la Admin API de Shopify que usa --backend bulk
+(stagedUploadsCreate, la subida del JSONL, bulkOperationRunMutation, el estado de la
+operación y el JSONL de resultados), para probar la importación bulk sin una tienda real.
+
+    python tests/servidor_bulk_local.py --puerto 8080
+    SHOPIFY_SHOP_NAME=local SHOPIFY_ACCESS_TOKEN=prueba \
+    SHOPIFY_API_URL=http://127.0.0.1:8080/admin/api/2025-04 python csv_to_shopify.py --backend bulk
+
+También responde lo que el importador consulta antes de la operación: shop.json,
+products.json (una tienda sin productos) y locations.json.
+Los handles que contienen 'invalido' se rechazan con un userError de validación.
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+RUTA_API = '/admin/api/2025-04'
+OPERACION_ID = 'gid://shopify/BulkOperation/1'
+
+# Respuestas REST de la verificación de permisos y de la sincronización del espejo local
+RECURSOS_REST = {
+    'shop.json': {'shop': {'id': 1, 'name': 'Tienda local de prueba', 'currency': 'MXN'}},
+    'products.json': {'products': []},
+    'locations.json': {'locations': [{'id': 5, 'name': 'OTANCAHUI', 'active': True}]},
+}
+
+
+class ServidorBulkLocal:
+    def __init__(self, puerto: int = 0, estado_final: str = 'COMPLETED', maximo_resultados: Optional[int] = None,
+                 cortar_ultima: bool = False, rechazar_subida: bool = False):
+        """
+        Inicializar el servidor
+
+        Args:
+            puerto: Puerto local (0 elige uno libre)
+            estado_final: Estado con el que termina la operación (COMPLETED, FAILED, CANCELED)
+            maximo_resultados: Líneas de resultados a devolver (None = todas); simula resultados parciales
+            cortar_ultima: Agregar la siguiente línea cortada a la mitad, como una descarga interrumpida
+            rechazar_subida: Responder 500 a la subida del JSONL (la operación nunca se lanza)
+        """
+        self.estado_final = estado_final
+        self.maximo_resultados = maximo_resultados
+        self.cortar_ultima = cortar_ultima
+        self.rechazar_subida = rechazar_subida
+        self.entradas: List[Dict] = []
+        self.lanzadas = 0
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', puerto), self._manejador())
+        self.puerto = self._servidor.server_address[1]
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}"
+
+    @property
+    def api_url(self) -> str:
+        """Valor para SHOPIFY_API_URL"""
+        return f"{self.base_url}{RUTA_API}"
+
+    def iniciar(self) -> 'ServidorBulkLocal':
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self) -> 'ServidorBulkLocal':
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def _graphql(self, consulta: str, variables: Dict) -> Dict:
+        if 'stagedUploadsCreate' in consulta:
+            return {'stagedUploadsCreate': {
+                'stagedTargets': [{
+                    'url': f"{self.base_url}/staged-upload",
+                    'resourceUrl': None,
+                    'parameters': [{'name': 'key', 'value': f"tmp/{variables['input'][0]['filename']}"}]
+                }],
+                'userErrors': []
+            }}
+        if 'bulkOperationRunMutation' in consulta:
+            self.lanzadas += 1
+            return {'bulkOperationRunMutation': {
+                'bulkOperation': {'id': OPERACION_ID, 'status': 'CREATED'},
+                'userErrors': []
+            }}
+        if 'BulkOperation' in consulta:
+            completada = self.estado_final == 'COMPLETED'
+            url = f"{self.base_url}/resultados.jsonl"
+            return {'node': {
+                'id': variables['id'],
+                'status': self.estado_final,
+                'errorCode': None if completada else 'INTERNAL_SERVER_ERROR',
+                'objectCount': str(len(self.entradas)),
+                'url': url if completada else None,
+                'partialDataUrl': None if completada else url
+            }}
+        raise ValueError(f"Consulta no soportada: {consulta[:80]}")
+
+    def _resultado(self, linea: int, entrada: Dict) -> Dict:
+        if 'invalido' in entrada['handle']:
+            datos = {'product': None, 'userErrors': [{'field': ['handle'], 'message': 'Handle is invalid'}]}
+        else:
+            datos = {'product': {
+                'id': f"gid://shopify/Product/{1000 + linea}",
+                'handle': entrada['handle'],
+                'variants': {'nodes': [{
+                    'id': f"gid://shopify/ProductVariant/{2000 + linea}",
+                    'sku': entrada['variants'][0]['inventoryItem']['sku'],
+                    'price': str(entrada['variants'][0]['price']),
+                    'inventoryItem': {'id': f"gid://shopify/InventoryItem/{3000 + linea}"}
+                }]}
+            }, 'userErrors': []}
+        return {'data': {'productSet': datos}, '__lineNumber': linea}
+
+    def resultados_jsonl(self) -> bytes:
+        lineas = [json.dumps(self._resultado(i, entrada)) for i, entrada in enumerate(self.entradas)]
+        devueltas = lineas[:self.maximo_resultados] if self.maximo_resultados is not None else lineas
+        cuerpo = ''.join(linea + '\n' for linea in devueltas)
+        if self.cortar_ultima and len(devueltas) < len(lineas):
+            siguiente = lineas[len(devueltas)]
+            cuerpo += siguiente[:len(siguiente) // 2]
+        return cuerpo.encode('utf-8')
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, codigo: int, cuerpo: bytes = b'', tipo: str = 'application/json'):
+                self.send_response(codigo)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_POST(self):
+                cuerpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path == '/staged-upload':
+                    if servidor.rechazar_subida:
+                        return self._responder(500, b'Internal Server Error', 'text/plain')
+                    # Formulario multipart: solo interesan las líneas del archivo JSONL
+                    lineas = cuerpo.replace(b'\r\n', b'\n').split(b'\n')
+                    servidor.entradas = [json.loads(linea)['input'] for linea in lineas
+                                         if linea.startswith(b'{"input"')]
+                    return self._responder(201)
+                if self.path != f"{RUTA_API}/graphql.json":
+                    return self._responder(404)
+                peticion = json.loads(cuerpo)
+                try:
+                    data = {'data': servidor._graphql(peticion['query'], peticion.get('variables') or {})}
+                except ValueError as e:
+                    data = {'errors': [{'message': str(e)}]}
+                self._responder(200, json.dumps(data).encode('utf-8'))
+
+            def do_GET(self):
+                ruta = self.path.split('?', 1)[0]
+                if ruta == '/resultados.jsonl':
+                    return self._responder(200, servidor.resultados_jsonl(), 'application/jsonl')
+                recurso = RECURSOS_REST.get(ruta[len(RUTA_API) + 1:]) if ruta.startswith(f"{RUTA_API}/") else None
+                if recurso is None:
+                    return self._responder(404)
+                self._responder(200, json.dumps(recurso).encode('utf-8'))
+
+        return Manejador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de prueba para --backend bulk")
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--estado-final', default='COMPLETED', choices=('COMPLETED', 'FAILED', 'CANCELED'))
+    parser.add_argument('--maximo-resultados', type=int, help="Devolver solo las primeras N líneas de resultados")
+    args = parser.parse_args()
+
+    servidor = ServidorBulkLocal(args.puerto, args.estado_final, args.maximo_resultados)
+    print(f"🧪 Servidor bulk local en {servidor.api_url}")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
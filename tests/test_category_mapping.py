@@ -0,0 +1,140 @@
+"""Mapeo de categorías: búsqueda normalizada y coincidencia aproximada por palabras"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import category_mapping
+from category_mapping import IndicePalabras, buscar_en_indice, construir_indice, normalizar_ruta, palabras
+
+MAPEO = {
+    'Videovigilancia > Cámaras IP > Domo': 'Cameras > Dome',
+    'Videovigilancia > Cámaras IP > Bullet': 'Cameras > Bullet',
+    'Videovigilancia > Cámaras IP > Todos': 'Cameras',
+    'Videovigilancia > Grabadores > NVR': 'Recorders > NVR',
+    'Cableado Estructurado > Fibra Óptica > Cables': 'Fiber > Cables',
+    'Cableado Estructurado > Fibra Óptica > Patch Cords': 'Fiber > Patch Cords',
+    'Cableado Estructurado > Cables de Cobre > Patch Cords': 'Copper > Patch Cords',
+    'Cableado Estructurado > Fibra Óptica > Todos': 'Fiber',
+}
+
+
+@pytest.fixture
+def indice():
+    return IndicePalabras(MAPEO)
+
+
+def test_normalizacion_de_segmentos():
+    assert normalizar_ruta(' Videovigilancia  >Cámaras  IP ') == ['videovigilancia', 'camaras ip']
+    assert palabras('Fibra Óptica > Patch-Cords') == ['fibra', 'optica', 'patch', 'cords']
+
+
+@pytest.fixture
+def trie():
+    return construir_indice(dict(MAPEO, Videovigilancia='Security'))
+
+
+def test_trie_prefiere_el_prefijo_mapeado_mas_largo(trie):
+    assert buscar_en_indice(trie, 'Videovigilancia > Grabadores > NVR > 16 Canales') == 'Recorders > NVR'
+    assert buscar_en_indice(trie, 'videovigilancia >  CÁMARAS IP > Domo > PTZ') == 'Cameras > Dome'
+
+
+def test_trie_usa_la_primera_clave_bajo_el_nodo_mas_profundo(trie):
+    # 'Fibra Óptica' no tiene mapeo propio: gana la primera clave del archivo bajo ese nodo
+    assert buscar_en_indice(trie, 'Cableado Estructurado > Fibra Óptica > Conectores') == 'Fiber > Cables'
+    assert buscar_en_indice(trie, 'Cableado Estructurado > Cables de Cobre') == 'Copper > Patch Cords'
+
+
+def test_trie_cae_a_la_categoria_principal(trie):
+    assert buscar_en_indice(trie, 'Videovigilancia > Drones') == 'Security'
+    assert buscar_en_indice(trie, 'Cableado Estructurado > Racks') is None
+    assert buscar_en_indice(trie, 'Energía > Baterías') is None
+
+
+def test_trie_exige_al_menos_dos_segmentos(trie):
+    assert buscar_en_indice(trie, 'Videovigilancia') is None
+    assert buscar_en_indice(trie, '') is None
+
+
+def test_ruta_completa_con_otra_redaccion(indice):
+    clave, puntaje = indice.mejor_coincidencia('Cableado Estructurado > Fibra Optica > Cables', 0.75)
+    assert clave == 'Cableado Estructurado > Fibra Óptica > Cables'
+    assert puntaje == pytest.approx(1.0)
+
+    clave, _ = indice.mejor_coincidencia('Videovigilancia > Camaras IP > Domos', 0.5)
+    assert clave.startswith('Videovigilancia > Cámaras IP')
+
+
+def test_una_palabra_no_empata_con_todas_las_claves_que_la_contienen(indice):
+    # Con solo la cobertura de la consulta, 'Fibra' puntuaba 1.0 contra cada clave de fibra
+    clave, puntaje = indice.mejor_coincidencia('Fibra', 0.0)
+    assert puntaje < 0.75
+    assert indice.mejor_coincidencia('Fibra', 0.75) is None
+    assert 'Fibra' in clave
+
+
+def test_puntaje_penaliza_palabras_de_sobra_en_la_clave():
+    corta = IndicePalabras({'Grabadores NVR': 'a', 'Videovigilancia > Grabadores > NVR > Todos': 'b'})
+    clave, puntaje = corta.mejor_coincidencia('Grabadores NVR', 0.0)
+    assert clave == 'Grabadores NVR'
+    assert puntaje == pytest.approx(1.0)
+
+
+def test_empate_determinista():
+    # Mismas palabras en distinto orden: mismo puntaje y mismas sobrantes, gana la primera del archivo
+    mapeo = {'Redes > Switches PoE': 'primero', 'Switches > Redes PoE': 'segundo'}
+    for _ in range(3):
+        assert IndicePalabras(mapeo).mejor_coincidencia('Switches PoE Redes', 0.0)[0] == 'Redes > Switches PoE'
+        assert IndicePalabras(dict(reversed(mapeo.items()))).mejor_coincidencia(
+            'Switches PoE Redes', 0.0)[0] == 'Switches > Redes PoE'
+
+
+def test_sin_palabras_en_comun(indice):
+    assert indice.mejor_coincidencia('Energía Solar', 0.0) is None
+    assert indice.mejor_coincidencia('> >', 0.0) is None
+
+
+def test_convertir_categoria_usa_el_mapeo_vigente():
+    mapeo = category_mapping.CATEGORY_MAPPING
+    clave, valor = next(iter(mapeo.items()))
+    assert category_mapping.convertir_categoria(clave) == valor
+    assert category_mapping.convertir_categoria(clave.upper().replace(' > ', '>')) == valor
+    assert category_mapping.convertir_categoria('Categoría Inexistente XYZ') == 'Categoría Inexistente XYZ'
+
+
+def _python(codigo, cwd, **entorno):
+    """Ejecutar código con category_mapping en un proceso limpio"""
+    variables = {clave: valor for clave, valor in os.environ.items() if not clave.startswith('CATEGORY_MAPPING')}
+    variables.update(entorno, PYTHONPATH=os.path.dirname(os.path.abspath(category_mapping.__file__)))
+    corrida = subprocess.run([sys.executable, '-c', codigo], cwd=cwd, env=variables,
+                             capture_output=True, text=True, timeout=60)
+    assert corrida.returncode == 0, corrida.stderr
+    return corrida.stdout
+
+
+def test_importar_no_carga_ni_escribe_en_el_directorio_de_trabajo(tmp_path):
+    salida = _python("import category_mapping as c; print(c._estado is None)", tmp_path)
+
+    assert salida.strip() == 'True'
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_junto_al_archivo_de_mapeo(tmp_path):
+    mapeo = tmp_path / 'mapeo' / 'category_mapping.json'
+    mapeo.parent.mkdir()
+    shutil.copy(category_mapping.RUTA_MAPEO, mapeo)
+    trabajo = tmp_path / 'trabajo'
+    trabajo.mkdir()
+    os.chmod(trabajo, 0o555)
+    try:
+        codigo = ("import category_mapping as c; k = next(iter(c.CATEGORY_MAPPING)); "
+                  "print(c.convertir_categoria(k) == c.CATEGORY_MAPPING[k])")
+        assert _python(codigo, trabajo, CATEGORY_MAPPING_FILE=str(mapeo)).strip() == 'True'
+    finally:
+        os.chmod(trabajo, 0o755)
+
+    assert os.listdir(trabajo) == []
+    assert (mapeo.parent / '.cache_categorias.pickle').exists()
@@ -0,0 +1,127 @@
+"""Cola de fallidos (dead-letter) y su uso al inicio de cada corrida"""
+
+import time
+
+import pytest
+
+import cola_fallidos
+from cola_fallidos import ColaFallidos
+from politica_reintentos import CONEXION, SERVIDOR, VALIDACION
+
+
+@pytest.fixture
+def cola(tmp_path):
+    cola = ColaFallidos(str(tmp_path / 'fallidos.db'))
+    yield cola
+    cola.cerrar()
+
+
+def _fila(handle, stock='5', titulo=None):
+    return {'Handle': handle, 'Title': titulo or handle.title(), 'Variant Inventory Qty': stock}
+
+
+def _proximo(cola, handle):
+    return cola.conn.execute("SELECT intentos, proximo_intento FROM fallidos WHERE handle = ?", (handle,)).fetchone()
+
+
+def test_agregar_quitar_y_resumen(cola):
+    cola.agregar('camara-ip', _fila('camara-ip', titulo='Cámara IP 4MP'), SERVIDOR, 'HTTP 503')
+    cola.agregar('dvr', _fila('dvr'), VALIDACION, 'HTTP 422')
+    cola.agregar('', _fila(''), SERVIDOR)
+
+    assert cola.total() == 2
+    assert cola.contiene('camara-ip')
+    assert cola.resumen() == {SERVIDOR: 1, VALIDACION: 1}
+
+    cola.quitar('camara-ip')
+    cola.quitar('no-existe')
+    assert not cola.contiene('camara-ip')
+    assert cola.total() == 1
+
+
+def test_espera_creciente_por_intento(cola, monkeypatch):
+    monkeypatch.setattr(cola_fallidos, 'ESPERA_BASE', 100.0)
+    for intento in range(1, 4):
+        antes = time.time()
+        cola.agregar('switch', _fila('switch'), CONEXION)
+        intentos, proximo = _proximo(cola, 'switch')
+        assert intentos == intento
+        assert proximo - antes == pytest.approx(100.0 * 2 ** (intento - 1), abs=1.0)
+
+
+def test_validacion_y_tope_de_intentos_quedan_para_revision(cola, monkeypatch):
+    monkeypatch.setattr(cola_fallidos, 'ESPERA_BASE', 0.0)
+    monkeypatch.setattr(cola_fallidos, 'INTENTOS_MAXIMOS', 2)
+    cola.agregar('dvr', _fila('dvr'), VALIDACION)
+    for _ in range(3):
+        cola.agregar('nvr', _fila('nvr'), SERVIDOR)
+
+    assert _proximo(cola, 'dvr')[1] is None
+    assert _proximo(cola, 'nvr') == (3, None)
+    assert cola.pendientes() == []
+    assert cola.total() == 2
+
+
+def test_pendientes_vencidos_en_orden(cola, monkeypatch):
+    monkeypatch.setattr(cola_fallidos, 'ESPERA_BASE', 0.0)
+    cola.agregar('a', _fila('a', titulo='Cámara'), SERVIDOR)
+    cola.agregar('b', _fila('b'), CONEXION)
+    monkeypatch.setattr(cola_fallidos, 'ESPERA_BASE', 3600.0)
+    cola.agregar('c', _fila('c'), CONEXION)
+
+    assert [fila['Handle'] for fila in cola.pendientes()] == ['a', 'b']
+    assert cola.pendientes()[0]['Title'] == 'Cámara'
+    assert len(cola.pendientes(limite=1)) == 1
+
+
+def test_handles_persisten_al_reabrir(tmp_path):
+    ruta = str(tmp_path / 'fallidos.db')
+    cola = ColaFallidos(ruta)
+    cola.agregar('ups', _fila('ups'), SERVIDOR)
+    cola.cerrar()
+
+    cola = ColaFallidos(ruta)
+    assert cola.contiene('ups')
+    cola.quitar('ups')
+    cola.cerrar()
+    assert ColaFallidos(ruta).total() == 0
+
+
+@pytest.fixture
+def con_fallidos(importador, monkeypatch):
+    """Cola con tres fallidos vencidos: uno sigue en el CSV, otro ya no viene y otro se quedó sin stock"""
+    monkeypatch.setattr(cola_fallidos, 'ESPERA_BASE', 0.0)
+    for handle in ('en-csv', 'fuera-de-csv', 'sin-stock'):
+        importador.fallidos.agregar(handle, _fila(handle, titulo='guardada'), SERVIDOR)
+    return importador
+
+
+def _csv():
+    return [_fila('uno'), _fila('en-csv', titulo='actual'), _fila('sin-stock', stock='0'), _fila('dos')]
+
+
+def test_anteponer_fallidos_con_catalogo_en_memoria(con_fallidos):
+    productos = con_fallidos.filtrar_productos_con_stock(_csv())
+    resultado = con_fallidos.anteponer_fallidos(productos)
+
+    assert [(p['Handle'], p['Title']) for p in resultado] == [
+        ('en-csv', 'actual'), ('fuera-de-csv', 'guardada'), ('uno', 'Uno'), ('dos', 'Dos')
+    ]
+    assert not con_fallidos.fallidos.contiene('sin-stock')
+
+
+def test_anteponer_fallidos_en_streaming(con_fallidos):
+    resultado = con_fallidos.anteponer_fallidos(con_fallidos.iterar_con_stock(iter(_csv())))
+
+    assert not isinstance(resultado, list)
+    assert [(p['Handle'], p['Title']) for p in resultado] == [
+        ('uno', 'Uno'), ('en-csv', 'actual'), ('dos', 'Dos'), ('fuera-de-csv', 'guardada')
+    ]
+    assert not con_fallidos.fallidos.contiene('sin-stock')
+
+
+def test_fallido_sin_stock_sale_de_la_cola_al_procesarlo(con_fallidos):
+    con_fallidos._procesar_producto(_fila('fuera-de-csv', stock='0'), 1, 1)
+
+    assert not con_fallidos.fallidos.contiene('fuera-de-csv')
+    assert con_fallidos.stats['productos_con_error'] == 0
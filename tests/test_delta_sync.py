@@ -0,0 +1,124 @@
+"""Delta entre snapshots del catálogo: nuevos, precio, stock, contenido y eliminados"""
+
+import csv
+
+from delta_sync import aplicar_delta, calcular_delta, claves_modificadas, filtrar_modificados, resumen_delta
+
+
+def _fila(handle, sku=None, precio='100.00', stock='5', titulo=None, **extra):
+    fila = {'Handle': handle, 'Variant SKU': sku or handle.upper(), 'Title': titulo or handle.title(),
+            'Variant Price': precio, 'Variant Compare At Price': '', 'Variant Inventory Qty': stock}
+    fila.update(extra)
+    return fila
+
+
+def _handles(filas):
+    return [fila['Handle'] for fila in filas]
+
+
+ANTERIOR = [_fila('camara'), _fila('dvr'), _fila('nvr'), _fila('switch'), _fila('ups')]
+
+
+def test_cada_tipo_de_cambio():
+    nuevo = [
+        _fila('camara'),
+        _fila('dvr', precio='120.00'),
+        _fila('nvr', stock='0'),
+        _fila('switch', titulo='Switch PoE 8 puertos'),
+        _fila('router'),
+    ]
+    cambios = calcular_delta(ANTERIOR, nuevo)
+
+    assert _handles(cambios['nuevos']) == ['router']
+    assert _handles(cambios['precio']) == ['dvr']
+    assert _handles(cambios['stock']) == ['nvr']
+    assert _handles(cambios['contenido']) == ['switch']
+    assert cambios['eliminados'] == [{'Handle': 'ups', 'Variant SKU': 'UPS'}]
+    assert resumen_delta(cambios) == "nuevos: 1, precio: 1, stock: 1, contenido: 1, eliminados: 1"
+
+
+def test_una_fila_en_varios_tipos():
+    cambios = calcular_delta(ANTERIOR, [_fila('dvr', precio='90', stock='2', Vendor='Hikvision')])
+
+    assert [_handles(cambios[tipo]) for tipo in ('precio', 'stock', 'contenido')] == [['dvr']] * 3
+    assert claves_modificadas(cambios) == {('dvr', 'DVR')}
+
+
+def test_formato_numerico_y_espacios_no_son_cambio():
+    anterior = [_fila('camara', precio='100', stock='5')]
+    nuevo = [_fila('camara', precio='100.00', stock='5.0')]
+    nuevo[0]['Handle'] = ' camara '
+
+    cambios = calcular_delta(anterior, nuevo)
+    assert not any(cambios[tipo] for tipo in ('nuevos', 'precio', 'stock', 'eliminados'))
+
+
+def test_filas_extra_del_mismo_handle():
+    anterior = [_fila('camara'), _fila('camara', **{'Image Src': '1.jpg'}), _fila('dvr')]
+    nuevo = [_fila('camara'), _fila('camara', **{'Image Src': '2.jpg'}), _fila('camara', **{'Image Src': '3.jpg'})]
+
+    cambios = calcular_delta(anterior, nuevo)
+    # La segunda fila cambió de imagen y la tercera es nueva; el Handle solo se elimina una vez
+    assert len(cambios['contenido']) == 1
+    assert len(cambios['nuevos']) == 1
+    assert cambios['eliminados'] == [{'Handle': 'dvr', 'Variant SKU': 'DVR'}]
+
+    # Quitar una fila extra no elimina el producto
+    assert calcular_delta(anterior[:2], anterior[:1])['eliminados'] == []
+
+
+def test_filas_sin_handle_ni_sku_se_ignoran():
+    vacia = {'Handle': '', 'Variant SKU': '  ', 'Title': 'Fila rota'}
+    cambios = calcular_delta([vacia], [vacia, _fila('camara')])
+
+    assert _handles(cambios['nuevos']) == ['camara']
+    assert cambios['eliminados'] == []
+
+
+def test_acepta_generadores():
+    cambios = calcular_delta(iter(ANTERIOR), (fila for fila in ANTERIOR[1:]))
+    assert _handles(cambios['eliminados']) == ['camara']
+
+
+def test_filtrar_modificados():
+    productos = [_fila('camara'), _fila('dvr'), _fila('dvr', sku='DVR-2')]
+    assert filtrar_modificados(productos, {('dvr', 'DVR')}) == [productos[1]]
+
+
+def _escribir(ruta, filas):
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(filas[0]))
+        writer.writeheader()
+        writer.writerows(filas)
+
+
+def test_aplicar_delta_contra_un_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _escribir(tmp_path / 'anterior.csv', ANTERIOR)
+    actual = [_fila('camara'), _fila('dvr', precio='120.00'), _fila('nvr'), _fila('router')]
+    _escribir(tmp_path / 'actual.csv', actual)
+
+    # Los productos ya parseados pueden venir transformados: se comparan los CSV crudos
+    parseados = [dict(fila, Title=fila['Title'].upper()) for fila in actual]
+    resultado = aplicar_delta(str(tmp_path / 'actual.csv'), parseados, str(tmp_path / 'anterior.csv'))
+    assert _handles(resultado) == ['dvr', 'router']
+
+    assert aplicar_delta(str(tmp_path / 'actual.csv'), parseados, str(tmp_path / 'no-existe.csv')) == parseados
+
+
+def test_fila_con_mas_campos_que_el_encabezado(tmp_path, monkeypatch):
+    # csv.DictReader guarda los campos de sobra bajo la clave None
+    monkeypatch.chdir(tmp_path)
+    for nombre, precio in (('anterior.csv', '100.00'), ('actual.csv', '120.00')):
+        with open(tmp_path / nombre, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(_fila('camara')))
+            writer.writerow(list(_fila('camara', precio=precio).values()) + ['sobra', 'otra'])
+            writer.writerow(list(_fila('dvr').values()))
+
+    with open(tmp_path / 'actual.csv', encoding='utf-8', newline='') as f:
+        parseados = list(csv.DictReader(f))
+    assert None in parseados[0]
+
+    resultado = aplicar_delta(str(tmp_path / 'actual.csv'), parseados, str(tmp_path / 'anterior.csv'))
+    assert _handles(resultado) == ['camara']
@@ -0,0 +1,125 @@
+"""--backend bulk contra el servidor local: resultados por línea y productos sin resultado"""
+
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from catalogo_local import CatalogoLocal
+from importacion_bulk import SyscomShopifyImporterBulk
+from politica_reintentos import SERVIDOR, VALIDACION
+from servidor_bulk_local import ServidorBulkLocal
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HANDLES = ('camara-ip', 'dvr-invalido', 'nvr-8ch', 'switch-poe')
+
+
+def _filas():
+    return [{'Handle': handle, 'Title': handle.replace('-', ' ').title(), 'Variant SKU': handle.upper(),
+             'Variant Price': '100', 'Variant Inventory Qty': '3'} for handle in HANDLES]
+
+
+@pytest.fixture
+def importar_bulk(fabrica_importador):
+    """Correr _procesar_productos del importador bulk contra un servidor local configurado"""
+    servidores = []
+
+    def importar(**opciones):
+        servidor = ServidorBulkLocal(**opciones).iniciar()
+        servidores.append(servidor)
+        importador = fabrica_importador(SyscomShopifyImporterBulk, servidor.api_url)
+        importador.location_id = 5
+        importador.journal.iniciar_corrida()
+        importador._procesar_productos(_filas(), workers=1)
+        return importador, servidor
+
+    yield importar
+    for servidor in servidores:
+        servidor.detener()
+
+
+def _estados(importador):
+    return {handle: registro['estado'] for handle, registro in importador.journal.estados().items()}
+
+
+def test_operacion_completa(importar_bulk):
+    importador, servidor = importar_bulk()
+
+    assert [entrada['handle'] for entrada in servidor.entradas] == list(HANDLES)
+    assert importador.stats['productos_creados'] == 3
+    assert importador.stats['productos_con_error'] == 1
+    assert _estados(importador) == {'camara-ip': 'completado', 'dvr-invalido': 'error',
+                                    'nvr-8ch': 'completado', 'switch-poe': 'completado'}
+
+    registro = importador.catalogo.buscar('nvr-8ch')
+    assert registro['product_id'] == 1002
+    assert registro['inventory_item_ids'] == [3002]
+    assert registro['qty'] == 3
+
+    # El rechazo de validación queda en la cola para revisión, sin reintento automático
+    assert importador.fallidos.resumen() == {VALIDACION: 1}
+    assert importador.fallidos.contiene('dvr-invalido')
+
+
+@pytest.mark.parametrize('opciones', [
+    {'estado_final': 'FAILED', 'maximo_resultados': 2},
+    {'estado_final': 'COMPLETED', 'maximo_resultados': 2, 'cortar_ultima': True},
+    {'estado_final': 'CANCELED', 'maximo_resultados': 0},
+], ids=['fallida-parcial', 'resultados-cortados', 'cancelada'])
+def test_lineas_sin_resultado_cuentan_como_error(importar_bulk, opciones):
+    importador, _ = importar_bulk(**opciones)
+
+    reportadas = HANDLES[:opciones['maximo_resultados']]
+    faltantes = HANDLES[opciones['maximo_resultados']:]
+    estados = _estados(importador)
+    assert all(estados[handle] == 'error' for handle in faltantes)
+    assert importador.stats['productos_creados'] == sum(1 for h in reportadas if 'invalido' not in h)
+    assert importador.stats['productos_con_error'] == len(HANDLES) - importador.stats['productos_creados']
+
+    # Los faltantes se reintentan en la siguiente corrida con su fila del CSV
+    for handle in faltantes:
+        assert importador.fallidos.contiene(handle)
+    fila = importador.fallidos.conn.execute(
+        "SELECT clase, detalle FROM fallidos WHERE handle = ?", (faltantes[-1],)).fetchone()
+    assert fila[0] == SERVIDOR
+    if opciones['estado_final'] != 'COMPLETED':
+        assert opciones['estado_final'] in fila[1]
+
+
+def test_error_de_la_operacion_registra_todos(importar_bulk):
+    importador, servidor = importar_bulk(rechazar_subida=True)
+
+    assert servidor.lanzadas == 0
+    assert importador.stats['productos_con_error'] == len(HANDLES)
+    assert set(_estados(importador).values()) == {'error'}
+    assert importador.fallidos.total() == len(HANDLES)
+
+
+def test_comando_completo_contra_el_servidor_local(tmp_path):
+    """csv_to_shopify.py --backend bulk de principio a fin, como indica el README"""
+    with open(tmp_path / 'ProductosHora.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(_filas()[0]))
+        writer.writeheader()
+        writer.writerows(_filas() + [dict(_filas()[0], Handle='sin-stock', **{'Variant Inventory Qty': '0'})])
+
+    with ServidorBulkLocal() as servidor:
+        entorno = {clave: valor for clave, valor in os.environ.items()
+                   if not clave.startswith(('SHOPIFY_', 'CSV_URL'))}
+        entorno.update(SHOPIFY_SHOP_NAME='local', SHOPIFY_ACCESS_TOKEN='prueba', SHOPIFY_API_URL=servidor.api_url,
+                       CATALOGO_DB=str(tmp_path / 'catalogo.db'), JOURNAL_DB=str(tmp_path / 'journal.db'),
+                       FALLIDOS_DB=str(tmp_path / 'fallidos.db'), RANDOMIZE_ORDER='false')
+        corrida = subprocess.run([sys.executable, os.path.join(RAIZ, 'csv_to_shopify.py'), '--backend', 'bulk'],
+                                 cwd=tmp_path, env=entorno, capture_output=True, text=True, timeout=120)
+
+    assert corrida.returncode == 0, corrida.stderr
+    assert 'Sin permisos' not in corrida.stdout
+    assert [entrada['handle'] for entrada in servidor.entradas] == list(HANDLES)
+
+    catalogo = CatalogoLocal(str(tmp_path / 'catalogo.db'))
+    try:
+        assert catalogo.sincronizado
+        assert [handle for handle in HANDLES if catalogo.existe(handle)] == ['camara-ip', 'nvr-8ch', 'switch-poe']
+    finally:
+        catalogo.cerrar()
@@ -0,0 +1,44 @@
+"""Opciones de línea de comandos de csv_to_shopify.py"""
+
+import logging
+
+import pytest
+
+import csv_to_shopify
+from shopify_async import SyscomShopifyImporterAsync
+
+
+@pytest.fixture
+def correr(fabrica_importador, monkeypatch):
+    """Ejecutar main() sin importar nada y devolver (clase del importador, workers)"""
+    # fabrica_importador deja las bases en tmp_path y quita las credenciales reales
+    def ejecutar(*argumentos):
+        recibido = {}
+
+        def importar(self, workers=1, **opciones):
+            recibido.update(clase=type(self), workers=workers)
+            for base in (self.catalogo, self.journal, self.fallidos):
+                base.cerrar()
+
+        monkeypatch.setattr(csv_to_shopify.SyscomShopifyImporterRobusto, 'importar_productos_automatico', importar)
+        monkeypatch.setattr('sys.argv', ['csv_to_shopify.py', *argumentos])
+        csv_to_shopify.main()
+        return recibido['clase'], recibido['workers']
+
+    return ejecutar
+
+
+def test_sync_usa_un_worker_por_defecto(correr):
+    assert correr() == (csv_to_shopify.SyscomShopifyImporterRobusto, 1)
+    assert correr('--workers', '4')[1] == 4
+
+
+def test_async_usa_la_cubeta_de_la_api_por_defecto(correr):
+    assert correr('--backend', 'async') == (SyscomShopifyImporterAsync, 40)
+    assert correr('--backend', 'async', '--workers', '100')[1] == 100
+
+
+def test_async_con_un_worker_avisa(correr, caplog):
+    with caplog.at_level(logging.WARNING):
+        assert correr('--backend', 'async', '--workers', '1')[1] == 1
+    assert '--workers 1' in caplog.text
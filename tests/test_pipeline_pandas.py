@@ -0,0 +1,93 @@
+"""Motor pandas del splitter: mismas partes, byte por byte, que el motor por filas"""
+
+import csv
+import os
+import random
+
+import pytest
+
+from csv_splitter_shopify import CSVSplitterShopify
+
+pytest.importorskip('pandas')
+
+CATEGORIAS = ['Videovigilancia > Cámaras IP > Domo', 'Energía > Baterías', 'Networking', ' Networking ',
+              'Categoría Inexistente', '', 'Energía > X > Y']
+
+
+def _mojibake(aleatorio, texto):
+    return texto.encode('utf-8').decode('latin-1') if aleatorio.random() < 0.3 else texto
+
+
+def _csv_shopify(ruta):
+    """Formato Shopify con handles vacíos, stocks raros, filas extra y filas cortas"""
+    aleatorio = random.Random(7)
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Handle', 'Title', 'Body (HTML)', 'Vendor', 'Variant SKU', 'Variant Price',
+                         'Variant Inventory Qty', 'Product Category', 'Image Src', 'Image Position', 'Status',
+                         'Inventory Qty', 'Option1 Value', 'Extra'])
+        for i in range(600):
+            handle = aleatorio.choice([f'h{i}', '', f'h{i}'])
+            titulo = aleatorio.choice([_mojibake(aleatorio, f'Cámara  Óptica {i}'), '', '  ', f'T, "x" {i}'])
+            cuerpo = _mojibake(aleatorio, '<p>Descripción\n, "q"</p>') * aleatorio.randint(0, 3)
+            writer.writerow([
+                handle, titulo, cuerpo, aleatorio.choice(['HIK', '', '  ']), aleatorio.choice(['', f's{i}']),
+                aleatorio.choice(['', '1.5']),
+                aleatorio.choice(['0', '3', '', 'abc', 'nan', '1_000', ' 2 ', '-1', 'inf', '0.5']),
+                aleatorio.choice(CATEGORIAS), 'http://a/1.jpg', '1', aleatorio.choice(['', 'draft']),
+                aleatorio.choice(['', '5', 'x']), aleatorio.choice(['', 'Rojo']), 'z'
+            ])
+            for extra in range(aleatorio.randint(0, 2)):
+                writer.writerow([handle, '', '', '', '', aleatorio.choice(['', '2']), aleatorio.choice(['', '0', '4']),
+                                 '', f'http://a/{extra + 2}.jpg', extra + 2, '', '',
+                                 aleatorio.choice(['', 'Azul']), ''])
+        writer.writerow(['corta', 'Fila corta'])
+        writer.writerow(['corta', '', '', '', '', '', '', '', 'http://x.jpg'])
+
+
+def _csv_personalizado(ruta):
+    """Formato SYSCOM con columnas que se convierten a Shopify"""
+    aleatorio = random.Random(11)
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Codigo', 'SKU', 'Nombre', 'Descripcion', 'Precio', 'Stock', 'Marca', 'Categoria',
+                         'Categoria_Principal', 'Imagen'])
+        for i in range(400):
+            writer.writerow([
+                aleatorio.choice(['', f'c{i}']), aleatorio.choice(['', f's{i}', ' ']),
+                aleatorio.choice([f'Nómbre {i}', '', '   ', _mojibake(aleatorio, f'Título, {i}')]),
+                aleatorio.choice(['', ' desc larga ' * 12]), aleatorio.choice(['1', '']),
+                aleatorio.choice(['0', '2', '', 'x']), aleatorio.choice(['HIK', '']),
+                aleatorio.choice(CATEGORIAS), aleatorio.choice(CATEGORIAS), ''
+            ])
+
+
+def _dividir(directorio, archivo, motor):
+    os.makedirs(directorio)
+    os.chdir(directorio)
+    splitter = CSVSplitterShopify(motor=motor)
+    splitter.bytes_por_archivo = 20000
+    dividir = splitter._dividir_con_pandas if motor == 'pandas' else splitter._dividir_por_filas
+    archivos = dividir(archivo) or []
+    contenido = []
+    for ruta in archivos:
+        with open(ruta, 'rb') as f:
+            contenido.append((os.path.basename(ruta), f.read()))
+    stats = {clave: valor for clave, valor in splitter.stats.items() if not clave.startswith('tiempo')}
+    return contenido, stats, splitter.categorias_convertidas, splitter.categorias_sin_mapeo
+
+
+@pytest.mark.parametrize('generar', [_csv_shopify, _csv_personalizado], ids=['shopify', 'personalizado'])
+def test_mismas_partes_que_el_motor_por_filas(tmp_path, monkeypatch, generar):
+    monkeypatch.chdir(tmp_path)
+    archivo = str(tmp_path / 'ProductosHora.csv')
+    generar(archivo)
+
+    filas = _dividir(tmp_path / 'filas', archivo, 'filas')
+    pandas = _dividir(tmp_path / 'pandas', archivo, 'pandas')
+
+    assert len(filas[0]) > 1
+    assert [nombre for nombre, _ in pandas[0]] == [nombre for nombre, _ in filas[0]]
+    for (nombre, esperado), (_, obtenido) in zip(filas[0], pandas[0]):
+        assert obtenido == esperado, nombre
+    assert pandas[1:] == filas[1:]
@@ -0,0 +1,190 @@
+"""Clasificación de errores, presupuestos por clase y pausa global del importador"""
+
+import random
+import socket
+import urllib.error
+from email.message import Message
+from types import SimpleNamespace
+
+import pytest
+import requests
+import shopify
+
+import csv_to_shopify
+from politica_reintentos import (CONEXION, DESCONOCIDO, IMAGEN, LIMITE_API, SERVIDOR, TIMEOUT, VALIDACION,
+                                 PoliticaReintentos, clasificar_error, describir_error, retry_after)
+
+
+def _http_error(codigo, headers=None):
+    mensaje = Message()
+    for clave, valor in (headers or {}).items():
+        mensaje[clave] = valor
+    return urllib.error.HTTPError('https://tienda/admin/products.json', codigo, 'error', mensaje, None)
+
+
+@pytest.mark.parametrize('status, errores, clase', [
+    (429, '', LIMITE_API),
+    (500, '', SERVIDOR),
+    (503, '', SERVIDOR),
+    (422, "Title can't be blank", VALIDACION),
+    (422, 'Image URL is invalid', IMAGEN),
+    (404, '', VALIDACION),
+])
+def test_clasificar_por_codigo(status, errores, clase):
+    assert clasificar_error(status=status, errores=errores) == clase
+
+
+@pytest.mark.parametrize('excepcion, clase', [
+    (_http_error(429), LIMITE_API),
+    (_http_error(502), SERVIDOR),
+    (requests.exceptions.ReadTimeout('read timed out'), TIMEOUT),
+    (requests.exceptions.ConnectionError('refused'), CONEXION),
+    (urllib.error.URLError(socket.timeout('timed out')), TIMEOUT),
+    (urllib.error.URLError(ConnectionResetError(104, 'Connection reset by peer')), CONEXION),
+    (urllib.error.URLError(requests.exceptions.ConnectTimeout('connect')), TIMEOUT),
+    (Exception('The read operation timed out'), TIMEOUT),
+    (Exception('Remote end closed connection without response'), CONEXION),
+    (ValueError('could not convert string to float'), DESCONOCIDO),
+])
+def test_clasificar_por_excepcion(excepcion, clase):
+    assert clasificar_error(excepcion=excepcion) == clase
+
+
+def test_clasificar_error_envuelto_por_pyactiveresource():
+    from pyactiveresource.connection import Error
+
+    assert clasificar_error(excepcion=Error(urllib.error.URLError(ConnectionResetError()))) == CONEXION
+
+
+def test_retry_after_de_headers_y_excepcion():
+    assert retry_after({'Retry-After': '2.5'}) == 2.5
+    assert retry_after({'retry-after': '-3'}) == 0.0
+    assert retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}) is None
+    assert retry_after({}) is None
+    excepcion = SimpleNamespace(response=SimpleNamespace(headers={'Retry-After': '4'}))
+    assert retry_after(excepcion=excepcion) == 4.0
+
+
+def test_describir_error_incluye_cuerpo():
+    excepcion = Exception('rechazado')
+    excepcion.response = SimpleNamespace(code=422, body=b'{"errors":{"title":["can\'t be blank"]}}')
+    assert describir_error(excepcion).startswith('HTTP 422: {"errors"')
+    assert describir_error(ValueError()) == 'ValueError'
+
+
+def test_validacion_no_se_reintenta():
+    politica = PoliticaReintentos(aleatorio=random.Random(1))
+    intentos = politica.iniciar()
+    assert intentos.siguiente(VALIDACION, detalle='422') is None
+    assert intentos.total == 0
+    assert intentos.ultimo_detalle == '422'
+    assert not intentos.transitoria
+    assert politica.stats['sin_reintento'] == 1
+
+
+def test_presupuesto_por_clase_con_espera_exponencial_acotada():
+    politica = PoliticaReintentos(presupuestos={SERVIDOR: (3, 1.0, 3.0)}, aleatorio=random.Random(1))
+    intentos = politica.iniciar()
+    esperas = [intentos.siguiente(SERVIDOR) for _ in range(4)]
+
+    assert esperas[3] is None
+    for espera, tope in zip(esperas, (1.0, 2.0, 3.0)):
+        # Jitter entre la mitad y el total de base * 2^n, sin pasar del máximo de la clase
+        assert tope / 2 <= espera <= tope
+    assert intentos.transitoria
+    assert politica.stats['reintentos'] == 3
+    assert politica.stats['errores'][SERVIDOR] == 4
+
+
+def test_tope_total_entre_clases():
+    politica = PoliticaReintentos(reintentos_totales=4, aleatorio=random.Random(1))
+    intentos = politica.iniciar()
+    for _ in range(3):
+        assert intentos.siguiente(SERVIDOR) is not None
+    assert intentos.siguiente(CONEXION) is not None
+    # CONEXION aún tiene presupuesto propio, pero la operación ya agotó el total
+    assert intentos.siguiente(CONEXION) is None
+
+
+def test_retry_after_manda_sobre_el_backoff():
+    politica = PoliticaReintentos(aleatorio=random.Random(1))
+    intentos = politica.iniciar()
+    _, base, _ = politica.presupuestos[LIMITE_API]
+    espera = intentos.siguiente(LIMITE_API, segundos_retry_after=7.0)
+    assert 7.0 + base / 2 <= espera <= 7.0 + base
+
+
+def test_pausa_global_acotada():
+    politica = PoliticaReintentos(aleatorio=random.Random(1))
+    assert 7.5 <= politica.pausa_global(3) <= 15.0
+    assert politica.pausa_global(100) <= 30.0
+
+
+@pytest.fixture
+def sin_esperas(importador, monkeypatch):
+    """Pausas globales registradas y reintentos sin dormir"""
+    pausas = []
+    pausa_global = importador.politica_reintentos.pausa_global
+
+    def registrar(errores):
+        pausas.append(errores)
+        return pausa_global(errores)
+
+    monkeypatch.setattr(importador.politica_reintentos, 'pausa_global', registrar)
+    monkeypatch.setattr(importador.rate_limiter, 'pausar', lambda segundos: None)
+    monkeypatch.setattr(csv_to_shopify.time, 'sleep', lambda segundos: None)
+    monkeypatch.setattr(importador, 'buscar_duplicado', lambda handle: None)
+    monkeypatch.setattr(shopify.Product, 'find', lambda **kwargs: [])
+    return pausas
+
+
+def _procesar(importador, cantidad):
+    for numero in range(1, cantidad + 1):
+        producto_data = {'Handle': f'producto-{numero}', 'Title': f'Producto {numero}',
+                         'Variant Inventory Qty': '3', 'Variant Price': '10'}
+        importador._procesar_producto(producto_data, numero, cantidad)
+
+
+def test_fallas_transitorias_pausan_por_la_politica(importador, sin_esperas, en_hilo, monkeypatch):
+    llamadas = []
+
+    def save(producto):
+        llamadas.append(producto.handle)
+        raise urllib.error.URLError(ConnectionResetError(104, 'Connection reset by peer'))
+
+    monkeypatch.setattr(shopify.Product, 'save', save)
+    en_hilo(lambda: _procesar(importador, 4))
+
+    # Cada producto agota el presupuesto de CONEXION; tras tres productos fallidos llega la pausa
+    assert llamadas.count('producto-1') == 1 + importador.politica_reintentos.presupuestos[CONEXION][0]
+    assert sin_esperas == [3]
+    assert importador.stats['productos_con_error'] == 4
+    assert importador.fallidos.resumen() == {CONEXION: 4}
+
+
+def test_errores_de_validacion_no_pausan(importador, sin_esperas, en_hilo, monkeypatch):
+    llamadas = []
+
+    def save(producto):
+        llamadas.append(producto.handle)
+        return False
+
+    monkeypatch.setattr(shopify.Product, 'save', save)
+    en_hilo(lambda: _procesar(importador, 4))
+
+    assert len(llamadas) == 4
+    assert sin_esperas == []
+    assert importador.stats['errores_consecutivos'] == 0
+    assert importador.fallidos.resumen() == {VALIDACION: 4}
+    assert importador.fallidos.pendientes() == []
+
+
+def test_error_critico_no_transitorio_no_cuenta_para_la_pausa(importador, sin_esperas, en_hilo, monkeypatch):
+    def crear(producto_data):
+        raise ValueError('could not convert string to float')
+
+    monkeypatch.setattr(importador, 'crear_producto_shopify_ultra_robusto', crear)
+    en_hilo(lambda: _procesar(importador, 4))
+
+    assert sin_esperas == []
+    assert importador.stats['errores_consecutivos'] == 0
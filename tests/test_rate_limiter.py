@@ -0,0 +1,124 @@
+"""Limitador de cubeta con fuga: esperas, headers de límite y Retry-After"""
+
+import threading
+
+import pytest
+
+import rate_limiter
+from rate_limiter import ShopifyRateLimiter
+
+
+class Reloj:
+    """Sustituto del módulo time: el tiempo solo avanza con sleep"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.dormido = []
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.dormido.append(segundos)
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(rate_limiter, 'time', reloj)
+    return reloj
+
+
+@pytest.fixture
+def limitador(reloj):
+    return ShopifyRateLimiter(capacidad=40, tasa_fuga=2.0, margen=2)
+
+
+def test_sin_espera_hasta_el_margen(limitador):
+    assert [limitador.reservar() for _ in range(38)] == [0.0] * 38
+    # La llamada 39 ya entraría en el margen: espera lo que tarda en drenarse una llamada
+    assert limitador.reservar() == pytest.approx(0.5)
+    assert limitador.reservar() == pytest.approx(1.0)
+    assert limitador.stats['peticiones'] == 40
+    assert limitador.stats['esperas'] == 2
+    assert limitador.stats['tiempo_espera'] == pytest.approx(1.5)
+
+
+def test_la_cubeta_se_drena_con_el_tiempo(limitador, reloj):
+    for _ in range(38):
+        limitador.reservar()
+    reloj.ahora += 5
+    assert [limitador.reservar() for _ in range(10)] == [0.0] * 10
+    assert limitador.reservar() > 0
+
+
+def test_esperar_turno_duerme_lo_reservado(limitador, reloj):
+    for _ in range(40):
+        limitador.esperar_turno()
+    assert reloj.dormido == pytest.approx([0.5, 0.5])
+
+
+def test_header_de_limite_ajusta_nivel_y_capacidad(limitador):
+    # Otra app de la tienda ya consumió casi toda la cubeta
+    limitador.registrar_respuesta({'X-Shopify-Shop-Api-Call-Limit': '38/40'}, 200)
+    assert limitador.reservar() == pytest.approx(0.5)
+
+    plus = ShopifyRateLimiter(capacidad=40, tasa_fuga=20.0)
+    plus.registrar_respuesta({'x-shopify-shop-api-call-limit': '1/80'}, 200)
+    assert plus.capacidad == 80
+    assert [plus.reservar() for _ in range(76)] == [0.0] * 76
+
+
+def test_header_de_limite_no_baja_el_nivel_local(limitador):
+    for _ in range(38):
+        limitador.reservar()
+    limitador.registrar_respuesta({'X-Shopify-Shop-Api-Call-Limit': '3/40'}, 200)
+    assert limitador.reservar() > 0
+
+
+def test_header_invalido_se_ignora(limitador):
+    limitador.registrar_respuesta({'X-Shopify-Shop-Api-Call-Limit': 'n/a'}, 200)
+    limitador.registrar_respuesta(None)
+    assert limitador.capacidad == 40
+    assert limitador.reservar() == 0.0
+
+
+@pytest.mark.parametrize('headers, esperado', [
+    ({'Retry-After': '4'}, 4.0),
+    ({'Retry-After': '2.5'}, 2.5),
+    ({'Retry-After': 'pronto'}, 1.0),
+    ({}, 1.0),
+])
+def test_429_bloquea_lo_que_indica_retry_after(limitador, headers, esperado):
+    limitador.registrar_respuesta(headers, 429)
+
+    assert limitador.stats['respuestas_429'] == 1
+    # La cubeta queda llena: tras el bloqueo hay que esperar además a que drene
+    assert limitador.reservar() == pytest.approx(max(esperado, 1.5))
+
+
+def test_retry_after_sin_429_tambien_bloquea(limitador):
+    limitador.registrar_respuesta({'Retry-After': '10'}, 200)
+
+    assert limitador.stats['respuestas_429'] == 0
+    assert limitador.reservar() == pytest.approx(10.0)
+
+
+def test_pausar_bloquea_todas_las_peticiones(limitador, reloj):
+    limitador.pausar(30)
+    limitador.pausar(5)
+    assert limitador.reservar() == pytest.approx(30.0)
+    reloj.ahora += 30
+    assert limitador.reservar() == 0.0
+
+
+def test_reservas_concurrentes_no_se_pierden(limitador):
+    hilos = [threading.Thread(target=lambda: [limitador.reservar() for _ in range(50)]) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert limitador.stats['peticiones'] == 400
+    assert limitador.stats['esperas'] == 400 - 38
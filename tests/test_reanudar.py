@@ -0,0 +1,80 @@
+"""--resume: saltar lo terminado y completar el inventario de lo ya creado"""
+
+from types import SimpleNamespace
+
+import pytest
+
+
+def _fila(handle, stock='4'):
+    return {'Handle': handle, 'Title': handle, 'Variant Inventory Qty': stock}
+
+
+@pytest.fixture
+def corrida(importador, monkeypatch):
+    """Corrida interrumpida con productos en cada estado del journal"""
+    importador.journal.iniciar_corrida('ProductosHora.csv')
+    importador._registrar_en_journal('completo', 'completado')
+    importador._registrar_en_journal('duplicado', 'duplicado')
+    importador._registrar_en_journal('con-id', 'creado', {'id': 1, 'variants': [{'id': 10, 'inventory_item_id': 11}]})
+    importador._registrar_en_journal('en-espejo', 'creado', {'id': 2, 'variants': []})
+    importador._registrar_en_journal('por-api', 'creado', {'id': 3})
+    importador._registrar_en_journal('fallido', 'error', detalle='servidor')
+    importador.catalogo.registrar_producto({'handle': 'en-espejo', 'id': 2,
+                                            'variants': [{'id': 20, 'inventory_item_id': 22}]})
+
+    peticiones = []
+
+    def peticion(metodo, url, **kwargs):
+        peticiones.append((metodo, url))
+        return SimpleNamespace(status_code=200, json=lambda: {'product': {'variants': [{'inventory_item_id': 33}]}})
+
+    enviadas = []
+
+    def fijar_inventario(cantidades):
+        enviadas.extend(cantidades)
+        return []
+
+    monkeypatch.setattr(importador, '_peticion_shopify', peticion)
+    monkeypatch.setattr(importador.graphql, 'fijar_inventario', fijar_inventario)
+    importador.journal.reanudar_corrida()
+    return SimpleNamespace(importador=importador, peticiones=peticiones, enviadas=enviadas)
+
+
+def _csv():
+    return [_fila(handle) for handle in ('completo', 'duplicado', 'con-id', 'en-espejo', 'por-api', 'fallido', 'nuevo')]
+
+
+def test_creados_completan_inventario_sin_reenviarse(corrida):
+    corrida.importador.location_id = 7
+    pendientes = corrida.importador.omitir_completados(_csv())
+
+    assert [p['Handle'] for p in pendientes] == ['fallido', 'nuevo']
+    assert [e['inventoryItemId'] for e in corrida.enviadas] == [
+        'gid://shopify/InventoryItem/11', 'gid://shopify/InventoryItem/22', 'gid://shopify/InventoryItem/33'
+    ]
+    assert {e['locationId'] for e in corrida.enviadas} == {'gid://shopify/Location/7'}
+    # Solo el que no tenía ID en el journal ni en el espejo fue a la API
+    assert corrida.peticiones == [('GET', f"{corrida.importador.api_url}/products/3.json")]
+
+    estados = corrida.importador.journal.estados()
+    assert {h: estados[h]['estado'] for h in ('con-id', 'en-espejo', 'por-api')} == dict.fromkeys(
+        ('con-id', 'en-espejo', 'por-api'), 'completado')
+
+
+def test_sin_ubicacion_quedan_creados(corrida):
+    corrida.importador.location_id = None
+    pendientes = corrida.importador.omitir_completados(_csv())
+
+    assert [p['Handle'] for p in pendientes] == ['fallido', 'nuevo']
+    assert corrida.enviadas == []
+    assert corrida.peticiones == []
+    estados = corrida.importador.journal.estados()
+    assert all(estados[h]['estado'] == 'creado' for h in ('con-id', 'en-espejo', 'por-api'))
+
+
+def test_inventario_rechazado_no_marca_completado(corrida, monkeypatch):
+    corrida.importador.location_id = 7
+    monkeypatch.setattr(corrida.importador.graphql, 'fijar_inventario', lambda cantidades: ['ubicación inválida'])
+    corrida.importador.omitir_completados(_csv())
+
+    assert corrida.importador.journal.estados()['con-id']['estado'] == 'creado'
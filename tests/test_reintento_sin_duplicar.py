@@ -0,0 +1,124 @@
+"""Reintentos tras un timeout: el POST anterior pudo crear el producto aunque el espejo no lo tenga"""
+
+import asyncio
+import socket
+
+import pytest
+import shopify
+
+import csv_to_shopify
+from shopify_async import SyscomShopifyImporterAsync
+
+PRODUCTO = {'Handle': 'camara-ip', 'Title': 'Cámara IP', 'Variant SKU': 'CAM-1',
+            'Variant Price': '100', 'Variant Inventory Qty': '3'}
+
+
+def _sincronizar(importador, productos=()):
+    """Espejo local sincronizado sin llamar a la API"""
+    importador.catalogo.registrar_productos(productos)
+    with importador.catalogo.conn:
+        importador.catalogo.conn.execute(
+            "INSERT OR REPLACE INTO metadatos (clave, valor) VALUES ('sincronizado_en', 'prueba')")
+    assert importador.catalogo.sincronizado
+
+
+def _producto_shopify(handle):
+    producto = shopify.Product()
+    producto.id = 1001
+    producto.handle = handle
+    variante = shopify.Variant()
+    variante.id = 2001
+    variante.inventory_item_id = 3001
+    variante.price = '100.00'
+    producto.variants = [variante]
+    return producto
+
+
+@pytest.fixture
+def tienda(importador, monkeypatch):
+    """Shopify simulado donde el primer POST crea el producto y la respuesta nunca llega"""
+    _sincronizar(importador, [{'id': 1, 'handle': 'otro', 'variants': []}])
+    importador.journal.iniciar_corrida()
+    monkeypatch.setattr(csv_to_shopify.time, 'sleep', lambda segundos: None)
+    monkeypatch.setattr(importador, 'actualizar_inventario_producto', lambda producto, cantidad: True)
+    creados = {}
+    posts = []
+
+    def save(producto):
+        posts.append(producto.handle)
+        if producto.handle in creados:
+            # Shopify no repite handles: el segundo producto quedaría como camara-ip-1
+            creados[f"{producto.handle}-1"] = producto
+            return True
+        creados[producto.handle] = _producto_shopify(producto.handle)
+        raise socket.timeout('The read operation timed out')
+
+    def find(handle=None, **kwargs):
+        return [creados[handle]] if handle in creados else []
+
+    monkeypatch.setattr(shopify.Product, 'save', save)
+    monkeypatch.setattr(shopify.Product, 'find', find)
+    importador.posts = posts
+    importador.creados = creados
+    return importador
+
+
+def test_timeout_despues_de_crear_no_duplica(tienda):
+    producto = tienda.crear_producto_shopify_ultra_robusto(dict(PRODUCTO))
+
+    assert producto is tienda.creados['camara-ip']
+    assert tienda.posts == ['camara-ip']
+    assert list(tienda.creados) == ['camara-ip']
+    assert tienda.stats['productos_creados'] == 1
+    assert tienda.stats['productos_duplicados'] == 0
+    assert tienda.stats['productos_con_error'] == 0
+
+    # Queda en el espejo para las siguientes verificaciones de duplicado
+    assert tienda.catalogo.buscar('camara-ip')['inventory_item_ids'] == [3001]
+    assert tienda.journal.estados()['camara-ip']['estado'] == 'completado'
+
+
+def test_sin_producto_en_shopify_se_reenvia(tienda, monkeypatch):
+    monkeypatch.setattr(shopify.Product, 'find', lambda **kwargs: [])
+    tienda.crear_producto_shopify_ultra_robusto(dict(PRODUCTO))
+
+    assert tienda.posts == ['camara-ip', 'camara-ip']
+
+
+@pytest.fixture
+def tienda_async(fabrica_importador, monkeypatch):
+    importador = fabrica_importador(SyscomShopifyImporterAsync)
+    _sincronizar(importador)
+    creados = {}
+    peticiones = []
+
+    async def peticion(session, metodo, ruta, **kwargs):
+        peticiones.append((metodo, ruta, kwargs.get('params', {}).get('handle')))
+        if metodo == 'GET':
+            handle = kwargs['params']['handle']
+            return 200, {'products': [creados[handle]] if handle in creados else []}
+        handle = kwargs['json']['product']['handle']
+        creados[handle] = {'id': 1001, 'handle': handle,
+                           'variants': [{'id': 2001, 'inventory_item_id': 3001, 'price': '100.00'}]}
+        raise asyncio.TimeoutError()
+
+    async def fijar_inventario(session, producto, cantidad):
+        return True
+
+    async def sin_espera(segundos):
+        pass
+
+    monkeypatch.setattr(importador, '_peticion', peticion)
+    monkeypatch.setattr(importador, 'actualizar_inventario_async', fijar_inventario)
+    monkeypatch.setattr('shopify_async.asyncio.sleep', sin_espera)
+    importador.peticiones = peticiones
+    return importador
+
+
+def test_timeout_despues_de_crear_no_duplica_async(tienda_async):
+    producto = asyncio.run(tienda_async.crear_producto_async(None, dict(PRODUCTO)))
+
+    assert producto['id'] == 1001
+    assert tienda_async.peticiones == [('POST', 'products.json', None), ('GET', 'products.json', 'camara-ip')]
+    assert tienda_async.stats['productos_creados'] == 1
+    assert tienda_async.catalogo.buscar('camara-ip')['product_id'] == 1001
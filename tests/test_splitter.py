@@ -0,0 +1,130 @@
+"""Divisor de CSV: partes por tamaño sin separar handles, en un proceso y con --jobs"""
+
+import csv
+import os
+
+import pytest
+
+from csv_splitter_shopify import (CAMPOS_PRIORITARIOS, ESQUEMA_SHOPIFY, CSVSplitterShopify, EscritorPartes,
+                                  iterar_grupos_por_handle)
+
+BYTES_MAXIMO = 24 * 1024
+
+
+def _catalogo(total=400):
+    """Productos en formato Shopify con mojibake, espacios de sobra y handles de varias filas"""
+    filas = []
+    for numero in range(total):
+        handle = f'producto-{numero:04d}'
+        filas.append({
+            'Handle': handle,
+            'Title': f'CÃ¡mara   IP  {numero}, "exterior"',
+            'Body (HTML)': '<p>VisiÃ³n   nocturna\n\n  con   IR</p>' * (1 + numero % 5),
+            'Vendor': '  HIKVISION ',
+            'Variant SKU': f'SKU-{numero}',
+            'Variant Price': f'{100 + numero}.00',
+            'Variant Inventory Qty': str(numero % 9 + 1),
+            'Image Src': f'https://img.example.com/{numero}.jpg',
+        })
+        # Algunos productos traen imágenes extra en filas que solo llevan Handle e imagen
+        for extra in range(numero % 7 == 0 and 2 or 0):
+            filas.append({'Handle': handle, 'Image Src': f'https://img.example.com/{numero}-{extra}.jpg'})
+    return filas
+
+
+def _dividir(directorio, monkeypatch, jobs=1, **entorno):
+    os.makedirs(directorio)
+    monkeypatch.chdir(directorio)
+    monkeypatch.setenv('SPLIT_MAX_BYTES', str(BYTES_MAXIMO))
+    for variable, valor in entorno.items():
+        monkeypatch.setenv(variable, str(valor))
+    return CSVSplitterShopify(jobs=jobs).dividir_csv_en_streaming(iter(_catalogo()))
+
+
+def _leer(archivo):
+    with open(archivo, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_jobs_corta_las_partes_igual_que_el_modo_secuencial(tmp_path, monkeypatch):
+    secuencial = _dividir(tmp_path / 'secuencial', monkeypatch)
+    paralelo = _dividir(tmp_path / 'paralelo', monkeypatch, jobs=2)
+
+    assert len(secuencial) > 3
+    assert [os.path.basename(a) for a in paralelo] == [os.path.basename(a) for a in secuencial]
+    for archivo_secuencial, archivo_paralelo in zip(secuencial, paralelo):
+        with open(archivo_secuencial, 'rb') as a, open(archivo_paralelo, 'rb') as b:
+            assert a.read() == b.read()
+
+
+def test_partes_llenas_con_texto_normalizado(tmp_path, monkeypatch):
+    archivos = _dividir(tmp_path / 'paralelo', monkeypatch, jobs=2)
+
+    tamanos = [os.path.getsize(archivo) for archivo in archivos]
+    assert max(tamanos) <= BYTES_MAXIMO
+    # Solo la última parte puede quedar a medias
+    assert min(tamanos[:-1]) > BYTES_MAXIMO * 0.9
+    primera = _leer(archivos[0])[0]
+    assert primera['Title'] == 'Cámara IP 0, "exterior"'
+    assert primera['Vendor'] == 'HIKVISION'
+
+
+def test_encabezado_fijo_en_todas_las_partes(tmp_path, monkeypatch):
+    archivos = _dividir(tmp_path / 'secuencial', monkeypatch)
+
+    assert ESQUEMA_SHOPIFY[:len(CAMPOS_PRIORITARIOS)] == CAMPOS_PRIORITARIOS
+    assert len(set(ESQUEMA_SHOPIFY)) == len(ESQUEMA_SHOPIFY)
+    for archivo in archivos:
+        with open(archivo, encoding='utf-8', newline='') as f:
+            assert next(csv.reader(f)) == ESQUEMA_SHOPIFY
+
+
+def test_filas_extra_solo_llevan_lo_que_traen(tmp_path, monkeypatch):
+    filas = _leer(_dividir(tmp_path / 'secuencial', monkeypatch)[0])
+
+    principal, extra = filas[0], filas[1]
+    assert extra['Handle'] == principal['Handle'] == 'producto-0000'
+    assert extra['Image Src'] == 'https://img.example.com/0-0.jpg'
+    assert principal['Status'] == 'active'
+    assert {campo for campo, valor in extra.items() if valor} == {'Handle', 'Image Src'}
+
+
+def test_agrupar_filas_consecutivas_por_handle():
+    filas = [{'Handle': 'a'}, {'Handle': 'a'}, {'Handle': 'b'}, {'Handle': 'a'}, {}]
+
+    grupos = [[fila.get('Handle') for fila in grupo] for grupo in iterar_grupos_por_handle(iter(filas))]
+    assert grupos == [['a', 'a'], ['b'], ['a'], [None]]
+    assert list(iterar_grupos_por_handle([])) == []
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_ningun_handle_queda_partido_entre_partes(tmp_path, monkeypatch, jobs):
+    archivos = _dividir(tmp_path / 'salida', monkeypatch, jobs=jobs)
+
+    vistos = {}
+    for numero, archivo in enumerate(archivos):
+        assert os.path.getsize(archivo) <= BYTES_MAXIMO
+        for fila in _leer(archivo):
+            assert vistos.setdefault(fila['Handle'], numero) == numero
+    assert len(vistos) == 400
+
+
+def test_tope_de_filas_por_parte(tmp_path, monkeypatch):
+    archivos = _dividir(tmp_path / 'salida', monkeypatch, SPLIT_MAX_LINES=50)
+
+    filas_por_parte = [len(_leer(archivo)) for archivo in archivos]
+    assert max(filas_por_parte) <= 50
+    assert sum(filas_por_parte) == len(_catalogo())
+    # Corta antes de un grupo que no cabe completo: ninguna parte queda lejos del tope
+    assert min(filas_por_parte[:-1]) >= 48
+
+
+def test_producto_mas_grande_que_el_maximo_va_solo(tmp_path):
+    escritor = EscritorPartes(str(tmp_path), 'parte', bytes_maximo=500)
+    escritor.agregar_grupo([{'Handle': 'chico', 'Title': 'Chico'}])
+    escritor.agregar_grupo([{'Handle': 'enorme', 'Body (HTML)': 'x' * 1000}])
+    escritor.agregar_grupo([{'Handle': 'chico-2', 'Title': 'Chico 2'}])
+    partes = escritor.cerrar()
+
+    assert [filas for _, filas, _ in partes] == [1, 1, 1]
+    assert [tamano for _, _, tamano in partes] == [os.path.getsize(ruta) for ruta, _, _ in partes]
@@ -0,0 +1,44 @@
+"""Verificador de CSV: conteos fila por fila leyendo solo las columnas de stock"""
+
+import csv
+
+import pytest
+
+import verificar_csv
+
+
+@pytest.fixture
+def lecturas(monkeypatch):
+    """Registrar las columnas pedidas a LectorCatalogo y cuántas filas entregó"""
+    registradas = []
+    original = verificar_csv.LectorCatalogo
+
+    def lector(*args, **kwargs):
+        lectura = {'columnas': kwargs.get('columnas'), 'filas': 0}
+        registradas.append(lectura)
+        for fila in original(*args, **kwargs):
+            lectura['filas'] += 1
+            lectura['claves'] = sorted(fila)
+            yield fila
+
+    monkeypatch.setattr(verificar_csv, 'LectorCatalogo', lector)
+    return registradas
+
+
+def test_cuenta_stock_con_columnas_proyectadas(tmp_path, monkeypatch, capsys, lecturas):
+    monkeypatch.chdir(tmp_path)
+    with open('ProductosHora.csv', 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Handle', 'Title', 'Body (HTML)', 'Variant Inventory Qty'])
+        for numero in range(30):
+            writer.writerow([f'producto-{numero}', f'Producto {numero}', '<p>' + 'x' * 200 + '</p>',
+                             ['0', '3', 'abc'][numero % 3]])
+
+    assert verificar_csv.verificar_archivo_csv('ProductosHora.csv') is True
+
+    salida = capsys.readouterr().out
+    assert '📦 Total productos: 30' in salida
+    assert '📊 Productos con stock > 0: 10' in salida
+    assert '📊 Productos sin stock: 20' in salida
+    assert 'Handle: producto-0' in salida
+    assert lecturas == [{'columnas': ['Variant Inventory Qty'], 'filas': 30, 'claves': ['Variant Inventory Qty']}]
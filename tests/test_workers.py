@@ -0,0 +1,81 @@
+"""Modo --workers: estadísticas compartidas y pausa global por errores consecutivos"""
+
+import time
+
+import pytest
+
+import csv_to_shopify
+
+
+def _producto(numero):
+    return {'Handle': f'producto-{numero}', 'Title': f'Producto {numero}', 'Variant Inventory Qty': '5'}
+
+
+@pytest.fixture
+def pausas(importador, monkeypatch):
+    """Registrar las pausas globales en lugar de dormir"""
+    registradas = []
+    monkeypatch.setattr(importador.rate_limiter, 'pausar', registradas.append)
+    monkeypatch.setattr(csv_to_shopify.time, 'sleep', lambda segundos: None)
+    return registradas
+
+
+def test_pausa_tras_errores_transitorios_consecutivos(importador, pausas, en_hilo, monkeypatch):
+    def falla_de_red(producto_data):
+        raise ConnectionError('Connection reset by peer')
+
+    monkeypatch.setattr(importador, 'crear_producto_shopify_ultra_robusto', falla_de_red)
+
+    def procesar():
+        for numero in range(1, 5):
+            importador._procesar_producto(_producto(numero), numero, 4)
+
+    en_hilo(procesar)
+
+    # Tres fallas seguidas disparan la pausa antes del cuarto producto, que vuelve a contar desde cero
+    assert len(pausas) == 1
+    assert importador.stats['errores_consecutivos'] == 1
+    assert importador.stats['productos_con_error'] == 4
+    assert importador.fallidos.total() == 4
+
+
+def test_exito_reinicia_errores_consecutivos(importador, pausas, en_hilo, monkeypatch):
+    resultados = iter([ConnectionError('reset'), ConnectionError('reset'), object(), ConnectionError('reset')])
+
+    def crear(producto_data):
+        resultado = next(resultados)
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+
+    monkeypatch.setattr(importador, 'crear_producto_shopify_ultra_robusto', crear)
+
+    def procesar():
+        for numero in range(1, 5):
+            importador._procesar_producto(_producto(numero), numero, 4)
+
+    en_hilo(procesar)
+
+    assert pausas == []
+    assert importador.stats['errores_consecutivos'] == 1
+
+
+def test_estadisticas_exactas_con_workers(importador, pausas, en_hilo, monkeypatch):
+    total = 300
+
+    def crear(producto_data):
+        time.sleep(0)  # ceder el GIL entre hilos
+        numero = int(producto_data['Handle'].rsplit('-', 1)[1])
+        if numero % 3 == 0:
+            raise ConnectionError('Connection reset by peer')
+        importador._sumar_stat('productos_creados')
+        return object()
+
+    monkeypatch.setattr(importador, 'crear_producto_shopify_ultra_robusto', crear)
+
+    productos = [_producto(numero) for numero in range(1, total + 1)]
+    en_hilo(lambda: importador._procesar_productos(productos, workers=8, total=total), timeout=30)
+
+    assert importador.stats['productos_procesados'] == total
+    assert importador.stats['productos_creados'] == total - total // 3
+    assert importador.stats['productos_con_error'] == total // 3
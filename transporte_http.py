@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Transporte HTTP compartido por todas las llamadas a Shopify
+Una sola requests.Session con pool de conexiones keep-alive, reintentos en el adaptador
+y timeouts separados de conexión y lectura. La librería shopify (pyactiveresource) abre
+una conexión urllib nueva en cada llamada; instalar_en_shopify la hace pasar por la sesión.
+"""
+
+import logging
+import os
+import threading
+import urllib.error
+import urllib.response
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Conexiones abiertas que se conservan por host; con más hilos que esto se abren y descartan conexiones
+TAMANO_POOL = int(os.getenv('HTTP_POOL_SIZE', 10))
+TIMEOUT_CONEXION = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+TIMEOUT_LECTURA = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+
+# Solo se reintentan en el adaptador los errores de conexión y las respuestas de gateway de
+# métodos idempotentes: un POST que se reenvía puede crear el producto dos veces
+ESTADOS_REINTENTABLES = (502, 503, 504)
+
+
+class TransporteHTTP:
+    def __init__(self, tamano_pool: int = TAMANO_POOL, timeout_conexion: float = TIMEOUT_CONEXION,
+                 timeout_lectura: float = TIMEOUT_LECTURA, reintentos: int = 3, backoff: float = 0.5,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        Inicializar el transporte
+
+        Args:
+            tamano_pool: Conexiones keep-alive por host (conviene >= hilos de trabajo)
+            timeout_conexion: Segundos para establecer la conexión
+            timeout_lectura: Segundos máximos entre bytes de la respuesta
+            reintentos: Reintentos del adaptador ante errores de conexión y 502/503/504
+            backoff: Factor de espera exponencial entre esos reintentos
+            headers: Headers por defecto de la sesión
+        """
+        self.timeout: Tuple[float, float] = (timeout_conexion, timeout_lectura)
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.tamano_pool = 0
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        # Contadores de pools ya cerrados (los vigentes se leen directo de urllib3)
+        self._lock = threading.Lock()
+        self._conexiones_cerradas = 0
+        self._peticiones_cerradas = 0
+        self._adaptador: Optional[HTTPAdapter] = None
+        self.redimensionar(tamano_pool)
+
+    def _crear_adaptador(self, tamano_pool: int) -> HTTPAdapter:
+        reintentos = Retry(
+            total=self.reintentos,
+            connect=self.reintentos,
+            read=0,
+            status=self.reintentos,
+            status_forcelist=ESTADOS_REINTENTABLES,
+            backoff_factor=self.backoff,
+            raise_on_status=False
+        )
+        adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool, max_retries=reintentos)
+        pools = adaptador.poolmanager.pools
+        cerrar_pool = pools.dispose_func
+
+        def al_descartar_pool(pool):
+            self._acumular(pool)
+            if cerrar_pool:
+                cerrar_pool(pool)
+
+        pools.dispose_func = al_descartar_pool
+        return adaptador
+
+    def _acumular(self, pool):
+        with self._lock:
+            self._conexiones_cerradas += getattr(pool, 'num_connections', 0)
+            self._peticiones_cerradas += getattr(pool, 'num_requests', 0)
+
+    def redimensionar(self, tamano_pool: int):
+        """Montar un adaptador con el pool indicado (antes de arrancar los hilos de trabajo)"""
+        tamano_pool = max(1, tamano_pool)
+        if tamano_pool == self.tamano_pool:
+            return
+        anterior = self._adaptador
+        self._adaptador = self._crear_adaptador(tamano_pool)
+        self.session.mount('https://', self._adaptador)
+        self.session.mount('http://', self._adaptador)
+        self.tamano_pool = tamano_pool
+        if anterior is not None:
+            # clear() pasa cada pool por al_descartar_pool
+            anterior.close()
+
+    def request(self, metodo: str, url: str, **kwargs) -> requests.Response:
+        """Petición por la sesión compartida con los timeouts de conexión y lectura por defecto"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(metodo, url, **kwargs)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Peticiones enviadas, conexiones abiertas y cuántas peticiones reutilizaron una conexión"""
+        conexiones, peticiones = self._conexiones_cerradas, self._peticiones_cerradas
+        pools = self._adaptador.poolmanager.pools
+        for clave in pools.keys():
+            pool = pools.get(clave)
+            if pool is not None:
+                conexiones += pool.num_connections
+                peticiones += pool.num_requests
+        return {
+            'peticiones': peticiones,
+            'conexiones_nuevas': conexiones,
+            'conexiones_reutilizadas': max(0, peticiones - conexiones)
+        }
+
+    def _urlopen(self, conexion, request) -> urllib.response.addinfourl:
+        """Reemplazo de Connection._urlopen: misma interfaz que urllib.request.urlopen"""
+        headers = dict(request.header_items())
+        if not any(clave.lower() == 'accept' for clave in headers):
+            headers['Accept'] = conexion.format.mime_type
+        try:
+            response = self.request(request.get_method(), request.full_url, headers=headers, data=request.data)
+        except requests.exceptions.RequestException as e:
+            # pyactiveresource convierte URLError en su propio Error
+            raise urllib.error.URLError(e)
+
+        cuerpo = BytesIO(response.content)
+        if not 200 <= response.status_code < 300:
+            # Igual que urllib: cualquier código fuera de 2xx llega como HTTPError
+            raise urllib.error.HTTPError(response.url, response.status_code, response.reason,
+                                         response.headers, cuerpo)
+        respuesta = urllib.response.addinfourl(cuerpo, response.headers, response.url, response.status_code)
+        respuesta.msg = response.reason
+        return respuesta
+
+    def instalar_en_shopify(self):
+        """Hacer que todas las llamadas de la librería shopify usen este transporte"""
+        import shopify.base
+
+        transporte = self
+
+        def _urlopen_compartido(self, request):
+            return transporte._urlopen(self, request)
+
+        shopify.base.ShopifyConnection._urlopen = _urlopen_compartido
+        logging.debug(f"Transporte HTTP compartido instalado (pool de {self.tamano_pool} conexiones)")
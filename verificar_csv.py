@@ -8,6 +8,7 @@ import os
 import csv
 import logging
 from datetime import datetime
+from lector_csv import LectorCatalogo, detectar_encoding
 
 def verificar_archivo_csv(archivo_csv: str):
     """Verificar y diagnosticar archivo CSV"""
@@ -28,118 +29,118 @@ def verificar_archivo_csv(archivo_csv: str):
     except Exception as e:
         print(f"⚠️ Error obteniendo info del archivo: {e}")
     
-    # Verificar contenido
-    encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+    # Verificar contenido: el encoding se detecta en una sola pasada sobre los bytes
+    encoding = detectar_encoding(archivo_csv)
+    if not encoding:
+        print("❌ NO SE PUDO LEER EL ARCHIVO CON NINGÚN ENCODING")
+        return False
     
-    for encoding in encodings:
-        try:
-            print(f"\n📋 Probando encoding: {encoding}")
+    try:
+        print(f"\n📋 Encoding detectado: {encoding}")
+        
+        with open(archivo_csv, 'r', encoding=encoding, newline='') as f:
+            # Leer primeras líneas para diagnóstico
+            primeras_lineas = []
+            for i, linea in enumerate(f):
+                primeras_lineas.append(linea.strip())
+                if i >= 5:  # Solo primeras 5 líneas
+                    break
+            
+            # Mostrar contenido inicial
+            print(f"📄 Primeras líneas:")
+            for i, linea in enumerate(primeras_lineas):
+                print(f"   {i+1}: {linea[:100]}{'...' if len(linea) > 100 else ''}")
+            
+            # Verificar si es HTML
+            primer_contenido = '\n'.join(primeras_lineas)
+            if (primer_contenido.startswith('<!DOCTYPE html>') or 
+                primer_contenido.startswith('<html') or
+                '<html' in primer_contenido):
+                print("❌ EL ARCHIVO CONTIENE HTML, NO CSV")
+                print("💡 Esto indica restricción del servidor (1 descarga/hora)")
+                return False
+            
+            # Resetear archivo y analizar como CSV
+            f.seek(0)
+            
+            # Detectar delimitador
+            sample = f.read(1024)
+            f.seek(0)
+            
+            delimiter = ','
+            if sample.count(';') > sample.count(','):
+                delimiter = ';'
+            elif sample.count('\t') > sample.count(','):
+                delimiter = '\t'
             
-            with open(archivo_csv, 'r', encoding=encoding, newline='') as f:
-                # Leer primeras líneas para diagnóstico
-                primeras_lineas = []
-                for i, linea in enumerate(f):
-                    primeras_lineas.append(linea.strip())
-                    if i >= 5:  # Solo primeras 5 líneas
-                        break
+            print(f"🔧 Delimitador detectado: '{delimiter}'")
+            
+            # Leer como CSV
+            reader = csv.DictReader(f, delimiter=delimiter)
+            
+            if reader.fieldnames:
+                columnas = list(reader.fieldnames)
+                print(f"📊 Columnas encontradas ({len(columnas)}):")
+                for i, col in enumerate(columnas):
+                    print(f"   {i+1:2d}. {col}")
                 
-                # Mostrar contenido inicial
-                print(f"📄 Primeras líneas:")
-                for i, linea in enumerate(primeras_lineas):
-                    print(f"   {i+1}: {linea[:100]}{'...' if len(linea) > 100 else ''}")
+                # Verificar tipo de formato
+                campos_shopify = ['Handle', 'Title', 'Variant Price', 'Variant Inventory Qty']
+                campos_alternativos = ['Codigo', 'Nombre', 'Precio', 'Stock', 'Descripcion', 'SKU']
                 
-                # Verificar si es HTML
-                primer_contenido = '\n'.join(primeras_lineas)
-                if (primer_contenido.startswith('<!DOCTYPE html>') or 
-                    primer_contenido.startswith('<html') or
-                    '<html' in primer_contenido):
-                    print("❌ EL ARCHIVO CONTIENE HTML, NO CSV")
-                    print("💡 Esto indica restricción del servidor (1 descarga/hora)")
-                    continue
+                es_shopify = any(campo in columnas for campo in campos_shopify)
+                es_convertible = any(campo in columnas for campo in campos_alternativos)
                 
-                # Resetear archivo y analizar como CSV
-                f.seek(0)
+                if es_shopify:
+                    print("✅ FORMATO SHOPIFY DETECTADO")
+                elif es_convertible:
+                    print("🔄 FORMATO CONVERTIBLE A SHOPIFY")
+                    print("📋 Campos reconocidos:")
+                    for campo in campos_alternativos:
+                        if campo in columnas:
+                            print(f"   ✓ {campo}")
+                else:
+                    print("❌ FORMATO NO RECONOCIDO")
+                    print("💡 Campos necesarios: Codigo/SKU, Nombre/Title, Precio/Price, Stock/Inventory")
                 
-                # Detectar delimitador
-                sample = f.read(1024)
-                f.seek(0)
+                # El ejemplo sale de la primera fila del lector ya abierto, con todas sus columnas
+                primer_producto = next(reader, None)
+                if primer_producto is not None:
+                    print(f"\n📋 Ejemplo de producto (primero):")
+                    for campo, valor in primer_producto.items():
+                        valor_mostrar = str(valor)[:50] + '...' if len(str(valor)) > 50 else str(valor)
+                        print(f"   {campo}: {valor_mostrar}")
                 
-                delimiter = ','
-                if sample.count(';') > sample.count(','):
-                    delimiter = ';'
-                elif sample.count('\t') > sample.count(','):
-                    delimiter = '\t'
+                # Contar productos y stock fila por fila, leyendo solo las columnas de stock
+                stock_campos = ['Variant Inventory Qty', 'Inventory Qty', 'Stock', 'Quantity', 'Available']
+                campos_leidos = [campo for campo in stock_campos if campo in columnas] or columnas[:1]
+                total_productos = 0
+                productos_con_stock = 0
+                for producto in LectorCatalogo(archivo_csv, encoding, delimiter, columnas=campos_leidos):
+                    total_productos += 1
+                    for campo_stock in stock_campos:
+                        if campo_stock in producto:
+                            try:
+                                stock = float(producto[campo_stock])
+                                if stock > 0:
+                                    productos_con_stock += 1
+                                    break
+                            except:
+                                pass
                 
-                print(f"🔧 Delimitador detectado: '{delimiter}'")
+                print(f"📦 Total productos: {total_productos}")
+                if total_productos > 0:
+                    print(f"📊 Productos con stock > 0: {productos_con_stock}")
+                    print(f"📊 Productos sin stock: {total_productos - productos_con_stock}")
                 
-                # Leer como CSV
-                reader = csv.DictReader(f, delimiter=delimiter)
+                print(f"✅ ARCHIVO VÁLIDO CON {encoding}")
+                return True
+            else:
+                print(f"❌ No se pudieron detectar columnas con {encoding}")
                 
-                if reader.fieldnames:
-                    columnas = list(reader.fieldnames)
-                    print(f"📊 Columnas encontradas ({len(columnas)}):")
-                    for i, col in enumerate(columnas):
-                        print(f"   {i+1:2d}. {col}")
-                    
-                    # Verificar tipo de formato
-                    campos_shopify = ['Handle', 'Title', 'Variant Price', 'Variant Inventory Qty']
-                    campos_alternativos = ['Codigo', 'Nombre', 'Precio', 'Stock', 'Descripcion', 'SKU']
-                    
-                    es_shopify = any(campo in columnas for campo in campos_shopify)
-                    es_convertible = any(campo in columnas for campo in campos_alternativos)
-                    
-                    if es_shopify:
-                        print("✅ FORMATO SHOPIFY DETECTADO")
-                    elif es_convertible:
-                        print("🔄 FORMATO CONVERTIBLE A SHOPIFY")
-                        print("📋 Campos reconocidos:")
-                        for campo in campos_alternativos:
-                            if campo in columnas:
-                                print(f"   ✓ {campo}")
-                    else:
-                        print("❌ FORMATO NO RECONOCIDO")
-                        print("💡 Campos necesarios: Codigo/SKU, Nombre/Title, Precio/Price, Stock/Inventory")
-                    
-                    # Contar productos
-                    productos = list(reader)
-                    print(f"📦 Total productos: {len(productos)}")
-                    
-                    if len(productos) > 0:
-                        # Analizar primer producto
-                        print(f"\n📋 Ejemplo de producto (primero):")
-                        primer_producto = productos[0]
-                        for campo, valor in primer_producto.items():
-                            valor_mostrar = str(valor)[:50] + '...' if len(str(valor)) > 50 else str(valor)
-                            print(f"   {campo}: {valor_mostrar}")
-                        
-                        # Verificar stock
-                        productos_con_stock = 0
-                        stock_campos = ['Variant Inventory Qty', 'Inventory Qty', 'Stock', 'Quantity', 'Available']
-                        
-                        for producto in productos:
-                            for campo_stock in stock_campos:
-                                if campo_stock in producto:
-                                    try:
-                                        stock = float(producto[campo_stock])
-                                        if stock > 0:
-                                            productos_con_stock += 1
-                                            break
-                                    except:
-                                        pass
-                        
-                        print(f"📊 Productos con stock > 0: {productos_con_stock}")
-                        print(f"📊 Productos sin stock: {len(productos) - productos_con_stock}")
-                    
-                    print(f"✅ ARCHIVO VÁLIDO CON {encoding}")
-                    return True
-                else:
-                    print(f"❌ No se pudieron detectar columnas con {encoding}")
-                    
-        except Exception as e:
-            print(f"❌ Error con {encoding}: {e}")
-            continue
+    except Exception as e:
+        print(f"❌ Error con {encoding}: {e}")
     
-    print("❌ NO SE PUDO LEER EL ARCHIVO CON NINGÚN ENCODING")
     return False
 
 def main():